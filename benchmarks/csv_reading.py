@@ -0,0 +1,156 @@
+"""
+Compares the ways the converters read their CSV/TSV inputs.
+
+Generates the open_xref, TSK and names inputs at the requested scale, then
+reads every row of each one with:
+
+- `open`: `open(newline='')` and a streaming `csv.reader`
+- `open_list`: the same, copying every row into a list first, as `tsk_xref`
+  and `hbnd` used to
+- `mmap`: `common.mmap_reader.read_rows`
+- `mmap_parallel`: `line_chunks` in the parent, with every chunk parsed by
+  a process pool that maps the file itself (only with `--jobs` above 1)
+
+Each method reports its best wall time over `--repeat` runs, and the
+`tracemalloc` peak from one extra run, into a JSON report:
+
+    python benchmarks/csv_reading.py --scale 1 --output csv_reading.json
+"""
+
+import argparse
+import csv
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List, NamedTuple
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+import synthetic
+from common.mmap_reader import DEFAULT_CHUNK_BYTES, LineChunk, chunk_rows, line_chunks, map_file, read_rows
+
+
+class Source(NamedTuple):
+    path: str
+    delimiter: str
+    generate: Callable[[str, float, random.Random], int]
+
+
+SOURCES: Dict[str, Source] = {
+    "open_xref": Source("cross_references.csv", ",", synthetic.write_open_xref),
+    "tsk": Source("tskxref.csv", "\t", synthetic.write_tsk),
+    "names": Source("hbnd.csv", ",", synthetic.write_names),
+}
+
+
+def read_open(path: str, delimiter: str, chunk_bytes: int, jobs: int) -> int:
+    rows = 0
+    with open(path, 'r', newline='', encoding='utf-8') as f:
+        for _ in csv.reader(f, delimiter=delimiter):
+            rows += 1
+    return rows
+
+
+def read_open_list(path: str, delimiter: str, chunk_bytes: int, jobs: int) -> int:
+    with open(path, 'r', newline='', encoding='utf-8') as f:
+        return len(list(csv.reader(f, delimiter=delimiter)))
+
+
+def read_mmap(path: str, delimiter: str, chunk_bytes: int, jobs: int) -> int:
+    rows = 0
+    for _ in read_rows(path, delimiter, chunk_bytes):
+        rows += 1
+    return rows
+
+
+def _count_chunk(path: str, chunk: LineChunk, delimiter: str) -> int:
+    with map_file(path) as data:
+        return sum(1 for _ in chunk_rows(data, chunk, delimiter))
+
+
+def read_mmap_parallel(path: str, delimiter: str, chunk_bytes: int, jobs: int) -> int:
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=jobs) as pool, map_file(path) as data:
+        futures = [pool.submit(_count_chunk, path, chunk, delimiter) for chunk in line_chunks(data, chunk_bytes)]
+        return sum(future.result() for future in futures)
+
+
+METHODS: Dict[str, Callable[[str, str, int, int], int]] = {
+    "open": read_open,
+    "open_list": read_open_list,
+    "mmap": read_mmap,
+    "mmap_parallel": read_mmap_parallel,
+}
+
+
+def measure(method: Callable[[str, str, int, int], int], path: str, delimiter: str,
+            chunk_bytes: int, jobs: int, repeat: int) -> dict:
+    times: List[float] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rows = method(path, delimiter, chunk_bytes, jobs)
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    method(path, delimiter, chunk_bytes, jobs)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    best = min(times)
+    return {
+        "rows": rows,
+        "wall_s": round(best, 4),
+        "wall_s_runs": [round(t, 4) for t in times],
+        "rows_per_s": round(rows / best, 1),
+        "mb_per_s": round(os.path.getsize(path) / best / (1 << 20), 3),
+        "peak_traced_bytes": peak,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compares open + csv.reader with the mmap reader on synthetic inputs")
+    parser.add_argument("--scale", type=float, default=1.0, help="input size relative to the real datasets (default 1.0)")
+    parser.add_argument("--seed", type=int, default=1, help="seed for the synthetic inputs (default 1)")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per method, the fastest is reported (default 3)")
+    parser.add_argument("--chunk-bytes", type=int, default=DEFAULT_CHUNK_BYTES, help=f"mmap chunk size (default {DEFAULT_CHUNK_BYTES})")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1, help="workers for mmap_parallel (default: one per core)")
+    parser.add_argument("--output", default="csv_reading_report.json", help="path of the JSON report (default csv_reading_report.json)")
+    args = parser.parse_args()
+
+    work = tempfile.mkdtemp(prefix="ascribe_csv_")
+    report = {
+        "scale": args.scale,
+        "seed": args.seed,
+        "repeat": args.repeat,
+        "chunk_bytes": args.chunk_bytes,
+        "jobs": args.jobs,
+        "sources": {},
+    }
+    try:
+        for name, source in SOURCES.items():
+            path = os.path.join(work, source.path)
+            source.generate(path, args.scale, random.Random(f"{args.seed}:{name}"))
+            results: Dict[str, dict] = {}
+            for method_name, method in METHODS.items():
+                if method_name == "mmap_parallel" and args.jobs <= 1:
+                    continue
+                result = results[method_name] = measure(method, path, source.delimiter, args.chunk_bytes, args.jobs, args.repeat)
+                print(f"{name:<10} {method_name:<14} {result['wall_s']:>8.3f}s {result['mb_per_s']:>8.1f} MB/s "
+                      f"{result['peak_traced_bytes'] / (1 << 20):>8.2f} MB peak")
+            report["sources"][name] = {"bytes": os.path.getsize(path), "methods": results}
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote report: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
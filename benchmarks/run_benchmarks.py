@@ -0,0 +1,273 @@
+"""
+Benchmarks every converter on reproducible synthetic inputs.
+
+Generates inputs at the requested scale (1.0 is roughly the size of the real
+datasets), runs each converter as its own process in a scratch directory, and
+records wall time, CPU time, peak RSS and throughput into a JSON report, along
+with the time, throughput and memory of each stage taken from the converter's
+own `--report`:
+
+    python benchmarks/run_benchmarks.py --scale 0.1 --output report.json
+    python benchmarks/run_benchmarks.py --scale 0.1 --compare report.json
+
+With `--compare`, each benchmark is checked against an earlier report and the
+run exits with status 1 if wall time or peak RSS regressed by more than
+`--threshold`. Peak RSS comes from the converter's report (VmHWM on Linux):
+the runner can't measure it from outside, as the child's `ru_maxrss` includes
+the memory of the runner it was forked from. `--trace-memory` adds each
+stage's `tracemalloc` peak, at the cost of much slower runs.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, NamedTuple
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+import synthetic
+from common.xref_edges import load_edges
+
+
+class Input(NamedTuple):
+    path: str
+    generate: Callable[[str, float, random.Random], int]
+
+
+class Case(NamedTuple):
+    name: str
+    script: str
+    args: List[str]
+    inputs: List[str]
+    outputs: List[str]
+    # strong2csv takes getopt style options
+    report_option: str = "--report"
+    trace_option: str = "--trace-memory"
+
+
+# Paths are relative to the scratch directory; `{work}` expands to it in arguments.
+# Each benchmark runs in its own `{work}/<name>` directory, where strong2csv
+# expects to find av1769s.bib.
+INPUTS: Dict[str, Input] = {
+    "bible": Input("kjv.json", synthetic.write_bible),
+    "open_xref": Input("cross_references.csv", synthetic.write_open_xref),
+    "tsk": Input("tskxref.csv", synthetic.write_tsk),
+    "strongs": Input("strong2csv/av1769s.bib", synthetic.write_strongs_bible),
+    "names": Input("hbnd.csv", synthetic.write_names),
+}
+
+CASES: List[Case] = [
+    Case("bible_converter.jsonl", "bible_converter/bible_converter.py", ["{work}/kjv.json"], ["kjv.json"], ["out.jsonl"]),
+    Case("bible_converter.compact", "bible_converter/bible_converter.py", ["{work}/kjv.json", "--format", "compact"], ["kjv.json"], ["out.compact.jsonl"]),
+    Case("bible_converter.store", "bible_converter/bible_converter.py", ["{work}/kjv.json", "--format", "store", "--concordance"], ["kjv.json"], ["out.vstore", "out.concordance"]),
+    Case("bible_converter.sqlite", "bible_converter/bible_converter.py", ["{work}/kjv.json", "--format", "sqlite"], ["kjv.json"], ["out.sqlite"]),
+    Case("open_xref", "xrefs/open_xref/open_xref.py", ["{work}/cross_references.csv", "--index", "--edges"], ["cross_references.csv"],
+         ["out.jsonl", "out.jsonl.idx", "out.jsonl.edges"]),
+    Case("tsk_xref", "xrefs/tsk/tsk_xref.py", ["{work}/tskxref.csv", "--edges"], ["tskxref.csv"],
+         ["tsk_xrefs.jsonl", "tsk_xrefs.intervals", "tsk_xrefs.jsonl.edges"]),
+    Case("merge_xrefs", "xrefs/merge_xrefs.py", ["{work}/open_xref/out.jsonl.edges", "{work}/tsk_xref/tsk_xrefs.jsonl.edges"],
+         ["open_xref/out.jsonl.edges", "tsk_xref/tsk_xrefs.jsonl.edges"], ["xrefs.jsonl"]),
+    Case("strong2csv", "strongs/strong2csv.py", ["H430,H3068,G2316"], ["strong2csv/av1769s.bib"], ["H430.csv"], "-r", "-m"),
+    Case("hbnd", "hbnd_converter/hbnd.py", ["{work}/hbnd.csv"], ["hbnd.csv"], ["out.jsonl"]),
+]
+
+
+def _count_records(path: str) -> int:
+    if path.endswith(".edges"):
+        return len(load_edges(path).sources)
+    with open(path, 'rb') as f:
+        return sum(1 for _ in f)
+
+
+def generate_inputs(work: str, scale: float, seed: int) -> Dict[str, dict]:
+    inputs: Dict[str, dict] = {}
+    for name, input in INPUTS.items():
+        path = os.path.join(work, input.path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        start = time.perf_counter()
+        records = input.generate(path, scale, random.Random(f"{seed}:{name}"))
+        inputs[input.path] = {
+            "records": records,
+            "bytes": os.path.getsize(path),
+            "generate_s": round(time.perf_counter() - start, 4),
+        }
+        print(f"Generated {input.path}: {records} records, {inputs[input.path]['bytes']} bytes")
+    return inputs
+
+
+def _run_once(command: List[str], cwd: str, report_path: str) -> dict:
+    if os.path.exists(report_path):
+        os.remove(report_path)
+    with open(os.path.join(cwd, "stdout.log"), 'wb') as log:
+        start = time.perf_counter()
+        process = subprocess.Popen(command, cwd=cwd, stdout=log, stderr=subprocess.STDOUT)
+        # wait4 reports the CPU time of this child alone, unlike RUSAGE_CHILDREN
+        _, status, usage = os.wait4(process.pid, 0)
+        wall = time.perf_counter() - start
+    process.returncode = os.waitstatus_to_exitcode(status)
+
+    # A converter that failed may not have written its report
+    report = {}
+    if os.path.exists(report_path):
+        with open(report_path, encoding='utf-8') as f:
+            report = json.load(f)
+    return {
+        "exit_code": process.returncode,
+        "wall_s": wall,
+        "user_s": usage.ru_utime,
+        "sys_s": usage.ru_stime,
+        "peak_rss_kb": report.get("peak_rss_kb"),
+        "stages": report.get("stages", []),
+    }
+
+
+def _stage_results(stages: List[dict], records: int) -> List[dict]:
+    results = []
+    for stage in stages:
+        result = {
+            "name": stage["name"],
+            "calls": stage["calls"],
+            "wall_s": stage["elapsed_s"],
+            "records_per_s": round(records / stage["elapsed_s"], 1) if stage["elapsed_s"] else None,
+            "process_peak_rss_kb": stage["process_peak_rss_kb"],
+        }
+        if "peak_traced_bytes" in stage:
+            result["peak_traced_bytes"] = stage["peak_traced_bytes"]
+        results.append(result)
+    return results
+
+
+def run_case(case: Case, work: str, inputs: Dict[str, dict], repeat: int, trace_memory: bool = False) -> dict:
+    cwd = os.path.join(work, case.name)
+    os.makedirs(cwd, exist_ok=True)
+
+    report_path = os.path.join(cwd, "report.json")
+    command = [sys.executable, os.path.join(REPO, case.script), case.report_option, report_path]
+    if trace_memory:
+        command.append(case.trace_option)
+    command += [arg.format(work=work) for arg in case.args]
+    runs = [_run_once(command, cwd, report_path) for _ in range(repeat)]
+    best = min(runs, key=lambda run: run["wall_s"])
+    peaks = [run["peak_rss_kb"] for run in runs if run["peak_rss_kb"] is not None]
+
+    input_bytes = sum(os.path.getsize(os.path.join(work, path)) for path in case.inputs)
+    records = sum(inputs[path]["records"] if path in inputs else _count_records(os.path.join(work, path)) for path in case.inputs)
+    output_bytes = sum(os.path.getsize(os.path.join(cwd, path)) for path in case.outputs if os.path.exists(os.path.join(cwd, path)))
+
+    return {
+        "command": [case.script, *case.args],
+        "exit_code": best["exit_code"],
+        "wall_s": round(best["wall_s"], 4),
+        "wall_s_runs": [round(run["wall_s"], 4) for run in runs],
+        "user_s": round(best["user_s"], 4),
+        "sys_s": round(best["sys_s"], 4),
+        "peak_rss_kb": max(peaks, default=None),
+        "input_bytes": input_bytes,
+        "records": records,
+        "output_bytes": output_bytes,
+        "records_per_s": round(records / best["wall_s"], 1),
+        "mb_per_s": round(input_bytes / best["wall_s"] / (1 << 20), 3),
+        "stages": _stage_results(best["stages"], records),
+    }
+
+
+def compare(report: dict, baseline: dict, threshold: float) -> bool:
+    """Prints each benchmark against the baseline report. Returns `True` if any of them regressed."""
+    regressed = False
+    print(f"\n{'benchmark':<26} {'wall (s)':>22} {'peak RSS (MB)':>22}")
+    for name, result in report["benchmarks"].items():
+        old = baseline.get("benchmarks", {}).get(name)
+        if old is None:
+            print(f"{name:<26} {'(new)':>22}")
+            continue
+
+        line = f"{name:<26}"
+        for key, scale in (("wall_s", 1), ("peak_rss_kb", 1024)):
+            if result[key] is None or old.get(key) is None:
+                line += f" {'(no report)':>22}"
+                continue
+            ratio = result[key] / old[key] if old[key] else 1.0
+            marker = ""
+            if ratio > 1 + threshold:
+                marker = " !"
+                regressed = True
+            line += f" {old[key] / scale:>8.2f} -> {result[key] / scale:>7.2f}{marker:<2}"
+        print(line)
+
+    if baseline.get("scale") != report["scale"]:
+        print(f"Warning: the baseline was run at scale {baseline.get('scale')}, not {report['scale']}")
+    if baseline.get("trace_memory", False) != report["trace_memory"]:
+        print("Warning: only one of the runs traced memory, which slows every stage down")
+    return regressed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmarks every converter on synthetic inputs")
+    parser.add_argument("--scale", type=float, default=0.1, help="input size relative to the real datasets (default 0.1)")
+    parser.add_argument("--seed", type=int, default=1, help="seed for the synthetic inputs (default 1)")
+    parser.add_argument("--repeat", type=int, default=1, help="runs per benchmark, the fastest is reported (default 1)")
+    parser.add_argument("--only", nargs="+", choices=[case.name for case in CASES], help="benchmarks to run (default all)")
+    parser.add_argument("--work", help="scratch directory to keep inputs and outputs in (default a temporary directory)")
+    parser.add_argument("--output", default="benchmark_report.json", help="path of the JSON report (default benchmark_report.json)")
+    parser.add_argument("--compare", help="earlier JSON report to compare against")
+    parser.add_argument("--threshold", type=float, default=0.1, help="slowdown treated as a regression by --compare (default 0.1)")
+    parser.add_argument("--trace-memory", action="store_true", help="also record the tracemalloc peak of every stage (slow)")
+    args = parser.parse_args()
+
+    work = os.path.abspath(args.work) if args.work else tempfile.mkdtemp(prefix="ascribe_bench_")
+    os.makedirs(work, exist_ok=True)
+
+    report = {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "scale": args.scale,
+        "seed": args.seed,
+        "repeat": args.repeat,
+        "trace_memory": args.trace_memory,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "inputs": {},
+        "benchmarks": {},
+    }
+
+    failed = False
+    try:
+        report["inputs"] = generate_inputs(work, args.scale, args.seed)
+        for case in CASES:
+            if args.only and case.name not in args.only:
+                continue
+            result = run_case(case, work, report["inputs"], args.repeat, args.trace_memory)
+            report["benchmarks"][case.name] = result
+            peak = f"{result['peak_rss_kb'] / 1024:>8.1f} MB" if result["peak_rss_kb"] is not None else f"{'?':>8} MB"
+            print(f"{case.name:<26} {result['wall_s']:>8.3f}s {peak} {result['records_per_s']:>12.0f} records/s")
+            for stage in result["stages"]:
+                print(f"  {stage['name']:<24} {stage['wall_s']:>8.3f}s")
+            if result["exit_code"] != 0:
+                failed = True
+                print(f"Warning: {case.name} exited with status {result['exit_code']}, see {os.path.join(work, case.name, 'stdout.log')}")
+    finally:
+        if not args.work:
+            shutil.rmtree(work, ignore_errors=True)
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote report: {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        failed = compare(report, baseline, args.threshold) or failed
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
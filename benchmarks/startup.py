@@ -0,0 +1,126 @@
+"""
+Measures CLI startup: `--help` and an early validation error for every converter.
+
+Each case runs repeatedly as a fresh process and is compared against a bare
+`python -c pass`, so the reported overhead is what the converter's own imports
+and argument handling add on top of interpreter startup. One extra run per
+case with `python -X importtime` lists the slowest top-level imports:
+
+    python benchmarks/startup.py --output startup_report.json
+
+Exits with status 1 if any case's median overhead exceeds `--target-ms`.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, NamedTuple, Tuple
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class StartupCase(NamedTuple):
+    name: str
+    args: List[str]
+
+
+CASES: List[StartupCase] = [
+    StartupCase("bible_converter --help", ["bible_converter/bible_converter.py", "--help"]),
+    StartupCase("bible_converter missing input", ["bible_converter/bible_converter.py", "missing.json"]),
+    StartupCase("open_xref --help", ["xrefs/open_xref/open_xref.py", "--help"]),
+    StartupCase("open_xref missing input", ["xrefs/open_xref/open_xref.py", "missing.csv"]),
+    StartupCase("tsk_xref --help", ["xrefs/tsk/tsk_xref.py", "--help"]),
+    StartupCase("tsk_xref missing input", ["xrefs/tsk/tsk_xref.py", "missing.csv"]),
+    StartupCase("merge_xrefs --help", ["xrefs/merge_xrefs.py", "--help"]),
+    StartupCase("merge_xrefs missing input", ["xrefs/merge_xrefs.py", "missing.edges", "missing.edges"]),
+    StartupCase("hbnd --help", ["hbnd_converter/hbnd.py", "--help"]),
+    StartupCase("hbnd missing input", ["hbnd_converter/hbnd.py", "missing.csv"]),
+    StartupCase("strong2csv -h", ["strongs/strong2csv.py", "-h"]),
+    StartupCase("strong2csv invalid number", ["strongs/strong2csv.py", "X25"]),
+]
+
+
+def _time_runs(command: List[str], runs: int, cwd: str) -> List[float]:
+    times: List[float] = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(command, cwd=cwd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        times.append((time.perf_counter() - start) * 1000)
+    return times
+
+
+def slowest_imports(command: List[str], cwd: str, count: int = 5) -> Tuple[int, List[Dict[str, object]]]:
+    """Returns the number of modules imported and the `count` slowest top-level imports by cumulative time."""
+    result = subprocess.run([command[0], "-X", "importtime", *command[1:]], cwd=cwd,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    modules = 0
+    top_level: List[Dict[str, object]] = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        # "import time:  self [us] | cumulative | imported package", nested imports are indented
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        if not self_us.strip().isdigit():
+            continue
+        modules += 1
+        if not name[1:].startswith(" "):
+            top_level.append({"module": name.strip(), "cumulative_ms": round(int(cumulative_us) / 1000, 2)})
+    top_level.sort(key=lambda item: item["cumulative_ms"], reverse=True)
+    return modules, top_level[:count]
+
+
+def _run(args: argparse.Namespace, cwd: str) -> dict:
+    baseline = statistics.median(_time_runs([sys.executable, "-c", "pass"], args.runs, cwd))
+    print(f"{'python -c pass':<32} {baseline:>8.1f} ms")
+
+    results: Dict[str, dict] = {}
+    for case in CASES:
+        command = [sys.executable, os.path.join(REPO, case.args[0]), *case.args[1:]]
+        times = _time_runs(command, args.runs, cwd)
+        median = statistics.median(times)
+        modules, imports = slowest_imports(command, cwd)
+        overhead = median - baseline
+        results[case.name] = {
+            "median_ms": round(median, 2),
+            "min_ms": round(min(times), 2),
+            "overhead_ms": round(overhead, 2),
+            "modules_imported": modules,
+            "slowest_imports": imports,
+        }
+        over = "  over target" if overhead > args.target_ms else ""
+        print(f"{case.name:<32} {median:>8.1f} ms  (+{overhead:.1f} ms, {modules} modules){over}")
+
+    return {
+        "python": sys.version.split()[0],
+        "runs": args.runs,
+        "target_ms": args.target_ms,
+        "baseline_ms": round(baseline, 2),
+        "cases": results,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measures the startup time of every converter CLI")
+    parser.add_argument("--runs", type=int, default=10, help="runs per case (default 10)")
+    parser.add_argument("--target-ms", type=float, default=50, help="maximum median overhead over a bare interpreter (default 50)")
+    parser.add_argument("--output", default="startup_report.json", help="path of the JSON report (default startup_report.json)")
+    args = parser.parse_args()
+
+    # Validation error cases refer to missing files, so run from an empty directory
+    with tempfile.TemporaryDirectory() as cwd:
+        report = _run(args, cwd)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote report: {args.output}")
+
+    over = [name for name, result in report["cases"].items() if result["overhead_ms"] > args.target_ms]
+    sys.exit(1 if over else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""
+Reproducible synthetic inputs for the converter benchmarks.
+
+Every generator takes a `scale` (1.0 is roughly the size of the real dataset)
+and a seeded `random.Random`, so the same scale and seed always produce the
+same bytes. Verse references are drawn from the KJV versification, so they
+are all valid. Each generator returns the number of records it wrote.
+"""
+
+import csv
+import json
+import random
+import sqlite3
+from typing import List, Tuple
+
+from common import verse_id
+from common.books import BOOKS, TSK_ALIASES
+from common.versification import KJV
+
+# Approximate row counts of the real inputs at scale 1.0
+KJV_VERSES = 31102
+OPEN_XREF_ROWS = 344800
+TSK_ROWS = 63000
+NAMES = 2620
+
+WORDS_PER_VERSE = 24
+
+VOCABULARY = [
+    "the", "and", "of", "to", "that", "in", "he", "shall", "unto", "for", "I", "his", "a", "LORD", "they",
+    "be", "is", "him", "not", "them", "it", "with", "all", "thou", "thy", "was", "God", "which", "my", "me",
+    "said", "but", "ye", "their", "have", "will", "thee", "from", "as", "are", "when", "this", "out", "were",
+    "upon", "man", "by", "you", "Israel", "king", "son", "up", "there", "hath", "then", "people", "came",
+    "had", "house", "into", "on", "her", "come", "one", "we", "children", "s", "before", "your", "also",
+    "day", "land", "so", "men", "against", "shalt", "if", "at", "let", "go", "hand", "us", "saith", "made",
+    "went", "even", "do", "now", "behold", "saying", "Jesus", "David", "Moses", "Jerusalem", "Judah",
+]
+
+PUNCTUATION = ["", "", "", "", "", ",", ";", ":", ".", "?", "!"]
+
+NAME_SYLLABLES = ["a", "ab", "ba", "el", "ja", "hu", "mi", "na", "ra", "sh", "th", "zi", "on", "ar", "em", "i"]
+
+
+def _verses(count: int) -> List[Tuple[int, int, int]]:
+    """Returns the first `count` KJV verses as `(book, chapter, verse)`, in canonical order."""
+    verses: List[Tuple[int, int, int]] = []
+    for book, chapters in enumerate(KJV.chapter_verses, 1):
+        for chapter, verse_count in enumerate(chapters, 1):
+            for verse in range(1, verse_count + 1):
+                if len(verses) == count:
+                    return verses
+                verses.append((book, chapter, verse))
+    return verses
+
+
+ALL_VERSES = _verses(KJV_VERSES)
+
+
+def _random_verse(rng: random.Random) -> Tuple[int, int, int]:
+    return ALL_VERSES[rng.randrange(len(ALL_VERSES))]
+
+
+def _text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(VOCABULARY) + rng.choice(PUNCTUATION) for _ in range(words))
+
+
+def write_bible(path: str, scale: float, rng: random.Random) -> int:
+    """Writes a scrollmapper shaped KJV JSON. Above scale 1.0 the verses get longer instead of more numerous."""
+    verses = _verses(round(KJV_VERSES * min(scale, 1.0)))
+    words = round(WORDS_PER_VERSE * max(scale, 1.0))
+
+    bible: dict = {"books": []}
+    for book_index, chapter, verse in verses:
+        book = BOOKS[book_index - 1]
+        if not bible["books"] or bible["books"][-1]["name"] != book.name:
+            bible["books"].append({"name": book.name, "chapters": []})
+        chapters = bible["books"][-1]["chapters"]
+        if not chapters or chapters[-1]["chapter"] != chapter:
+            chapters.append({"chapter": chapter, "name": f"{book.name} {chapter}", "verses": []})
+        chapters[-1]["verses"].append({
+            "verse": verse,
+            "chapter": chapter,
+            "name": f"{book.name} {chapter}:{verse}",
+            "text": _text(rng, rng.randint(words // 2, words * 3 // 2)),
+        })
+
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(bible, f, indent=2)
+    return len(verses)
+
+
+def _osis_target(rng: random.Random) -> str:
+    book, chapter, verse = _random_verse(rng)
+    start = verse_id.format_osis(verse_id.pack(book, chapter, verse))
+    last = KJV.verse_count(book, chapter)
+    if verse < last and rng.random() < 0.3:
+        end = rng.randint(verse + 1, min(last, verse + 6))
+        return f"{start}-{verse_id.format_osis(verse_id.pack(book, chapter, end))}"
+    return start
+
+
+def write_open_xref(path: str, scale: float, rng: random.Random) -> int:
+    """Writes an OpenBible cross_references shaped CSV, grouped by source verse like the real file."""
+    rows = round(OPEN_XREF_ROWS * scale)
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f, lineterminator='\n')
+        writer.writerow(["From Verse", "To Verse", "Votes", "#www.openbible.info CC-BY 2011-09-07"])
+        written = 0
+        while written < rows:
+            source = verse_id.format_osis(verse_id.pack(*_random_verse(rng)))
+            for _ in range(min(rng.randint(1, 20), rows - written)):
+                writer.writerow([source, _osis_target(rng), rng.randint(-5, 120)])
+                written += 1
+    return rows
+
+
+# Book index to the TSK's own abbreviation ("ge", "ex", "1sa")
+_TSK_ABBREVIATIONS = {book.index: abbreviation for abbreviation, book in TSK_ALIASES.items()}
+
+
+def _tsk_refs(rng: random.Random) -> str:
+    refs: List[str] = []
+    for _ in range(rng.randint(1, 6)):
+        book, chapter, verse = _random_verse(rng)
+        abbreviation = _TSK_ABBREVIATIONS[book]
+        last = KJV.verse_count(book, chapter)
+        kind = rng.random()
+        if kind < 0.1 and BOOKS[book - 1].chapters > 1:
+            refs.append(f"{abbreviation} {chapter}")
+            continue
+
+        verses = [str(verse)]
+        if kind < 0.5 and verse < last:
+            verses.append(str(rng.randint(verse + 1, last)))
+        if kind > 0.8 and verses[-1] != str(last):
+            first = int(verses[-1]) + 1
+            verses.append(f"{first}-{rng.randint(first, last)}" if first < last else str(first))
+        refs.append(f"{abbreviation} {chapter}:{','.join(verses)}")
+    return ";".join(refs)
+
+
+def write_tsk(path: str, scale: float, rng: random.Random) -> int:
+    """Writes a TSK shaped tab separated file: book, chapter, verse, order, word, references."""
+    rows = round(TSK_ROWS * scale)
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        for i in range(rows):
+            book, chapter, verse = ALL_VERSES[i * len(ALL_VERSES) // max(rows, 1)]
+            f.write(f"{book}\t{chapter}\t{verse}\t{i % 4 + 1}\t{rng.choice(VOCABULARY)}\t{_tsk_refs(rng)}\n")
+    return rows
+
+
+def write_strongs_bible(path: str, scale: float, rng: random.Random) -> int:
+    """Writes an av1769s.bib shaped SQLite database whose verse text is tagged with Strong's numbers."""
+    verses = _verses(round(KJV_VERSES * min(scale, 1.0)))
+
+    def tagged(book: int) -> str:
+        prefix = "H" if book <= 39 else "G"
+        limit = 8674 if prefix == "H" else 5624
+        words: List[str] = []
+        for _ in range(rng.randint(WORDS_PER_VERSE // 2, WORDS_PER_VERSE * 3 // 2)):
+            word = rng.choice(VOCABULARY)
+            if rng.random() < 0.6:
+                word += f"[{prefix}{rng.randint(1, limit)}]"
+            words.append(word)
+        return " ".join(words)
+
+    con = sqlite3.connect(path)
+    try:
+        con.execute("DROP TABLE IF EXISTS bible")
+        con.execute("CREATE TABLE bible (id integer, ref text, text text)")
+        con.executemany("INSERT INTO bible VALUES (?, ?, ?)", (
+            (i, f"{BOOKS[book - 1].osis} {chapter}:{verse}", tagged(book))
+            for i, (book, chapter, verse) in enumerate(verses)
+        ))
+        con.commit()
+    finally:
+        con.close()
+    return len(verses)
+
+
+def write_names(path: str, scale: float, rng: random.Random) -> int:
+    """Writes a Hitchcock's Bible Names shaped CSV: a name and `;` separated meanings."""
+    count = round(NAMES * scale)
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f, lineterminator='\n')
+        writer.writerow(["english_label", "Meaning"])
+        for i in range(count):
+            name = "".join(rng.choice(NAME_SYLLABLES) for _ in range(rng.randint(2, 4))).capitalize()
+            meanings = "; ".join(" ".join(rng.choice(VOCABULARY) for _ in range(rng.randint(1, 4))) for _ in range(rng.randint(1, 3)))
+            writer.writerow([f"{name}{i}", meanings])
+    return count
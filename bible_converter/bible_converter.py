@@ -1,34 +1,22 @@
 import json
 import sys
 import os
-from typing import List, Tuple
-from dataclasses import dataclass
-from dacite import from_dict
+import argparse
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
 import re
 
-@dataclass
-class SrcVerse:
-    verse: int
-    chapter: int
-    name: str
-    text: str
-
-@dataclass
-class SrcChapter:
-    chapter: int
-    name: str
-    verses: List[SrcVerse]
-
-@dataclass
-class SrcBook:
-    name: str
-    chapters: List[SrcChapter]
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common import books, verse_id
+from common.instrument import Instrumentation, add_instrument_arguments
+from common.offset_index import OffsetIndex, add_index_argument, index_path
+from common.output import add_compress_argument, compressed_path, open_output
 
-@dataclass
-class SrcBible:
-    books: List[SrcBook]
+if TYPE_CHECKING:
+    from scrollmapper import SrcBible
 
 class DestWord:
+    __slots__ = ('red', 'italics', 'begin_punc', 'end_punc', 'text')
+
     red: bool | None
     italics: bool | None
     begin_punc: str | None
@@ -76,97 +64,27 @@ class DestBible:
         return '\n'.join(v.to_json() for v in self.verses)
 
 
-if len(sys.argv) < 2:
-    raise RuntimeError("You must pass a file path")
-elif len(sys.argv) > 2:
-    raise RuntimeError("More than 1 argument was supplied")
-
-path = sys.argv[1]
-
-if not os.path.isfile(path):
-    raise RuntimeError(f"File path {path} is not a valid path")
-
-_, ext = os.path.splitext(path)
-if not ext == ".json":
-    raise RuntimeError(f"File path {path} is not a json file")
-
-with open(path, 'r') as f:
-    bible = json.load(f)
-
-bible = from_dict(SrcBible, bible)
-
-
-bible_to_osis = {
-    "Genesis": "Gen",
-    "Exodus": "Exod",
-    "Leviticus": "Lev",
-    "Numbers": "Num",
-    "Deuteronomy": "Deut",
-    "Joshua": "Josh",
-    "Judges": "Judg",
-    "Ruth": "Ruth",
-    "I Samuel": "1Sam",
-    "II Samuel": "2Sam",
-    "I Kings": "1Kgs",
-    "II Kings": "2Kgs",
-    "I Chronicles": "1Chr",
-    "II Chronicles": "2Chr",
-    "Ezra": "Ezra",
-    "Nehemiah": "Neh",
-    "Esther": "Esth",
-    "Job": "Job",
-    "Psalms": "Ps",
-    "Proverbs": "Prov",
-    "Ecclesiastes": "Eccl",
-    "Song of Solomon": "Song",
-    "Isaiah": "Isa",
-    "Jeremiah": "Jer",
-    "Lamentations": "Lam",
-    "Ezekiel": "Ezek",
-    "Daniel": "Dan",
-    "Hosea": "Hos",
-    "Joel": "Joel",
-    "Amos": "Amos",
-    "Obadiah": "Obad",
-    "Jonah": "Jonah",
-    "Micah": "Mic",
-    "Nahum": "Nah",
-    "Habakkuk": "Hab",
-    "Zephaniah": "Zeph",
-    "Haggai": "Hag",
-    "Zechariah": "Zech",
-    "Malachi": "Mal",
-    "Matthew": "Matt",
-    "Mark": "Mark",
-    "Luke": "Luke",
-    "John": "John",
-    "Acts": "Acts",
-    "Romans": "Rom",
-    "I Corinthians": "1Cor",
-    "II Corinthians": "2Cor",
-    "Galatians": "Gal",
-    "Ephesians": "Eph",
-    "Philippians": "Phil",
-    "Colossians": "Col",
-    "I Thessalonians": "1Thess",
-    "II Thessalonians": "2Thess",
-    "I Timothy": "1Tim",
-    "II Timothy": "2Tim",
-    "Titus": "Titus",
-    "Philemon": "Phlm",
-    "Hebrews": "Heb",
-    "James": "Jas",
-    "I Peter": "1Pet",
-    "II Peter": "2Pet",
-    "I John": "1John",
-    "II John": "2John",
-    "III John": "3John",
-    "Jude": "Jude",
-    "Revelation": "Rev",
-    "Revelation of John": "Rev"
+DEFAULT_OUTPUTS = {
+    "jsonl": "out.jsonl",
+    "compact": "out.compact.jsonl",
+    "store": "out.vstore",
+    "sqlite": "out.sqlite",
 }
 
+FORMATS = list(DEFAULT_OUTPUTS)
+
+
+_split_words: Dict[str, Tuple[str | None, str, str | None]] = {}
+
 def split_punctuated_word(text: str) -> Tuple[str | None, str, str | None]:
+    # Tokens repeat heavily, so each distinct token is split once and its
+    # parts interned, letting every DestWord share the same strings
+    split = _split_words.get(text)
+    if split is None:
+        split = _split_words[text] = _split_punctuated_word(text)
+    return split
+
+def _split_punctuated_word(text: str) -> Tuple[str | None, str, str | None]:
     # Match beginning punctuation, word text, and ending punctuation
     match = re.match(r'^(\W*)(\w+)(\W*)$', text)
     if match:
@@ -183,35 +101,146 @@ def split_punctuated_word(text: str) -> Tuple[str | None, str, str | None]:
     if len(end_punc) == 0:
         end_punc = None
 
-    return begin_punc, word, end_punc
-
-verses: List[DestVerse] = []
-for book in bible.books:
-    for chapter in book.chapters:
-        for verse in chapter.verses:
-            book_name = bible_to_osis[book.name]
-            id: str = f"{book_name}.{chapter.chapter}.{verse.verse}"
-
-            text_words = verse.text.split()
-            words: List[DestWord] = []
-            for w in text_words:
-                begin_punc, text, end_punc = split_punctuated_word(w)
-                words.append(DestWord(text, None, None, begin_punc, end_punc))
-
-            verses.append(DestVerse(id, words))
-    print(f"Parsed {book.name}")
-
-dest_bible = DestBible(verses)
-
-print("Writing to file...")
-
-with open('out.jsonl', 'w', encoding='utf-8') as file:
-    file.write(dest_bible.to_jsonl())
-
-print("Done!")
-
-
-
-            
-
-
+    return (
+        None if begin_punc is None else sys.intern(begin_punc),
+        sys.intern(word),
+        None if end_punc is None else sys.intern(end_punc),
+    )
+
+
+def load_bible(path: str, instrumentation: Instrumentation) -> 'SrcBible':
+    if not os.path.isfile(path):
+        raise RuntimeError(f"File path {path} is not a valid path")
+
+    _, ext = os.path.splitext(path)
+    if not ext == ".json":
+        raise RuntimeError(f"File path {path} is not a json file")
+
+    with instrumentation.stage("read"), open(path, 'r') as f:
+        bible = json.load(f)
+
+    with instrumentation.stage("parse"):
+        from scrollmapper import parse_bible
+        return parse_bible(bible)
+
+def convert_bible(bible: 'SrcBible', instrumentation: Instrumentation) -> Tuple[List[DestVerse], List[int]]:
+    """Splits every verse into words, returning the verses and their packed ids."""
+    verses: List[DestVerse] = []
+    packed_ids: List[int] = []
+    with instrumentation.stage("transform"):
+        for book in bible.books:
+            for chapter in book.chapters:
+                for verse in chapter.verses:
+                    book_info = books.get(book.name)
+                    id: str = f"{book_info.osis}.{chapter.chapter}.{verse.verse}"
+                    packed_ids.append(verse_id.pack(book_info.index, chapter.chapter, verse.verse))
+
+                    text_words = verse.text.split()
+                    words: List[DestWord] = []
+                    for w in text_words:
+                        begin_punc, text, end_punc = split_punctuated_word(w)
+                        words.append(DestWord(text, None, None, begin_punc, end_punc))
+
+                    verses.append(DestVerse(id, words))
+                    instrumentation.count("words", len(words))
+            print(f"Parsed {book.name}")
+    instrumentation.count("books", len(bible.books))
+    instrumentation.count("verses", len(verses))
+    instrumentation.count("distinct_tokens", len(_split_words))
+    return verses, packed_ids
+
+def convert(path: str, format: str = "jsonl", output: Optional[str] = None, compress: str = "none",
+            translation: Optional[str] = None, concordance: Optional[str] = None, index: Optional[str] = None,
+            instrumentation: Optional[Instrumentation] = None) -> Dict[str, int]:
+    """
+    Converts the scrollmapper JSON Bible at `path` into `format`, written to
+    `output` (default `DEFAULT_OUTPUTS[format]`; SQLite output adds the
+    translation to the database at `output`). Also writes a word concordance
+    to `concordance`, and an offset index of the verses of JSONL output to
+    `index`, if given. Returns the converter's counters.
+    """
+    if instrumentation is None:
+        instrumentation = Instrumentation("bible_converter")
+    if format not in DEFAULT_OUTPUTS:
+        raise RuntimeError(f"Unknown output format: {format}")
+    if compress != "none" and format not in ("jsonl", "compact"):
+        raise RuntimeError(f"Only JSONL output can be compressed, not {format}")
+    if index and format not in ("jsonl", "compact"):
+        raise RuntimeError(f"Only JSONL output can be indexed, not {format}")
+    if index and compress != "none":
+        raise RuntimeError(f"Can't index {format} output compressed with {compress}: it can't be read at an offset")
+    output = output or DEFAULT_OUTPUTS[format]
+
+    bible = load_bible(path, instrumentation)
+    verses, packed_ids = convert_bible(bible, instrumentation)
+
+    if concordance:
+        print(f"Writing to file: {concordance}...")
+        with instrumentation.stage("index"):
+            from concordance import ConcordanceBuilder
+            builder = ConcordanceBuilder()
+            for packed_id, verse in zip(packed_ids, verses):
+                builder.add_verse(packed_id, verse.words)
+            builder.write(concordance)
+
+    if format == "compact":
+        print(f"Writing to file: {compressed_path(output, compress)}...")
+        with instrumentation.stage("write"):
+            from compact import write_compact_jsonl
+            write_compact_jsonl(output, ((v.id, v.words) for v in verses), compress, index)
+    elif format == "store":
+        print(f"Writing to file: {output}...")
+        with instrumentation.stage("write"):
+            from verse_store import write_verse_store
+            write_verse_store(output, zip(packed_ids, (v.words for v in verses)))
+    elif format == "sqlite":
+        translation = translation or os.path.splitext(os.path.basename(path))[0]
+        print(f"Writing {translation} to database: {output}...")
+        with instrumentation.stage("write"):
+            from sqlite_store import write_sqlite
+            write_sqlite(output, translation, ((verse_id.unpack(p), v.id, v.words) for p, v in zip(packed_ids, verses)))
+    else:
+        out_path = compressed_path(output, compress)
+        print(f"Writing to file: {out_path}...")
+
+        with instrumentation.stage("serialize"):
+            lines = [v.to_json().encode('utf-8') for v in verses]
+            data = b"\n".join(lines)
+        with instrumentation.stage("write"), open_output(out_path, compress) as file:
+            file.write(data)
+
+        if index:
+            print(f"Writing to file: {index}...")
+            with instrumentation.stage("offset_index"):
+                entries = []
+                offset = 0
+                for packed_id, line in zip(packed_ids, lines):
+                    entries.append((packed_id, offset, len(line)))
+                    offset += len(line) + 1
+                OffsetIndex.build(entries).save(index)
+
+    return instrumentation.counters
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Converts a scrollmapper JSON Bible into the Ascribe format")
+    parser.add_argument("path", help="path to the source JSON Bible")
+    parser.add_argument("--format", choices=FORMATS, default="jsonl",
+                        help="write one JSON line per verse (out.jsonl), dictionary encoded JSONL (out.compact.jsonl), "
+                             "an mmap-able verse store (out.vstore) or a SQLite database")
+    parser.add_argument("--db", default="out.sqlite", help="SQLite database to add the translation to (default out.sqlite)")
+    parser.add_argument("--translation", help="translation name used in the SQLite database (default: the input file name)")
+    parser.add_argument("--concordance", action="store_true", help="also write a word concordance (out.concordance)")
+    add_compress_argument(parser)
+    add_index_argument(parser)
+    add_instrument_arguments(parser)
+    args = parser.parse_args()
+
+    with Instrumentation.from_args("bible_converter", args) as instrumentation:
+        convert(args.path, args.format, args.db if args.format == "sqlite" else None, args.compress,
+                args.translation, "out.concordance" if args.concordance else None,
+                index_path(DEFAULT_OUTPUTS[args.format]) if args.index else None, instrumentation)
+
+    print("Done!")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Dictionary encoded JSONL output for converted Bibles.
+
+The first line holds the string tables; every following line is a verse whose
+words are flat `[text, begin_punc, end_punc, ...]` triples of table ids:
+
+    {"type": "tables", "words": ["In", "the", ...], "punctuation": [",", ";", ...]}
+    {"id": "Gen.1.1", "words": [0, 0, 0, 1, 0, 0, ...]}
+
+Word ids index the `words` table directly. Punctuation ids are offset by one
+so that `0` means no punctuation. When any word of a verse has `red` or
+`italics` set, the verse also carries a `flags` list with one int per word
+(bit 0: red is set, bit 1: red, bit 2: italics is set, bit 3: italics).
+"""
+
+import os
+import sys
+from typing import Dict, Iterable, List, Optional, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common import verse_id
+from common.jsonl import JsonlWriter
+from verse_store import Word
+
+
+class StringTable:
+    """Assigns ids to strings in first-seen order, interning each string once."""
+
+    def __init__(self, first_id: int = 0) -> None:
+        self.first_id = first_id
+        self.ids: Dict[str, int] = {}
+        self.strings: List[str] = []
+
+    def id(self, value: str) -> int:
+        id = self.ids.get(value)
+        if id is None:
+            id = self.ids[value] = len(self.strings) + self.first_id
+            self.strings.append(sys.intern(value))
+        return id
+
+
+def _flags(word: Word) -> int:
+    flags = 0
+    if word.red is not None:
+        flags |= 0x1 | (0x2 if word.red else 0)
+    if word.italics is not None:
+        flags |= 0x4 | (0x8 if word.italics else 0)
+    return flags
+
+
+def write_compact_jsonl(path: str, verses: Iterable[Tuple[str, Iterable[Word]]], compress: str = "none",
+                        index: Optional[str] = None) -> None:
+    """
+    Writes `(OSIS id, words)` pairs as dictionary encoded JSONL, and an
+    offset index of the verse lines to `index` if given.
+    """
+    words = StringTable()
+    punctuation = StringTable(first_id=1)
+
+    encoded: List[dict] = []
+    for id, verse_words in verses:
+        ids: List[int] = []
+        flags: List[int] = []
+        for word in verse_words:
+            ids.append(words.id(word.text))
+            ids.append(0 if word.begin_punc is None else punctuation.id(word.begin_punc))
+            ids.append(0 if word.end_punc is None else punctuation.id(word.end_punc))
+            flags.append(_flags(word))
+
+        record = {"id": id, "words": ids}
+        if any(flags):
+            record["flags"] = flags
+        encoded.append(record)
+
+    with JsonlWriter(path, compress=compress, index=index) as writer:
+        writer.write({"type": "tables", "words": words.strings, "punctuation": punctuation.strings})
+        for record in encoded:
+            writer.write(record, key=verse_id.parse_osis(record["id"]) if index else None)
@@ -0,0 +1,165 @@
+"""
+Word frequency and concordance index for converted Bibles.
+
+Each normalized word maps to a sorted postings list of `(verse id, word index)`
+pairs. A posting is packed into one int (`verse id << 10 | word index`), and
+each list is stored as varint encoded deltas between consecutive postings.
+
+File layout (little endian):
+    magic       b"AXCC"
+    u32         version
+    u32         word count (n)
+    u32         size of the key blob in bytes (k)
+    u8[k]       sorted words, UTF-8, separated by "\\n"
+    u32[n]      posting count of each word
+    u32[n + 1]  offset of each word's postings in the postings blob, plus an end sentinel
+    postings blob
+"""
+
+import re
+import struct
+from typing import Dict, Iterable, List, Tuple
+
+from common.binary_io import ArrayReader, u32_array, write_array
+from verse_store import Word
+
+MAGIC = b"AXCC"
+VERSION = 1
+
+POSITION_BITS = 10
+POSITION_MASK = (1 << POSITION_BITS) - 1
+
+_HEADER = struct.Struct("<4sIII")
+
+Posting = Tuple[int, int]
+
+
+# Punctuation left on a word when `split_punctuated_word` can't split it, e.g. `Lord's,`
+_SURROUNDING_PUNCTUATION = re.compile(r"^\W+|\W+$")
+
+
+def normalize(text: str) -> str:
+    """Returns the concordance key of a word: casefolded, without surrounding punctuation or a possessive."""
+    word = _SURROUNDING_PUNCTUATION.sub("", text).casefold()
+    if word.endswith("'s"):
+        word = word[:-2]
+    return word
+
+
+def encode_postings(postings: Iterable[int]) -> bytes:
+    out = bytearray()
+    previous = 0
+    for posting in postings:
+        delta = posting - previous
+        previous = posting
+        while delta >= 0x80:
+            out.append((delta & 0x7F) | 0x80)
+            delta >>= 7
+        out.append(delta)
+    return bytes(out)
+
+
+def decode_postings(data: bytes | memoryview) -> List[int]:
+    postings: List[int] = []
+    current = 0
+    delta = 0
+    shift = 0
+    for byte in data:
+        delta |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+        else:
+            current += delta
+            postings.append(current)
+            delta = 0
+            shift = 0
+    return postings
+
+
+class ConcordanceBuilder:
+    def __init__(self) -> None:
+        self.postings: Dict[str, List[int]] = {}
+        # `normalize` of each distinct word text. The texts are the strings
+        # interned by `split_punctuated_word`, so their hashes are cached.
+        self._keys: Dict[str, str] = {}
+
+    def add_verse(self, id: int, words: Iterable[Word]) -> None:
+        for index, word in enumerate(words):
+            if index > POSITION_MASK:
+                raise RuntimeError(f"Verse {id} has more than {POSITION_MASK + 1} words")
+            key = self._keys.get(word.text)
+            if key is None:
+                key = self._keys[word.text] = normalize(word.text)
+            # Tokens that are all punctuation have no key
+            if key:
+                self.postings.setdefault(key, []).append((id << POSITION_BITS) | index)
+
+    def write(self, path: str) -> None:
+        keys = sorted(self.postings)
+        counts = u32_array()
+        offsets = u32_array()
+        blob = bytearray()
+        for key in keys:
+            postings = self.postings[key]
+            postings.sort()
+            counts.append(len(postings))
+            offsets.append(len(blob))
+            blob += encode_postings(postings)
+        offsets.append(len(blob))
+
+        key_blob = "\n".join(keys).encode('utf-8')
+        with open(path, 'wb') as f:
+            f.write(_HEADER.pack(MAGIC, VERSION, len(keys), len(key_blob)))
+            f.write(key_blob)
+            for table in (counts, offsets):
+                write_array(f, table)
+            f.write(blob)
+
+
+class Concordance:
+    def __init__(self, path: str) -> None:
+        with open(path, 'rb') as f:
+            data = f.read()
+
+        magic, version, word_count, key_size = _HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise RuntimeError(f"File {path} is not a version {VERSION} concordance")
+
+        offset = _HEADER.size
+        keys = data[offset:offset + key_size].decode('utf-8').split("\n") if word_count else []
+        self._index = {key: i for i, key in enumerate(keys)}
+        offset += key_size
+
+        reader = ArrayReader(data, offset)
+        self._counts = reader.take('I', word_count)
+        self._offsets = reader.take('I', word_count + 1)
+        self._postings = reader.take_bytes(len(data) - reader.position)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, word: str) -> bool:
+        return normalize(word) in self._index
+
+    def words(self) -> List[str]:
+        return list(self._index)
+
+    def frequency(self, word: str) -> int:
+        i = self._index.get(normalize(word))
+        return 0 if i is None else self._counts[i]
+
+    def lookup(self, word: str) -> List[Posting]:
+        """Returns every `(verse id, word index)` the word occurs at, in canonical order."""
+        i = self._index.get(normalize(word))
+        if i is None:
+            return []
+        data = self._postings[self._offsets[i]:self._offsets[i + 1]]
+        return [(p >> POSITION_BITS, p & POSITION_MASK) for p in decode_postings(data)]
+
+    def verses(self, word: str) -> List[int]:
+        """Returns the distinct verse ids containing the word, in canonical order."""
+        ids: List[int] = []
+        for id, _ in self.lookup(word):
+            if not ids or ids[-1] != id:
+                ids.append(id)
+        return ids
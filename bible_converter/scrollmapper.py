@@ -0,0 +1,36 @@
+"""
+Schema of the scrollmapper JSON Bibles, parsed into dataclasses with dacite.
+
+Kept out of `bible_converter` so that `dataclasses` and `dacite` are only
+imported once a Bible is actually being converted.
+"""
+
+from dataclasses import dataclass
+from typing import Any, List
+
+from dacite import from_dict
+
+@dataclass
+class SrcVerse:
+    verse: int
+    chapter: int
+    name: str
+    text: str
+
+@dataclass
+class SrcChapter:
+    chapter: int
+    name: str
+    verses: List[SrcVerse]
+
+@dataclass
+class SrcBook:
+    name: str
+    chapters: List[SrcChapter]
+
+@dataclass
+class SrcBible:
+    books: List[SrcBook]
+
+def parse_bible(data: Any) -> SrcBible:
+    return from_dict(SrcBible, data)
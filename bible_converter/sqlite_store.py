@@ -0,0 +1,103 @@
+"""
+SQLite output for converted Bibles.
+
+Several translations can share one database, so passages can be queried side
+by side:
+
+    SELECT t.name, w.text FROM verses v
+    JOIN translations t ON t.id = v.translation
+    JOIN words w ON w.verse_rowid = v.rowid
+    WHERE v.book = 43 AND v.chapter = 3 AND v.verse = 16
+    ORDER BY t.name, w.idx
+
+Verses and words are inserted with `executemany` in a single transaction, and
+the lookup indexes are created once the bulk insert is done.
+"""
+
+import sqlite3
+from typing import Iterable, List, Tuple
+
+from verse_store import Word
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS translations (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS verses (
+    rowid INTEGER PRIMARY KEY,
+    translation INTEGER NOT NULL REFERENCES translations(id),
+    book INTEGER NOT NULL,
+    chapter INTEGER NOT NULL,
+    verse INTEGER NOT NULL,
+    id TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS words (
+    verse_rowid INTEGER NOT NULL REFERENCES verses(rowid),
+    idx INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    begin_punc TEXT,
+    end_punc TEXT,
+    red INTEGER,
+    italics INTEGER,
+    PRIMARY KEY (verse_rowid, idx)
+) WITHOUT ROWID;
+"""
+
+INDEXES = [
+    "CREATE UNIQUE INDEX IF NOT EXISTS verses_passage ON verses (translation, book, chapter, verse)",
+    "CREATE INDEX IF NOT EXISTS verses_id ON verses (id, translation)",
+]
+
+PRAGMAS = """
+PRAGMA journal_mode = WAL;
+PRAGMA synchronous = NORMAL;
+PRAGMA temp_store = MEMORY;
+PRAGMA cache_size = -65536;
+"""
+
+
+def _bool(value: bool | None) -> int | None:
+    return None if value is None else int(value)
+
+
+def write_sqlite(db_path: str, translation: str, verses: Iterable[Tuple[Tuple[int, int, int], str, Iterable[Word]]]) -> int:
+    """
+    Writes a translation's `((book, chapter, verse), id, words)` triples into
+    `db_path`, replacing any previous copy of the same translation. Returns the
+    number of verses written.
+    """
+    con = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        con.executescript(PRAGMAS)
+        con.executescript(SCHEMA)
+
+        con.execute("BEGIN")
+        con.execute("INSERT OR IGNORE INTO translations (name) VALUES (?)", (translation,))
+        (translation_id,) = con.execute("SELECT id FROM translations WHERE name = ?", (translation,)).fetchone()
+        con.execute("DELETE FROM words WHERE verse_rowid IN (SELECT rowid FROM verses WHERE translation = ?)", (translation_id,))
+        con.execute("DELETE FROM verses WHERE translation = ?", (translation_id,))
+
+        (rowid,) = con.execute("SELECT COALESCE(MAX(rowid), 0) FROM verses").fetchone()
+        verse_rows: List[Tuple[int, int, int, int, int, str]] = []
+        word_rows: List[Tuple[int, int, str, str | None, str | None, int | None, int | None]] = []
+        for (book, chapter, verse), id, words in verses:
+            rowid += 1
+            verse_rows.append((rowid, translation_id, book, chapter, verse, id))
+            for idx, w in enumerate(words):
+                word_rows.append((rowid, idx, w.text, w.begin_punc, w.end_punc, _bool(w.red), _bool(w.italics)))
+
+        con.executemany("INSERT INTO verses (rowid, translation, book, chapter, verse, id) VALUES (?, ?, ?, ?, ?, ?)", verse_rows)
+        con.executemany("INSERT INTO words (verse_rowid, idx, text, begin_punc, end_punc, red, italics) VALUES (?, ?, ?, ?, ?, ?, ?)", word_rows)
+        for index in INDEXES:
+            con.execute(index)
+        con.execute("COMMIT")
+        con.execute("PRAGMA optimize")
+    except BaseException:
+        if con.in_transaction:
+            con.execute("ROLLBACK")
+        raise
+    finally:
+        con.close()
+
+    return len(verse_rows)
@@ -0,0 +1,275 @@
+"""
+Binary verse text store designed for `mmap`.
+
+File layout (little endian, all offsets in bytes):
+    magic       b"AXVS"
+    u32         version
+    u32         book count (66)
+    u32         chapter count (c)
+    u32         verse count (v)
+    u32[67]     book table: index of each book's first chapter, plus an end sentinel
+    u32[c + 1]  chapter table: index of each chapter's first verse, plus an end sentinel
+    u32[v + 1]  verse table: offset of each verse's words in the blob, plus an end sentinel
+    u8[(v+7)/8] presence bitmap: bit `i % 8` of byte `i // 8` is set if verse `i` is in the source
+    blob        concatenated verse records
+
+Books, chapters and verses are stored densely in canonical order, so a verse
+is found with three table reads and no searching. Missing chapters or verses
+in the source are stored as empty records with their presence bit clear, so
+they read back as `None` rather than as an empty verse.
+
+A verse record is a sequence of words, each encoded as a flags byte followed
+by length prefixed (u8) UTF-8 strings: the text, then the begin and end
+punctuation when present.
+"""
+
+import mmap
+import os
+import struct
+import sys
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Protocol, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common import verse_id
+from common.binary_io import ArrayReader, u32_array, write_array
+
+MAGIC = b"AXVS"
+VERSION = 2
+BOOK_COUNT = len(verse_id.OSIS_BOOKS)
+
+_HEADER = struct.Struct("<4sIIII")
+
+_HAS_RED = 0x01
+_RED = 0x02
+_HAS_ITALICS = 0x04
+_ITALICS = 0x08
+_HAS_BEGIN_PUNC = 0x10
+_HAS_END_PUNC = 0x20
+
+
+class Word(Protocol):
+    text: str
+    red: bool | None
+    italics: bool | None
+    begin_punc: str | None
+    end_punc: str | None
+
+
+class StoredWord(NamedTuple):
+    text: str
+    red: bool | None
+    italics: bool | None
+    begin_punc: str | None
+    end_punc: str | None
+
+
+def _append_str(out: bytearray, value: str) -> None:
+    data = value.encode('utf-8')
+    if len(data) > 0xFF:
+        raise RuntimeError(f"Word '{value}' is too long for the verse store")
+    out.append(len(data))
+    out += data
+
+
+def encode_words(words: Iterable[Word]) -> bytes:
+    out = bytearray()
+    for word in words:
+        flags = 0
+        if word.red is not None:
+            flags |= _HAS_RED | (_RED if word.red else 0)
+        if word.italics is not None:
+            flags |= _HAS_ITALICS | (_ITALICS if word.italics else 0)
+        if word.begin_punc is not None:
+            flags |= _HAS_BEGIN_PUNC
+        if word.end_punc is not None:
+            flags |= _HAS_END_PUNC
+
+        out.append(flags)
+        _append_str(out, word.text)
+        if word.begin_punc is not None:
+            _append_str(out, word.begin_punc)
+        if word.end_punc is not None:
+            _append_str(out, word.end_punc)
+    return bytes(out)
+
+
+def decode_words(data: bytes | memoryview) -> List[StoredWord]:
+    words: List[StoredWord] = []
+    i = 0
+    n = len(data)
+    while i < n:
+        flags = data[i]
+        length = data[i + 1]
+        i += 2
+        text = bytes(data[i:i + length]).decode('utf-8')
+        i += length
+
+        begin_punc = None
+        if flags & _HAS_BEGIN_PUNC:
+            length = data[i]
+            begin_punc = bytes(data[i + 1:i + 1 + length]).decode('utf-8')
+            i += 1 + length
+
+        end_punc = None
+        if flags & _HAS_END_PUNC:
+            length = data[i]
+            end_punc = bytes(data[i + 1:i + 1 + length]).decode('utf-8')
+            i += 1 + length
+
+        red = bool(flags & _RED) if flags & _HAS_RED else None
+        italics = bool(flags & _ITALICS) if flags & _HAS_ITALICS else None
+        words.append(StoredWord(text, red, italics, begin_punc, end_punc))
+    return words
+
+
+def write_verse_store(path: str, verses: Iterable[Tuple[int, Iterable[Word]]]) -> None:
+    """Writes `(packed verse id, words)` pairs to a verse store. Verses may arrive in any order."""
+    chapters: Dict[Tuple[int, int], Dict[int, bytes]] = {}
+    chapter_counts = [0] * (BOOK_COUNT + 1)
+    for id, words in verses:
+        book, chapter, verse = verse_id.unpack(id)
+        records = chapters.setdefault((book, chapter), {})
+        if verse in records:
+            raise RuntimeError(f"Duplicate verse {verse_id.format_osis(id)}")
+        records[verse] = encode_words(words)
+        chapter_counts[book] = max(chapter_counts[book], chapter)
+
+    book_table = u32_array()
+    chapter_table = u32_array()
+    verse_table = u32_array()
+    blob = bytearray()
+    present = bytearray()
+
+    for book in range(1, BOOK_COUNT + 1):
+        book_table.append(len(chapter_table))
+        for chapter in range(1, chapter_counts[book] + 1):
+            chapter_table.append(len(verse_table))
+            records = chapters.get((book, chapter), {})
+            for verse in range(1, max(records, default=0) + 1):
+                if len(verse_table) % 8 == 0:
+                    present.append(0)
+                if verse in records:
+                    present[-1] |= 1 << len(verse_table) % 8
+                verse_table.append(len(blob))
+                blob += records.get(verse, b"")
+
+    book_table.append(len(chapter_table))
+    chapter_table.append(len(verse_table))
+    verse_table.append(len(blob))
+
+    with open(path, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, BOOK_COUNT, len(chapter_table) - 1, len(verse_table) - 1))
+        for table in (book_table, chapter_table, verse_table):
+            write_array(f, table)
+        f.write(present)
+        f.write(blob)
+
+
+class VerseStore:
+    """Random access reader over a verse store file. Lookups only touch the requested verses."""
+
+    def __init__(self, path: str) -> None:
+        self._file = open(path, 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, book_count, chapter_count, verse_count = _HEADER.unpack_from(self._mmap)
+        if magic != MAGIC or version != VERSION:
+            raise RuntimeError(f"File {path} is not a version {VERSION} verse store")
+
+        reader = ArrayReader(self._mmap, _HEADER.size)
+        self._books = reader.take('I', book_count + 1)
+        self._chapters = reader.take('I', chapter_count + 1)
+        self._verses = reader.take('I', verse_count + 1)
+        self._present = reader.take_bytes((verse_count + 7) // 8)
+        self._blob = reader.take_bytes(len(self._mmap) - reader.position)
+
+    def close(self) -> None:
+        for view in (self._books, self._chapters, self._verses, self._present, self._blob):
+            # Tables are byte swapped copies on big endian hosts
+            if isinstance(view, memoryview):
+                view.release()
+        self._mmap.close()
+        self._file.close()
+
+    def __enter__(self) -> 'VerseStore':
+        return self
+
+    def __exit__(self, *_: object) -> None:
+        self.close()
+
+    def chapter_count(self, book: int) -> int:
+        if book < 1 or book > len(self._books) - 1:
+            return 0
+        return self._books[book] - self._books[book - 1]
+
+    def verse_count(self, book: int, chapter: int) -> int:
+        index = self._chapter_index(book, chapter)
+        if index is None:
+            return 0
+        return self._chapters[index + 1] - self._chapters[index]
+
+    def _chapter_index(self, book: int, chapter: int) -> Optional[int]:
+        if chapter < 1 or chapter > self.chapter_count(book):
+            return None
+        return self._books[book - 1] + chapter - 1
+
+    def _verse_index(self, id: int) -> Optional[int]:
+        book, chapter, verse = verse_id.unpack(id)
+        index = self._chapter_index(book, chapter)
+        if index is None or verse < 1:
+            return None
+        verse_index = self._chapters[index] + verse - 1
+        if verse_index >= self._chapters[index + 1] or not self._is_present(verse_index):
+            return None
+        return verse_index
+
+    def _is_present(self, index: int) -> bool:
+        return bool(self._present[index >> 3] >> (index & 7) & 1)
+
+    def ids(self) -> Iterator[int]:
+        """Yields the packed id of every verse in the store, in canonical order."""
+        for book in range(1, len(self._books)):
+            for chapter in range(1, self.chapter_count(book) + 1):
+                index = self._books[book - 1] + chapter - 1
+                first_verse = self._chapters[index]
+                for verse in range(1, self._chapters[index + 1] - first_verse + 1):
+                    if self._is_present(first_verse + verse - 1):
+                        yield verse_id.pack(book, chapter, verse)
+
+    def verse_bytes(self, id: int) -> Optional[memoryview]:
+        """Returns the raw encoded words of a packed verse id, or `None` if the verse does not exist."""
+        index = self._verse_index(id)
+        if index is None:
+            return None
+        return self._blob[self._verses[index]:self._verses[index + 1]]
+
+    def verse(self, id: int) -> Optional[List[StoredWord]]:
+        """Returns the words of a packed verse id, `[]` for an empty verse or `None` if the verse does not exist."""
+        data = self.verse_bytes(id)
+        return None if data is None else decode_words(data)
+
+    def verses(self, start: int, end: int) -> List[Tuple[int, List[StoredWord]]]:
+        """Returns every stored verse in the inclusive packed id range, e.g. from `verse_id.span`."""
+        result: List[Tuple[int, List[StoredWord]]] = []
+        start_book, start_chapter, _ = verse_id.unpack(start)
+        end_book = min(end >> 16, BOOK_COUNT)
+
+        for book in range(start_book, end_book + 1):
+            first_chapter = start_chapter if book == start_book else 1
+            for chapter in range(max(first_chapter, 1), self.chapter_count(book) + 1):
+                if verse_id.pack(book, chapter) > end:
+                    return result
+
+                index = self._books[book - 1] + chapter - 1
+                first_verse = self._chapters[index]
+                for verse in range(1, self._chapters[index + 1] - first_verse + 1):
+                    id = verse_id.pack(book, chapter, verse)
+                    if id > end:
+                        return result
+                    i = first_verse + verse - 1
+                    if id >= start and self._is_present(i):
+                        result.append((id, decode_words(self._blob[self._verses[i]:self._verses[i + 1]])))
+        return result
+
+    def chapter(self, book: int, chapter: int) -> List[Tuple[int, List[StoredWord]]]:
+        return self.verses(*verse_id.chapter_bounds(book, chapter))
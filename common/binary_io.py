@@ -0,0 +1,101 @@
+"""
+Helpers shared by the binary sidecar formats (offset, interval and name
+indexes, the verse store and the concordance).
+
+Every format stores little endian `u32`/`u64` arrays, string tables (`u32`
+offsets plus an end sentinel, followed by the UTF-8 blob) and pads sections
+to 8 bytes. `ArrayReader` reads those sections from a mapped or loaded file
+in place on little endian hosts, and as byte swapped copies elsewhere.
+"""
+
+from array import array
+import sys
+from typing import BinaryIO, Iterable, List, Sequence, Union
+
+Buffer = Union[bytes, memoryview]
+
+
+def u32_array(values: Iterable[int] = ()) -> array:
+    a = array('I', values)
+    assert a.itemsize == 4
+    return a
+
+
+def u64_array(values: Iterable[int] = ()) -> array:
+    a = array('Q', values)
+    assert a.itemsize == 8
+    return a
+
+
+def padding(size: int) -> bytes:
+    """Returns the zero bytes that pad a section ending at `size` to 8 bytes."""
+    return b"\0" * (-size % 8)
+
+
+def write_array(f: BinaryIO, a: array) -> None:
+    """Writes an array in little endian order, leaving `a` unchanged."""
+    if sys.byteorder != 'little':
+        a = array(a.typecode, a)
+        a.byteswap()
+    a.tofile(f)
+
+
+def write_u32(f: BinaryIO, values: Iterable[int]) -> None:
+    write_array(f, u32_array(values))
+
+
+def write_strings(f: BinaryIO, strings: List[bytes]) -> None:
+    """Writes a string table: the offset of each string plus an end sentinel, then the strings."""
+    starts = u32_array([0])
+    for s in strings:
+        starts.append(starts[-1] + len(s))
+    write_array(f, starts)
+    f.write(b"".join(strings))
+
+
+class StringTable:
+    """A string table as a sequence of UTF-8 `bytes`, for bisect when it is sorted."""
+
+    def __init__(self, starts: Sequence[int], blob: Buffer) -> None:
+        self.starts = starts
+        self.blob = blob
+
+    def __len__(self) -> int:
+        return len(self.starts) - 1
+
+    def __getitem__(self, i: int) -> bytes:
+        return bytes(self.blob[self.starts[i]:self.starts[i + 1]])
+
+
+class ArrayReader:
+    """Reads consecutive sections of a binary file from `position` on."""
+
+    def __init__(self, data: Buffer, position: int = 0) -> None:
+        self.view = memoryview(data)
+        self.position = position
+
+    def take(self, typecode: str, length: int) -> Sequence[int]:
+        """Returns the next `length` items of type `typecode` (`'I'` or `'Q'`), in place on little endian hosts."""
+        size = length * (8 if typecode == 'Q' else 4)
+        section = self.view[self.position:self.position + size]
+        self.position += size
+        if sys.byteorder == 'little':
+            return section.cast(typecode)
+        a = array(typecode)
+        a.frombytes(section)
+        a.byteswap()
+        return a
+
+    def take_bytes(self, size: int) -> memoryview:
+        section = self.view[self.position:self.position + size]
+        self.position += size
+        return section
+
+    def take_strings(self, length: int, size: int) -> StringTable:
+        """Returns the next string table of `length` strings, `size` bytes long in all."""
+        starts = self.take('I', length + 1)
+        return StringTable(starts, self.take_bytes(size))
+
+    def align(self) -> None:
+        """Skips the padding after a section."""
+        self.position += -self.position % 8
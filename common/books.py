@@ -0,0 +1,147 @@
+"""
+Registry of the 66 canonical books.
+
+Every known spelling of a book (OSIS code, English name, the names used by the
+scrollmapper Bibles, TSK abbreviations and the Strong's database
+abbreviations) is precomputed into the single `ALIASES` dict, so normalizing a
+book name is one dict lookup. Book indices are 1-based in canonical order and
+match the TSK `book_key` and the book part of packed verse ids.
+
+Aliases are matched exactly first. A case and whitespace insensitive fallback
+is only kept for spellings that are unambiguous: the TSK's `jud` is Judges
+while the Strong's database uses `Jud` for Jude.
+
+`ALIASES` accepts a spelling from any source. Parsers of a single source
+that should reject anything else look books up in that source's view
+instead, e.g. `TSK_ALIASES`.
+"""
+
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+
+class Book(NamedTuple):
+    index: int
+    osis: str
+    name: str
+    chapters: int
+    verses: int
+
+
+# osis, name, chapters, verses (KJV), TSK abbreviation, other aliases
+_BOOK_DATA = [
+    ("Gen", "Genesis", 50, 1533, "ge", ["Gen"]),
+    ("Exod", "Exodus", 40, 1213, "ex", ["Exo", "Exod"]),
+    ("Lev", "Leviticus", 27, 859, "le", ["Lev"]),
+    ("Num", "Numbers", 36, 1288, "nu", ["Num"]),
+    ("Deut", "Deuteronomy", 34, 959, "de", ["Deu", "Deut"]),
+    ("Josh", "Joshua", 24, 658, "jos", ["Jos", "Josh"]),
+    ("Judg", "Judges", 21, 618, "jud", ["Jdg", "Judg"]),
+    ("Ruth", "Ruth", 4, 85, "ru", ["Rth", "Rut"]),
+    ("1Sam", "1 Samuel", 31, 810, "1sa", ["1Sa", "I Samuel", "1Sam"]),
+    ("2Sam", "2 Samuel", 24, 695, "2sa", ["2Sa", "II Samuel", "2Sam"]),
+    ("1Kgs", "1 Kings", 22, 816, "1ki", ["1Ki", "I Kings", "1Kgs"]),
+    ("2Kgs", "2 Kings", 25, 719, "2ki", ["2Ki", "II Kings", "2Kgs"]),
+    ("1Chr", "1 Chronicles", 29, 942, "1ch", ["1Ch", "I Chronicles", "1Chr"]),
+    ("2Chr", "2 Chronicles", 36, 822, "2ch", ["2Ch", "II Chronicles", "2Chr"]),
+    ("Ezra", "Ezra", 10, 280, "ezr", ["Ezr"]),
+    ("Neh", "Nehemiah", 13, 406, "ne", ["Neh"]),
+    ("Esth", "Esther", 10, 167, "es", ["Est", "Esth"]),
+    ("Job", "Job", 42, 1070, "job", []),
+    ("Ps", "Psalms", 150, 2461, "ps", ["Psa", "Psalm"]),
+    ("Prov", "Proverbs", 31, 915, "pr", ["Pro", "Prov"]),
+    ("Eccl", "Ecclesiastes", 12, 222, "ec", ["Ecc", "Eccl"]),
+    ("Song", "Song of Solomon", 8, 117, "so", ["Sol", "Son", "Sng", "Song of Songs"]),
+    ("Isa", "Isaiah", 66, 1292, "isa", []),
+    ("Jer", "Jeremiah", 52, 1364, "jer", []),
+    ("Lam", "Lamentations", 5, 154, "la", ["Lam"]),
+    ("Ezek", "Ezekiel", 48, 1273, "eze", ["Eze", "Ezk"]),
+    ("Dan", "Daniel", 12, 357, "da", ["Dan"]),
+    ("Hos", "Hosea", 14, 197, "ho", ["Hos"]),
+    ("Joel", "Joel", 3, 73, "joe", ["Joe", "Jol"]),
+    ("Amos", "Amos", 9, 146, "am", ["Amo"]),
+    ("Obad", "Obadiah", 1, 21, "ob", ["Oba"]),
+    ("Jonah", "Jonah", 4, 48, "jon", ["Jon"]),
+    ("Mic", "Micah", 7, 105, "mic", []),
+    ("Nah", "Nahum", 3, 47, "na", ["Nah"]),
+    ("Hab", "Habakkuk", 3, 56, "hab", []),
+    ("Zeph", "Zephaniah", 3, 53, "zep", ["Zep"]),
+    ("Hag", "Haggai", 2, 38, "hag", []),
+    ("Zech", "Zechariah", 14, 211, "zec", ["Zec"]),
+    ("Mal", "Malachi", 4, 55, "mal", []),
+    ("Matt", "Matthew", 28, 1071, "mt", ["Mat"]),
+    ("Mark", "Mark", 16, 678, "mr", ["Mar", "Mrk"]),
+    ("Luke", "Luke", 24, 1151, "lu", ["Luk"]),
+    ("John", "John", 21, 879, "joh", ["Joh", "Jhn"]),
+    ("Acts", "Acts", 28, 1007, "ac", ["Act"]),
+    ("Rom", "Romans", 16, 433, "ro", ["Rom"]),
+    ("1Cor", "1 Corinthians", 16, 437, "1co", ["1Co", "I Corinthians"]),
+    ("2Cor", "2 Corinthians", 13, 257, "2co", ["2Co", "II Corinthians"]),
+    ("Gal", "Galatians", 6, 149, "ga", ["Gal"]),
+    ("Eph", "Ephesians", 6, 155, "eph", []),
+    ("Phil", "Philippians", 4, 104, "php", ["Php", "Phi"]),
+    ("Col", "Colossians", 4, 95, "col", []),
+    ("1Thess", "1 Thessalonians", 5, 89, "1th", ["1Th", "I Thessalonians"]),
+    ("2Thess", "2 Thessalonians", 3, 47, "2th", ["2Th", "II Thessalonians"]),
+    ("1Tim", "1 Timothy", 6, 113, "1ti", ["1Ti", "I Timothy"]),
+    ("2Tim", "2 Timothy", 4, 83, "2ti", ["2Ti", "II Timothy"]),
+    ("Titus", "Titus", 3, 46, "tit", ["Tit"]),
+    ("Phlm", "Philemon", 1, 25, "phm", ["Phm"]),
+    ("Heb", "Hebrews", 13, 303, "heb", []),
+    ("Jas", "James", 5, 108, "jas", []),
+    ("1Pet", "1 Peter", 5, 105, "1pe", ["1Pe", "I Peter"]),
+    ("2Pet", "2 Peter", 3, 61, "2pe", ["2Pe", "II Peter"]),
+    ("1John", "1 John", 5, 105, "1jo", ["1Jo", "1Jn", "I John"]),
+    ("2John", "2 John", 1, 13, "2jo", ["2Jo", "2Jn", "II John"]),
+    ("3John", "3 John", 1, 14, "3jo", ["3Jo", "3Jn", "III John"]),
+    ("Jude", "Jude", 1, 25, "jude", ["Jud"]),
+    ("Rev", "Revelation", 22, 404, "re", ["Rev", "Revelation of John"]),
+]
+
+BOOKS: List[Book] = [Book(i, osis, name, chapters, verses) for i, (osis, name, chapters, verses, _, _) in enumerate(_BOOK_DATA, 1)]
+
+# Only the TSK's own abbreviations, so the TSK parser can reject spellings
+# that are valid elsewhere but never appear in the TSK
+TSK_ALIASES: Dict[str, Book] = {tsk: book for book, (_, _, _, _, tsk, _) in zip(BOOKS, _BOOK_DATA)}
+
+
+def _normalize(name: str) -> str:
+    return "".join(name.split()).replace(".", "").casefold()
+
+
+def _build_aliases() -> Tuple[Dict[str, Book], Set[str]]:
+    exact: Dict[str, Book] = {}
+    for book, (_, _, _, _, tsk, aliases) in zip(BOOKS, _BOOK_DATA):
+        for alias in [book.osis, book.name, tsk, *aliases]:
+            if alias in exact and exact[alias] != book:
+                raise RuntimeError(f"Book alias {alias} is ambiguous")
+            exact[alias] = book
+
+    normalized: Dict[str, Optional[Book]] = {}
+    for alias, book in exact.items():
+        key = _normalize(alias)
+        normalized[key] = book if normalized.get(key, book) == book else None
+
+    aliases = {key: book for key, book in normalized.items() if book is not None and key not in exact}
+    aliases.update(exact)
+    ambiguous = {key for key, book in normalized.items() if book is None}
+    return aliases, ambiguous
+
+
+ALIASES, _AMBIGUOUS = _build_aliases()
+
+
+def lookup(name: str) -> Optional[Book]:
+    """Returns the book with the given alias, or `None` if the name is unknown or ambiguous."""
+    book = ALIASES.get(name)
+    if book is None:
+        key = _normalize(name)
+        if key not in _AMBIGUOUS:
+            book = ALIASES.get(key)
+    return book
+
+
+def get(name: str) -> Book:
+    book = lookup(name)
+    if book is None:
+        raise RuntimeError(f"Unknown book: {name}")
+    return book
@@ -0,0 +1,55 @@
+"""
+In-process access to the converters.
+
+The converters live in their own directories next to their helper modules
+(`verse_store`, `tsk_parser`, `strongsData`, ...) and import those as
+top-level modules, the way they resolve when run as scripts. `load` puts a
+converter's directory on `sys.path` and imports it, so a pipeline can call
+every converter's library function in one warm interpreter:
+
+    bible_converter = converters.load("bible_converter")
+    stats = bible_converter.convert("kjv.json", format="store", output="kjv.vstore")
+
+Each converter exposes a function taking input paths and output paths, and
+returning its counters (see `common.instrument`):
+
+    bible_converter.convert(path, format, output, compress, translation, concordance, index)
+    open_xref.convert(path, output, compress, columnar, target_order, index_output, edges_output)
+    tsk_xref.convert(path, output, intervals_output, jobs, compress, index_output, edges_output)
+    merge_xrefs.merge(open_xref_path, tsk_path, output, compress, columnar, index_output)
+    hbnd.convert(path, output, compress, index_output, name_index_output)
+    hbnd.join_occurrences(path, bible_path, output, compress, index_output)
+    strong2csv.convert(numbers, db_path, output_path, compress)
+"""
+
+import importlib
+import os
+import sys
+from types import ModuleType
+from typing import Dict
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Converter name -> script path, relative to the repository root
+SCRIPTS: Dict[str, str] = {
+    "bible_converter": "bible_converter/bible_converter.py",
+    "open_xref": "xrefs/open_xref/open_xref.py",
+    "tsk_xref": "xrefs/tsk/tsk_xref.py",
+    "merge_xrefs": "xrefs/merge_xrefs.py",
+    "hbnd": "hbnd_converter/hbnd.py",
+    "strong2csv": "strongs/strong2csv.py",
+}
+
+
+def script_path(name: str) -> str:
+    if name not in SCRIPTS:
+        raise RuntimeError(f"Unknown converter: {name}")
+    return os.path.join(REPO, SCRIPTS[name])
+
+
+def load(name: str) -> ModuleType:
+    """Imports a converter by name, e.g. `load("tsk_xref")`."""
+    directory = os.path.dirname(script_path(name))
+    if directory not in sys.path:
+        sys.path.insert(0, directory)
+    return importlib.import_module(name)
@@ -0,0 +1,177 @@
+"""
+Per-stage timing, memory and counter instrumentation for the converters.
+
+A converter wraps each stage of its work (read, parse, transform, serialize,
+write, ...) in `instrumentation.stage(name)` and bumps counters (rows,
+verses, words, refs, ...) with `instrumentation.count`. Stages are timed with
+`perf_counter_ns`; a stage that runs more than once (e.g. per chunk)
+accumulates its time and call count.
+
+`--report PATH` writes the stages and counters as a JSON report when the
+converter finishes, `--trace-memory` adds the `tracemalloc` peak of each stage
+(slow, so off by default), and `--profile PATH` dumps a cProfile of the whole
+run for `python -m pstats` or snakeviz.
+
+Peak RSS only exists for the whole process, so a stage records the process
+peak as of its end (`process_peak_rss_kb`), which later stages repeat once it
+has been reached. The memory a stage itself allocated is its `tracemalloc`
+peak (`peak_traced_bytes`): the peak is reset when the stage starts, and a
+stage nested in another counts towards the outer stage's peak. Without these options only the cheap
+timers and counters run, and `tracemalloc` and `cProfile` are never imported.
+"""
+
+import argparse
+from contextlib import contextmanager
+import json
+import sys
+import time
+from types import TracebackType
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Type
+
+if TYPE_CHECKING:
+    import cProfile
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+def add_instrument_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--report", metavar="PATH", help="write per-stage timings, memory and counters as JSON")
+    parser.add_argument("--profile", metavar="PATH", help="write a cProfile dump of the run")
+    parser.add_argument("--trace-memory", action="store_true", help="record the tracemalloc peak of every stage (slow)")
+
+
+def peak_rss_kb() -> Optional[int]:
+    """Returns the peak resident set size of this process so far, in KiB."""
+    # On Linux, ru_maxrss carries over the peak of the parent that forked the
+    # process, so a converter started from a large process reports the parent's
+    # peak. VmHWM belongs to the address space set up by exec.
+    try:
+        with open("/proc/self/status", 'rb') as f:
+            for line in f:
+                if line.startswith(b"VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+class Stage:
+    __slots__ = ('name', 'calls', 'elapsed_ns', 'process_peak_rss_kb', 'peak_traced_bytes')
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.calls = 0
+        self.elapsed_ns = 0
+        self.process_peak_rss_kb: Optional[int] = None
+        self.peak_traced_bytes: Optional[int] = None
+
+    def to_dict(self) -> dict:
+        stage = {
+            "name": self.name,
+            "calls": self.calls,
+            "elapsed_ns": self.elapsed_ns,
+            "elapsed_s": round(self.elapsed_ns / 1e9, 6),
+            "process_peak_rss_kb": self.process_peak_rss_kb,
+        }
+        if self.peak_traced_bytes is not None:
+            stage["peak_traced_bytes"] = self.peak_traced_bytes
+        return stage
+
+
+class Instrumentation:
+    def __init__(self, name: str, report_path: Optional[str] = None, profile_path: Optional[str] = None,
+                 trace_memory: bool = False) -> None:
+        self.name = name
+        self.report_path = report_path
+        self.profile_path = profile_path
+        self.trace_memory = trace_memory
+        self.stages: Dict[str, Stage] = {}
+        self.counters: Dict[str, int] = {}
+        self._start_ns = 0
+        self._elapsed_ns = 0
+        self._profiler: Optional['cProfile.Profile'] = None
+        # Traced peak so far of each running stage, innermost last
+        self._traced_peaks: List[int] = []
+
+    @classmethod
+    def from_args(cls, name: str, args: argparse.Namespace) -> 'Instrumentation':
+        return cls(name, args.report, args.profile, args.trace_memory)
+
+    def start(self) -> None:
+        if self.trace_memory:
+            import tracemalloc
+            tracemalloc.start()
+        if self.profile_path:
+            import cProfile
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        self._start_ns = time.perf_counter_ns()
+
+    def finish(self) -> None:
+        """Stops timing and profiling, then writes the report and profile that were asked for."""
+        self._elapsed_ns = time.perf_counter_ns() - self._start_ns
+        if self._profiler is not None:
+            self._profiler.disable()
+            self._profiler.dump_stats(self.profile_path)
+            print(f"Wrote profile: {self.profile_path}")
+        if self.trace_memory:
+            import tracemalloc
+            tracemalloc.stop()
+        if self.report_path:
+            with open(self.report_path, 'w', encoding='utf-8') as f:
+                json.dump(self.report(), f, indent=2)
+            print(f"Wrote report: {self.report_path}")
+
+    def __enter__(self) -> 'Instrumentation':
+        self.start()
+        return self
+
+    def __exit__(self, exc_type: Optional[Type[BaseException]], exc_value: Optional[BaseException],
+                 traceback: Optional[TracebackType]) -> None:
+        self.finish()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[Stage]:
+        stage = self.stages.get(name)
+        if stage is None:
+            stage = self.stages[name] = Stage(name)
+        if self.trace_memory:
+            import tracemalloc
+            if self._traced_peaks:
+                # Resetting the peak would lose the enclosing stage's peak so far
+                self._traced_peaks[-1] = max(self._traced_peaks[-1], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+            self._traced_peaks.append(0)
+
+        start = time.perf_counter_ns()
+        try:
+            yield stage
+        finally:
+            stage.elapsed_ns += time.perf_counter_ns() - start
+            stage.calls += 1
+            stage.process_peak_rss_kb = peak_rss_kb()
+            if self.trace_memory:
+                traced = max(self._traced_peaks.pop(), tracemalloc.get_traced_memory()[1])
+                stage.peak_traced_bytes = max(stage.peak_traced_bytes or 0, traced)
+                if self._traced_peaks:
+                    self._traced_peaks[-1] = max(self._traced_peaks[-1], traced)
+
+    def count(self, name: str, n: int = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def report(self) -> dict:
+        return {
+            "converter": self.name,
+            "argv": sys.argv[1:],
+            "elapsed_ns": self._elapsed_ns,
+            "elapsed_s": round(self._elapsed_ns / 1e9, 6),
+            "peak_rss_kb": peak_rss_kb(),
+            "stages": [stage.to_dict() for stage in self.stages.values()],
+            "counters": self.counters,
+        }
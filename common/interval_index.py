@@ -0,0 +1,92 @@
+"""
+Static interval index over packed verse ids.
+
+Intervals are stored as three parallel arrays sorted by start, together with a
+running maximum of the end points. A point or range query binary searches both
+the start array and the running maximum to find the only slice that can
+contain overlapping intervals, so ranges never need to be expanded verse by
+verse.
+
+File layout (little endian):
+    magic  b"AXIV"
+    u32    version
+    u32    interval count (n)
+    u32[n] starts
+    u32[n] ends
+    u32[n] payloads
+"""
+
+from array import array
+from bisect import bisect_left, bisect_right
+import struct
+import sys
+from typing import Iterable, List, Tuple
+
+from common.binary_io import u32_array, write_array
+
+MAGIC = b"AXIV"
+VERSION = 1
+
+_HEADER = struct.Struct("<4sII")
+
+
+class IntervalIndex:
+    def __init__(self, starts: array, ends: array, payloads: array) -> None:
+        self.starts = starts
+        self.ends = ends
+        self.payloads = payloads
+
+        self.max_ends = u32_array()
+        current = 0
+        for end in ends:
+            if end > current:
+                current = end
+            self.max_ends.append(current)
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    @staticmethod
+    def build(intervals: Iterable[Tuple[int, int, int]]) -> 'IntervalIndex':
+        """Builds an index from `(start, end, payload)` triples. Both bounds are inclusive."""
+        ordered = sorted(intervals)
+        return IntervalIndex(
+            u32_array(i[0] for i in ordered),
+            u32_array(i[1] for i in ordered),
+            u32_array(i[2] for i in ordered),
+        )
+
+    def overlapping(self, start: int, end: int) -> List[int]:
+        """Returns the payloads of every interval that overlaps `[start, end]`, ordered by interval start."""
+        hi = bisect_right(self.starts, end)
+        lo = bisect_left(self.max_ends, start, 0, hi)
+        ends = self.ends
+        payloads = self.payloads
+        return [payloads[i] for i in range(lo, hi) if ends[i] >= start]
+
+    def stab(self, point: int) -> List[int]:
+        """Returns the payloads of every interval containing `point`."""
+        return self.overlapping(point, point)
+
+    def save(self, path: str) -> None:
+        with open(path, 'wb') as f:
+            f.write(_HEADER.pack(MAGIC, VERSION, len(self.starts)))
+            for a in (self.starts, self.ends, self.payloads):
+                write_array(f, a)
+
+    @staticmethod
+    def load(path: str) -> 'IntervalIndex':
+        with open(path, 'rb') as f:
+            magic, version, count = _HEADER.unpack(f.read(_HEADER.size))
+            if magic != MAGIC or version != VERSION:
+                raise RuntimeError(f"File {path} is not a version {VERSION} interval index")
+
+            arrays: List[array] = []
+            for _ in range(3):
+                a = u32_array()
+                a.fromfile(f, count)
+                if sys.byteorder != 'little':
+                    a.byteswap()
+                arrays.append(a)
+
+        return IntervalIndex(arrays[0], arrays[1], arrays[2])
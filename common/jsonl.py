@@ -0,0 +1,182 @@
+"""
+Shared JSON Lines reader and writer.
+
+Records are encoded with `orjson` when it is installed, falling back to a
+single reusable `json.JSONEncoder` (and likewise for decoding); either is
+loaded on first use. Both produce compact UTF-8 output with full string
+escaping, and lines are written through a large buffered binary stream,
+optionally compressed (see `common.output`).
+
+Writers can also index the records they write by key (see
+`common.offset_index`), and `IndexedJsonl` reads single records back through
+that index.
+"""
+
+import json
+import mmap
+import os
+from types import TracebackType
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Tuple, Type, Union
+
+from common.offset_index import Key, OffsetIndex, index_path
+from common.output import DEFAULT_BUFFER_SIZE, compressed_path, open_input, open_output
+
+_encode: Optional[Callable[[Any], bytes]] = None
+_decode: Optional[Callable[[bytes], Any]] = None
+
+
+def _make_decoder() -> Callable[[bytes], Any]:
+    try:
+        import orjson
+    except ImportError:
+        return json.loads
+    return orjson.loads
+
+
+def _make_encoder() -> Callable[[Any], bytes]:
+    try:
+        import orjson
+    except ImportError:
+        encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+        return lambda record: encoder.encode(record).encode('utf-8')
+    return orjson.dumps
+
+
+def encoder() -> Callable[[Any], bytes]:
+    """
+    Returns the record encoder. `orjson` pulls in `uuid`, `zoneinfo` and
+    `datetime` when imported, so it is only loaded the first time records are
+    actually encoded rather than on every converter's startup.
+    """
+    global _encode
+    if _encode is None:
+        _encode = _make_encoder()
+    return _encode
+
+
+def decoder() -> Callable[[bytes], Any]:
+    """Returns the record decoder, loaded on first use like `encoder`."""
+    global _decode
+    if _decode is None:
+        _decode = _make_decoder()
+    return _decode
+
+
+def encode(record: Any) -> bytes:
+    return encoder()(record)
+
+
+def decode(line: bytes) -> Any:
+    return decoder()(line)
+
+
+def read_jsonl(path: str, buffer_size: int = DEFAULT_BUFFER_SIZE) -> Iterator[Any]:
+    decode = decoder()
+    with open_input(path, buffer_size) as f:
+        for line in f:
+            if line.strip():
+                yield decode(line)
+
+
+class IndexedJsonl:
+    """
+    Reads single records of an uncompressed JSONL file through its offset
+    index. Both files are mapped, so nothing is parsed but the records asked for:
+
+        with IndexedJsonl("xrefs.jsonl") as xrefs:
+            record = xrefs.get(verse_id.parse_osis("Gen.1.1"))
+    """
+
+    def __init__(self, path: str, index: Optional[str] = None) -> None:
+        self.index = OffsetIndex.load(index or index_path(path))
+        self._data: Union[mmap.mmap, bytes] = b""
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size:
+                self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._decode = decoder()
+
+    def get(self, key: Key) -> Optional[Any]:
+        """Returns the first record with `key`, or `None`."""
+        found = self.index.find(key)
+        if not found:
+            return None
+        offset, length = found[0]
+        return self._decode(self._data[offset:offset + length])
+
+    def get_all(self, key: Key) -> List[Any]:
+        """Returns every record with `key`, in file order."""
+        return [self._decode(self._data[offset:offset + length]) for offset, length in self.index.find(key)]
+
+    def __contains__(self, key: Key) -> bool:
+        return bool(self.index.find(key))
+
+    def close(self) -> None:
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+
+    def __enter__(self) -> 'IndexedJsonl':
+        return self
+
+    def __exit__(self, exc_type: Optional[Type[BaseException]], exc: Optional[BaseException], tb: Optional[TracebackType]) -> None:
+        self.close()
+
+
+class JsonlWriter:
+    def __init__(self, path: str, buffer_size: int = DEFAULT_BUFFER_SIZE, compress: str = "none",
+                 index: Optional[str] = None) -> None:
+        """
+        Opens `path`, plus the compression's file suffix, for writing. With
+        `index`, every record written with a key is indexed there on close.
+        """
+        self.path = compressed_path(path, compress)
+        if index and compress != "none":
+            raise RuntimeError(f"Can't index {self.path}: compressed output can't be read at an offset")
+        self.index = index
+        self.count = 0
+        # Bytes written so far, before compression
+        self.offset = 0
+        self._entries: List[Tuple[Key, int, int]] = []
+        self._file = open_output(self.path, compress, buffer_size)
+        self._encode = encoder()
+
+    def write(self, record: Any, key: Optional[Key] = None) -> None:
+        line = self._encode(record)
+        self._file.write(line)
+        self._file.write(b"\n")
+        if self.index and key is not None:
+            self._entries.append((key, self.offset, len(line)))
+        self.count += 1
+        self.offset += len(line) + 1
+
+    def write_encoded(self, lines: bytes, count: int, entries: Iterable[Tuple[Key, int, int]] = ()) -> None:
+        """
+        Writes `count` lines that were already encoded with `encode`, e.g. by a
+        worker process. `entries` holds the key, offset within `lines` and
+        length of each line to index.
+        """
+        self._file.write(lines)
+        if self.index:
+            self._entries.extend((key, self.offset + offset, length) for key, offset, length in entries)
+        self.count += count
+        self.offset += len(lines)
+
+    def close(self, save_index: bool = True) -> None:
+        """
+        Closes the output and writes the index. With `save_index` unset, the
+        index is not written and any index left at its path by an earlier
+        run is removed, as it no longer matches the output.
+        """
+        self._file.close()
+        if not self.index:
+            return
+        if save_index:
+            OffsetIndex.build(self._entries).save(self.index)
+        elif os.path.exists(self.index):
+            os.remove(self.index)
+
+    def __enter__(self) -> 'JsonlWriter':
+        return self
+
+    def __exit__(self, exc_type: Optional[Type[BaseException]], exc: Optional[BaseException], tb: Optional[TracebackType]) -> None:
+        # After an error the output is incomplete, so it isn't indexed
+        self.close(save_index=exc_type is None)
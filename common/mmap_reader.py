@@ -0,0 +1,79 @@
+"""
+Memory-mapped CSV/TSV reading for the large converter inputs.
+
+The file is mapped read-only and split into chunks of roughly `chunk_bytes`
+that always end on a line boundary. Only one chunk at a time is decoded and
+handed to `csv.reader`, so rows are produced without first reading the whole
+file into Python strings:
+
+    for row in read_rows("tskxref.csv", "\\t"):
+        ...
+
+`line_chunks` exposes the chunk boundaries, with the index of each chunk's
+first line, so a chunk can be parsed by another process that maps the same
+file (`map_file` and `chunk_rows`) and only receives the three integers.
+
+Chunks are split on newlines, so quoted fields must not contain line breaks;
+none of the converter inputs have them. Each chunk is parsed like a file
+opened with `newline=''`, so rows are the same as with `open` + `csv.reader`.
+"""
+
+from contextlib import contextmanager
+import csv
+import io
+import mmap
+import os
+from typing import Iterator, List, NamedTuple, Union
+
+# Decoded chunks are held by StringIO as up to 4 bytes per character, so
+# chunks are kept small
+DEFAULT_CHUNK_BYTES = 1 << 18
+
+Buffer = Union[mmap.mmap, bytes]
+
+
+class LineChunk(NamedTuple):
+    start: int
+    end: int
+    # Index of the chunk's first line in the file
+    first_line: int
+
+
+@contextmanager
+def map_file(path: str) -> Iterator[Buffer]:
+    """Maps `path` read-only. Empty files, which cannot be mapped, give empty bytes."""
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield b""
+            return
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            yield data
+        finally:
+            data.close()
+
+
+def line_chunks(data: Buffer, chunk_bytes: int = DEFAULT_CHUNK_BYTES) -> Iterator[LineChunk]:
+    """Splits `data` into chunks of at least `chunk_bytes` (except the last) that end after a newline."""
+    size = len(data)
+    start = 0
+    line = 0
+    while start < size:
+        end = data.find(b"\n", start + chunk_bytes - 1) if start + chunk_bytes < size else -1
+        end = size if end < 0 else end + 1
+        yield LineChunk(start, end, line)
+        line += data[start:end].count(b"\n")
+        start = end
+
+
+def chunk_rows(data: Buffer, chunk: LineChunk, delimiter: str = ",") -> Iterator[List[str]]:
+    """Parses the rows of one chunk."""
+    text = data[chunk.start:chunk.end].decode('utf-8')
+    return csv.reader(io.StringIO(text, newline=''), delimiter=delimiter)
+
+
+def read_rows(path: str, delimiter: str = ",", chunk_bytes: int = DEFAULT_CHUNK_BYTES) -> Iterator[List[str]]:
+    """Yields every row of the CSV (or TSV, with `delimiter="\\t"`) file at `path`."""
+    with map_file(path) as data:
+        for chunk in line_chunks(data, chunk_bytes):
+            yield from chunk_rows(data, chunk, delimiter)
@@ -0,0 +1,139 @@
+"""
+Sidecar index of the byte offset and length of each record in a JSONL file.
+
+Writers record the key of each line they write (a packed verse id, or a
+string such as a name or Strong's number) with the line's offset and length,
+and save them sorted by key next to the output as `<output>.idx`. Looking a
+record up is then one binary search followed by a single read of that line,
+with no need to parse the file from the top (see `common.jsonl.IndexedJsonl`).
+Lines may be written in any order and several lines may share a key; lines
+with the same key keep their file order.
+
+`OffsetIndex.load` maps the file and reads the arrays in place, so loading
+takes the same time however large the index is.
+
+Offsets are into the uncompressed file, so only uncompressed output is indexed.
+
+File layout (little endian, each section padded to 8 bytes):
+    magic          b"AXOI"
+    u32            version
+    u32            key type: 0 for u32 verse ids, 1 for UTF-8 strings
+    u32            record count (n)
+    u32            key blob size (b), 0 for verse ids
+    keys           verse ids: u32[n] ascending
+                   strings: u32[n + 1] offsets of each key in the blob, then
+                   the blob of keys, ascending by their UTF-8 bytes
+    u64[n]         line offsets
+    u32[n]         line lengths, without the newline
+"""
+
+import argparse
+from bisect import bisect_left, bisect_right
+import mmap
+import struct
+from typing import Iterable, List, Sequence, Tuple, Union
+
+from common.binary_io import ArrayReader, StringTable, padding, u32_array, u64_array, write_array, write_u32
+
+MAGIC = b"AXOI"
+VERSION = 2
+
+KEY_IDS = 0
+KEY_STRINGS = 1
+
+Key = Union[int, str]
+
+_HEADER = struct.Struct("<4sIIII4x")
+
+
+def add_index_argument(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--index", action="store_true",
+                        help="also write an offset index of the output (<output>.idx) for seeking to single records")
+
+
+def index_path(output: str) -> str:
+    return f"{output}.idx"
+
+
+class OffsetIndex:
+    def __init__(self, key_type: int, keys: Sequence, offsets: Sequence[int], lengths: Sequence[int]) -> None:
+        self.key_type = key_type
+        # Verse ids, or a `StringTable`
+        self.keys = keys
+        self.offsets = offsets
+        self.lengths = lengths
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    @staticmethod
+    def build(entries: Iterable[Tuple[Key, int, int]]) -> 'OffsetIndex':
+        """Builds an index from `(key, offset, length)` entries, in file order. Keys must all be ints or all strings."""
+        entries = list(entries)
+        strings = bool(entries) and isinstance(entries[0][0], str)
+        if any(isinstance(entry[0], str) != strings for entry in entries):
+            raise RuntimeError("Offset index keys must be all verse ids or all strings")
+
+        if strings:
+            encoded = [entry[0].encode('utf-8') for entry in entries]
+            order = sorted(range(len(entries)), key=encoded.__getitem__)
+            starts = u32_array([0])
+            for i in order:
+                starts.append(starts[-1] + len(encoded[i]))
+            keys: Sequence = StringTable(starts, b"".join(encoded[i] for i in order))
+        else:
+            order = sorted(range(len(entries)), key=lambda i: entries[i][0])
+            keys = u32_array(entries[i][0] for i in order)
+
+        return OffsetIndex(
+            KEY_STRINGS if strings else KEY_IDS,
+            keys,
+            u64_array(entries[i][1] for i in order),
+            u32_array(entries[i][2] for i in order),
+        )
+
+    def find(self, key: Key) -> List[Tuple[int, int]]:
+        """Returns the offset and length of every line with `key`, in file order."""
+        if isinstance(key, str) != (self.key_type == KEY_STRINGS):
+            raise RuntimeError(f"Key {key!r} does not match the index's key type")
+        value = key.encode('utf-8') if isinstance(key, str) else key
+        lo = bisect_left(self.keys, value)
+        hi = bisect_right(self.keys, value, lo)
+        return [(self.offsets[i], self.lengths[i]) for i in range(lo, hi)]
+
+    def save(self, path: str) -> None:
+        blob_size = len(self.keys.blob) if isinstance(self.keys, StringTable) else 0
+        with open(path, 'wb') as f:
+            f.write(_HEADER.pack(MAGIC, VERSION, self.key_type, len(self), blob_size))
+            if isinstance(self.keys, StringTable):
+                write_u32(f, self.keys.starts)
+                f.write(self.keys.blob)
+            else:
+                write_u32(f, self.keys)
+            f.write(padding(f.tell()))
+            write_array(f, u64_array(self.offsets))
+            f.write(padding(f.tell()))
+            write_u32(f, self.lengths)
+
+    @staticmethod
+    def load(path: str) -> 'OffsetIndex':
+        """Maps the index at `path`. Arrays are read in place on little endian hosts."""
+        with open(path, 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(mapped) < _HEADER.size:
+            raise RuntimeError(f"File {path} is not a version {VERSION} offset index")
+        magic, version, key_type, count, blob_size = _HEADER.unpack_from(mapped)
+        if magic != MAGIC or version != VERSION or key_type not in (KEY_IDS, KEY_STRINGS):
+            raise RuntimeError(f"File {path} is not a version {VERSION} offset index")
+
+        reader = ArrayReader(mapped, _HEADER.size)
+        if key_type == KEY_STRINGS:
+            keys: Sequence = reader.take_strings(count, blob_size)
+        else:
+            keys = reader.take('I', count)
+        reader.align()
+        offsets = reader.take('Q', count)
+        reader.align()
+        lengths = reader.take('I', count)
+        # The views keep the mapping open for as long as the index is used
+        return OffsetIndex(key_type, keys, offsets, lengths)
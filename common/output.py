@@ -0,0 +1,71 @@
+"""
+Streaming output files with optional compression.
+
+Converters open their text outputs through `open_output`, which compresses in
+the same pass as the data is written instead of compressing the finished file
+afterwards, and `open_input` reads them back. gzip uses the standard library; zstd needs the optional
+`zstandard` package and compresses on all cores.
+"""
+
+import argparse
+import io
+from types import ModuleType
+from typing import BinaryIO, Optional
+
+COMPRESSIONS = ["none", "gzip", "zstd"]
+
+SUFFIXES = {
+    "none": "",
+    "gzip": ".gz",
+    "zstd": ".zst",
+}
+
+DEFAULT_BUFFER_SIZE = 1 << 20
+
+
+def add_compress_argument(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--compress", choices=COMPRESSIONS, default="none",
+                        help="compress text outputs while they are written (default none)")
+
+
+def compressed_path(path: str, compress: str) -> str:
+    """Returns `path` with the file suffix of the given compression."""
+    return path + SUFFIXES[compress]
+
+
+def _zstandard(purpose: str) -> ModuleType:
+    # Imported on first use, so CLIs that never compress skip its import time
+    try:
+        import zstandard
+    except ImportError:
+        raise RuntimeError(f"zstd {purpose} requires the 'zstandard' package")
+    return zstandard
+
+
+def open_output(path: str, compress: str = "none", buffer_size: int = DEFAULT_BUFFER_SIZE, level: Optional[int] = None) -> BinaryIO:
+    """Opens `path` for buffered binary writing, compressing with `compress` as data is written."""
+    if compress == "none":
+        return open(path, 'wb', buffering=buffer_size)
+
+    if compress == "gzip":
+        import gzip
+        raw = gzip.open(path, 'wb', compresslevel=6 if level is None else level)
+    elif compress == "zstd":
+        compressor = _zstandard("compression").ZstdCompressor(level=3 if level is None else level, threads=-1)
+        raw = compressor.stream_writer(open(path, 'wb'), closefd=True)
+    else:
+        raise RuntimeError(f"Unknown compression: {compress}")
+
+    # Compressor writes are costly per call, so batch small writes before they reach it
+    return io.BufferedWriter(raw, buffer_size)  # type: ignore[arg-type]
+
+
+def open_input(path: str, buffer_size: int = DEFAULT_BUFFER_SIZE) -> BinaryIO:
+    """Opens a file written by `open_output`, picking the decompressor from the file suffix."""
+    if path.endswith(SUFFIXES["gzip"]):
+        import gzip
+        return io.BufferedReader(gzip.open(path, 'rb'), buffer_size)  # type: ignore[arg-type]
+    if path.endswith(SUFFIXES["zstd"]):
+        raw = _zstandard("decompression").ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True)
+        return io.BufferedReader(raw, buffer_size)  # type: ignore[arg-type]
+    return open(path, 'rb', buffering=buffer_size)
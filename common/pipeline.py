@@ -0,0 +1,413 @@
+"""
+Builds the whole data set by running every converter as one pipeline.
+
+Each node declares the converter it runs, the files it reads and the files it
+writes into the output directory. A node that reads another node's output
+depends on it, so the nodes form a DAG: the TSK and open_xref conversions
+both feed `merge_xrefs`, and the Bible and names conversions both feed the
+`name_occurrences` join, while Strong's is independent. Nodes run in a process pool as soon as their dependencies have
+finished, up to `--jobs` at a time:
+
+    python common/pipeline.py --out build --bible kjv.json --open-xref cross_references.csv \\
+        --tsk tskxref.csv --names hbnd.csv --strongs-db av1769s.bib --strongs H430,G2316
+
+Nodes whose source was not given are left out, along with everything that
+depends on them. A node is skipped when its outputs exist and the SHA-256 of
+its inputs, its options, its converter's directory and every repository
+module it imported (shared `common/` code included) matches the last
+successful run (kept in `<out>/pipeline_state.json`); `--force` rebuilds
+everything. Converter output goes to `<out>/logs/<node>.log`.
+
+When the run finishes, the pipeline prints each node's time and the critical
+path, the chain of dependent nodes that bounds the wall time, and writes them
+with each node's stages and counters to `<out>/pipeline_report.json`.
+Exits with status 1 if any node failed.
+"""
+
+import argparse
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from contextlib import redirect_stdout
+import glob
+import hashlib
+import json
+import os
+import sys
+import time
+from types import ModuleType
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Set
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common import converters
+from common.instrument import Instrumentation
+
+STATE_FILE = "pipeline_state.json"
+REPORT_FILE = "pipeline_report.json"
+HASH_BLOCK_SIZE = 1 << 20
+
+# Node statuses that let dependent nodes run, and those that stop them
+DONE = ("built", "skipped")
+FAILED = ("failed", "blocked")
+
+# Source name -> command line option that provides it
+SOURCES: Dict[str, str] = {
+    "bible": "--bible",
+    "open_xref": "--open-xref",
+    "tsk": "--tsk",
+    "names": "--names",
+    "strongs_db": "--strongs-db",
+}
+
+# Runs a node's converter: (module, input paths, output paths, options, instrumentation) -> counters
+Runner = Callable[[ModuleType, List[str], List[str], Dict[str, str], Instrumentation], Dict[str, int]]
+
+
+def _bible(module: ModuleType, inputs: List[str], outputs: List[str], options: Dict[str, str],
+           instrumentation: Instrumentation) -> Dict[str, int]:
+    return module.convert(inputs[0], "jsonl", outputs[0], index=outputs[1], instrumentation=instrumentation)
+
+
+def _bible_store(module: ModuleType, inputs: List[str], outputs: List[str], options: Dict[str, str],
+                 instrumentation: Instrumentation) -> Dict[str, int]:
+    return module.convert(inputs[0], "store", outputs[0], concordance=outputs[1], instrumentation=instrumentation)
+
+
+def _open_xref(module: ModuleType, inputs: List[str], outputs: List[str], options: Dict[str, str],
+               instrumentation: Instrumentation) -> Dict[str, int]:
+    return module.convert(inputs[0], outputs[0], index_output=outputs[1], edges_output=outputs[2],
+                          instrumentation=instrumentation)
+
+
+def _tsk_xref(module: ModuleType, inputs: List[str], outputs: List[str], options: Dict[str, str],
+              instrumentation: Instrumentation) -> Dict[str, int]:
+    # The pool already runs a node per core, so each node converts in one process
+    return module.convert(inputs[0], outputs[0], outputs[1], jobs=1, index_output=outputs[2], edges_output=outputs[3],
+                          instrumentation=instrumentation)
+
+
+def _merge_xrefs(module: ModuleType, inputs: List[str], outputs: List[str], options: Dict[str, str],
+                 instrumentation: Instrumentation) -> Dict[str, int]:
+    return module.merge(inputs[0], inputs[1], outputs[0], index_output=outputs[1], instrumentation=instrumentation)
+
+
+def _hbnd(module: ModuleType, inputs: List[str], outputs: List[str], options: Dict[str, str],
+          instrumentation: Instrumentation) -> Dict[str, int]:
+    return module.convert(inputs[0], outputs[0], index_output=outputs[1], name_index_output=outputs[2],
+                          instrumentation=instrumentation)
+
+
+def _name_occurrences(module: ModuleType, inputs: List[str], outputs: List[str], options: Dict[str, str],
+                      instrumentation: Instrumentation) -> Dict[str, int]:
+    return module.join_occurrences(inputs[0], inputs[1], outputs[0], index_output=outputs[1], instrumentation=instrumentation)
+
+
+def _strongs(module: ModuleType, inputs: List[str], outputs: List[str], options: Dict[str, str],
+             instrumentation: Instrumentation) -> Dict[str, int]:
+    os.makedirs(outputs[0], exist_ok=True)
+    return module.convert(options["strongs"].split(","), inputs[0], outputs[0], instrumentation=instrumentation)
+
+
+class Node(NamedTuple):
+    name: str
+    converter: str
+    # Source names, or files written by other nodes (relative to the output directory)
+    inputs: List[str]
+    # Files or directories written, relative to the output directory
+    outputs: List[str]
+    run: Runner
+    # Command line options the node reads, part of its hash
+    options: List[str] = []
+
+
+NODES: List[Node] = [
+    Node("bible", "bible_converter", ["bible"], ["bible.jsonl", "bible.jsonl.idx"], _bible),
+    Node("bible_store", "bible_converter", ["bible"], ["bible.vstore", "bible.concordance"], _bible_store),
+    Node("open_xref", "open_xref", ["open_xref"], ["open_xref.jsonl", "open_xref.jsonl.idx", "open_xref.jsonl.edges"], _open_xref),
+    Node("tsk_xref", "tsk_xref", ["tsk"],
+         ["tsk_xrefs.jsonl", "tsk_xrefs.intervals", "tsk_xrefs.jsonl.idx", "tsk_xrefs.jsonl.edges"], _tsk_xref),
+    Node("merge_xrefs", "merge_xrefs", ["open_xref.jsonl.edges", "tsk_xrefs.jsonl.edges"], ["xrefs.jsonl", "xrefs.jsonl.idx"],
+         _merge_xrefs),
+    Node("hbnd", "hbnd", ["names"], ["names.jsonl", "names.jsonl.idx", "names.nameidx"], _hbnd),
+    Node("name_occurrences", "hbnd", ["names", "bible.jsonl"], ["name_occurrences.jsonl", "name_occurrences.jsonl.idx"],
+         _name_occurrences),
+    Node("strongs", "strong2csv", ["strongs_db"], ["strongs"], _strongs, ["strongs"]),
+]
+
+NODES_BY_NAME: Dict[str, Node] = {node.name: node for node in NODES}
+
+
+def dependencies(nodes: List[Node]) -> Dict[str, List[str]]:
+    """Returns the names of the nodes that write each node's inputs."""
+    writers = {output: node.name for node in nodes for output in node.outputs}
+    return {node.name: [writers[path] for path in node.inputs if path in writers] for node in nodes}
+
+
+def select_nodes(sources: Dict[str, str], only: Optional[List[str]] = None) -> List[Node]:
+    """
+    Returns the nodes to run, in declaration order: those in `only` (default
+    all) and their dependencies, minus any node that needs a source that was
+    not given or depends on such a node.
+    """
+    depends = dependencies(NODES)
+    wanted: Set[str] = set()
+    pending = list(only or NODES_BY_NAME)
+    while pending:
+        name = pending.pop()
+        if name not in wanted:
+            wanted.add(name)
+            pending.extend(depends[name])
+
+    selected: List[Node] = []
+    names: Set[str] = set()
+    for node in NODES:
+        if node.name not in wanted:
+            continue
+        missing = [path for path in node.inputs if path in SOURCES and path not in sources]
+        missing_deps = [dep for dep in depends[node.name] if dep not in names]
+        if missing or missing_deps:
+            reason = f"no {', '.join(SOURCES[path] for path in missing)}" if missing else f"needs {', '.join(missing_deps)}"
+            print(f"Leaving out {node.name} ({reason})")
+            continue
+        selected.append(node)
+        names.add(node.name)
+    return selected
+
+
+def _hash_file(digest: Any, path: str) -> None:
+    with open(path, 'rb') as f:
+        while block := f.read(HASH_BLOCK_SIZE):
+            digest.update(block)
+
+
+def loaded_modules() -> List[str]:
+    """Returns the repository's source files imported by this process, relative to the repository root."""
+    paths: Set[str] = set()
+    for module in list(sys.modules.values()):
+        path = getattr(module, "__file__", None)
+        if path and path.endswith(".py"):
+            path = os.path.relpath(os.path.abspath(path), converters.REPO)
+            if not path.startswith(os.pardir):
+                paths.add(path)
+    return sorted(paths)
+
+
+def input_hash(node: Node, inputs: List[str], options: Dict[str, str], modules: List[str]) -> str:
+    """
+    Hashes a node's input files, the options it reads and its code: every
+    source file in its converter's directory, plus `modules`, the files it
+    imported when it last ran (see `loaded_modules`), so a change to shared
+    code such as `common/` rebuilds every node that uses it.
+    """
+    digest = hashlib.sha256()
+    script_dir = os.path.dirname(converters.script_path(node.converter))
+    sources = {os.path.relpath(path, converters.REPO) for path in glob.glob(os.path.join(script_dir, "*.py"))}
+    for path in sorted(sources.union(modules)):
+        digest.update(path.encode('utf-8'))
+        full_path = os.path.join(converters.REPO, path)
+        if os.path.exists(full_path):
+            _hash_file(digest, full_path)
+    for path in inputs:
+        _hash_file(digest, path)
+    digest.update(json.dumps([node.run.__name__, {name: options[name] for name in node.options}]).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def run_node(name: str, inputs: List[str], outputs: List[str], options: Dict[str, str], log_path: str) -> dict:
+    """Runs one node in a pool worker, returning its instrumentation report with wall clock start and end times."""
+    node = NODES_BY_NAME[name]
+    started = time.time()
+    with open(log_path, 'w', encoding='utf-8') as log, redirect_stdout(log):
+        module = converters.load(node.converter)
+        with Instrumentation(name) as instrumentation:
+            node.run(module, inputs, outputs, options, instrumentation)
+    report = instrumentation.report()
+    report["modules"] = loaded_modules()
+    report["started"] = started
+    report["finished"] = time.time()
+    return report
+
+
+def critical_path(nodes: List[Node], durations: Dict[str, float]) -> List[str]:
+    """Returns the chain of dependent nodes with the longest total duration."""
+    depends = dependencies(nodes)
+    finish: Dict[str, float] = {}
+    previous: Dict[str, Optional[str]] = {}
+    # NODES lists every node after the nodes it depends on
+    for node in nodes:
+        slowest = max(depends[node.name], key=lambda dep: finish[dep], default=None)
+        previous[node.name] = slowest
+        finish[node.name] = durations.get(node.name, 0.0) + (finish[slowest] if slowest else 0.0)
+
+    path: List[str] = []
+    name = max(finish, key=lambda name: finish[name], default=None)
+    if name is None or finish[name] == 0:
+        return path
+    while name is not None:
+        path.append(name)
+        name = previous[name]
+    return path[::-1]
+
+
+class Pipeline:
+    def __init__(self, out: str, sources: Dict[str, str], options: Dict[str, str], jobs: int, force: bool = False) -> None:
+        self.out = out
+        self.sources = sources
+        self.options = options
+        self.jobs = jobs
+        self.force = force
+        self.state_path = os.path.join(out, STATE_FILE)
+        self.state: Dict[str, dict] = {}
+        if os.path.exists(self.state_path):
+            with open(self.state_path, encoding='utf-8') as f:
+                self.state = json.load(f)
+        self.results: Dict[str, dict] = {}
+        self.elapsed_s = 0.0
+
+    def _paths(self, paths: List[str]) -> List[str]:
+        return [self.sources[path] if path in self.sources else os.path.join(self.out, path) for path in paths]
+
+    def _up_to_date(self, node: Node, digest: str) -> bool:
+        state = self.state.get(node.name, {})
+        # States from before modules were recorded can't vouch for shared code
+        if self.force or "modules" not in state or state.get("hash") != digest:
+            return False
+        return all(os.path.exists(path) for path in self._paths(node.outputs))
+
+    def _save_state(self) -> None:
+        with open(self.state_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, indent=2)
+
+    def run(self, nodes: List[Node]) -> None:
+        for name, path in self.sources.items():
+            if not os.path.isfile(path):
+                raise RuntimeError(f"{SOURCES[name]} {path} is not a valid path")
+        os.makedirs(os.path.join(self.out, "logs"), exist_ok=True)
+
+        depends = dependencies(nodes)
+        waiting = {node.name: node for node in nodes}
+        running: Dict[Future, Node] = {}
+        start = time.time()
+
+        # max_tasks_per_child gives every node a fresh process, so module level caches and peak RSS are its own
+        with ProcessPoolExecutor(max_workers=self.jobs, max_tasks_per_child=1) as pool:
+            while waiting or running:
+                for node in list(waiting.values()):
+                    statuses = [self.results.get(dep, {}).get("status") for dep in depends[node.name]]
+                    if any(status in FAILED for status in statuses):
+                        del waiting[node.name]
+                        self.results[node.name] = {"status": "blocked"}
+                        print(f"{node.name:<16} blocked by a failed dependency")
+                    elif all(status in DONE for status in statuses):
+                        del waiting[node.name]
+                        self._start(pool, running, node)
+
+                if not running:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    self._finish(running.pop(future), future, start)
+
+        self.elapsed_s = time.time() - start
+
+    def _start(self, pool: ProcessPoolExecutor, running: Dict[Future, Node], node: Node) -> None:
+        inputs = self._paths(node.inputs)
+        digest = input_hash(node, inputs, self.options, self.state.get(node.name, {}).get("modules", []))
+        if self._up_to_date(node, digest):
+            self.results[node.name] = {"status": "skipped", "hash": digest}
+            print(f"{node.name:<16} up to date")
+            return
+
+        log_path = os.path.join(self.out, "logs", f"{node.name}.log")
+        future = pool.submit(run_node, node.name, inputs, self._paths(node.outputs), self.options, log_path)
+        running[future] = node
+        self.results[node.name] = {"status": "running", "hash": digest, "log": log_path}
+
+    def _finish(self, node: Node, future: Future, start: float) -> None:
+        result = self.results[node.name]
+        try:
+            report = future.result()
+        except Exception as e:
+            result["status"] = "failed"
+            result["error"] = f"{type(e).__name__}: {e}"
+            print(f"{node.name:<16} failed: {result['error']} (see {result['log']})")
+            # A failed node must rebuild next time, even if its inputs are unchanged
+            self.state.pop(node.name, None)
+            self._save_state()
+            return
+
+        result.update({
+            "status": "built",
+            "started_s": round(report["started"] - start, 3),
+            "finished_s": round(report["finished"] - start, 3),
+            "elapsed_s": round(report["finished"] - report["started"], 3),
+            "stages": report["stages"],
+            "counters": report["counters"],
+            "peak_rss_kb": report["peak_rss_kb"],
+        })
+        print(f"{node.name:<16} built in {result['elapsed_s']:.2f}s")
+        # Rehash with the modules the node actually imported, which the next run checks
+        result["hash"] = input_hash(node, self._paths(node.inputs), self.options, report["modules"])
+        self.state[node.name] = {"hash": result["hash"], "modules": report["modules"], "counters": report["counters"]}
+        self._save_state()
+
+    def report(self, nodes: List[Node]) -> dict:
+        durations = {name: result.get("elapsed_s", 0.0) for name, result in self.results.items()}
+        path = critical_path([node for node in nodes if node.name in self.results], durations)
+        return {
+            "out": self.out,
+            "jobs": self.jobs,
+            "elapsed_s": round(self.elapsed_s, 3),
+            "node_time_s": round(sum(durations.values()), 3),
+            "critical_path": path,
+            "critical_path_s": round(sum(durations[name] for name in path), 3),
+            "nodes": self.results,
+        }
+
+
+def print_summary(report: dict) -> None:
+    print(f"\n{'node':<16} {'status':<8} {'start (s)':>10} {'time (s)':>10}")
+    for name, result in report["nodes"].items():
+        started = f"{result['started_s']:.2f}" if "started_s" in result else "-"
+        elapsed = f"{result['elapsed_s']:.2f}" if "elapsed_s" in result else "-"
+        marker = "  *" if name in report["critical_path"] else ""
+        print(f"{name:<16} {result['status']:<8} {started:>10} {elapsed:>10}{marker}")
+
+    path = " -> ".join(report["critical_path"]) or "(nothing built)"
+    print(f"\nCritical path (*): {path}, {report['critical_path_s']:.2f}s")
+    print(f"Wall time {report['elapsed_s']:.2f}s for {report['node_time_s']:.2f}s of node time on {report['jobs']} worker(s)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Runs every converter as one pipeline, rebuilding only what changed")
+    parser.add_argument("--out", default="build", help="directory to write every output to (default build)")
+    parser.add_argument("--bible", help="scrollmapper JSON Bible")
+    parser.add_argument("--open-xref", help="OpenBible cross_references.csv")
+    parser.add_argument("--tsk", help="TSK tab separated cross references")
+    parser.add_argument("--names", help="Hitchcock's Bible names CSV")
+    parser.add_argument("--strongs-db", help="av1769s.bib Strong's tagged Bible database")
+    parser.add_argument("--strongs", default="H430", help="comma separated Strong's numbers to export (default H430)")
+    parser.add_argument("--only", nargs="+", choices=list(NODES_BY_NAME), help="nodes to build, with their dependencies (default all)")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1, help="nodes to run at once (default: one per core)")
+    parser.add_argument("--force", action="store_true", help="rebuild nodes that are up to date")
+    parser.add_argument("--report", help=f"path of the JSON report (default <out>/{REPORT_FILE})")
+    args = parser.parse_args()
+
+    sources = {name: getattr(args, name) for name in SOURCES if getattr(args, name)}
+    if not sources:
+        parser.error(f"no sources given, pass at least one of {', '.join(SOURCES.values())}")
+
+    nodes = select_nodes(sources, args.only)
+    pipeline = Pipeline(args.out, sources, {"strongs": args.strongs}, max(args.jobs, 1), args.force)
+    pipeline.run(nodes)
+
+    report = pipeline.report(nodes)
+    print_summary(report)
+    report_path = args.report or os.path.join(args.out, REPORT_FILE)
+    with open(report_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote report: {report_path}")
+
+    sys.exit(1 if any(result["status"] in FAILED for result in report["nodes"].values()) else 0)
+
+
+if __name__ == "__main__":
+    main()
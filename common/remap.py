@@ -0,0 +1,127 @@
+"""
+Projects converter output from one versification scheme onto another.
+
+    python common/remap.py out.jsonl out.kjv.jsonl --source kjv_3john15 --target kjv
+    python common/remap.py xrefs.jsonl xrefs.mapped.jsonl --source a --target b --mapping a_to_b.txt
+
+Handles Bible output (`id` and `words`, including the compact format) and xref
+output (`source` and `targets`). Every reference in the file is mapped in a
+single `VersificationMap.map_ids` sweep, with chapter references mapped
+through their first and last verse as in `VersificationMap.map_range`. Records that end up with the same id
+are merged: Bible verses concatenate their words, and xrefs concatenate their
+targets, dropping targets that are already listed.
+"""
+
+import argparse
+from array import array
+import os
+import sys
+from typing import Dict, List, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common import verse_id
+from common.jsonl import JsonlWriter, read_jsonl
+from common.output import add_compress_argument
+from common.versification import SCHEMES
+from common.versification_map import VersificationMap, get_mapping, load_mapping
+
+REF_FIELDS = ("id", "source")
+
+# Lists that hold one entry per target
+TARGET_FIELDS = ("votes", "provenance")
+
+
+def _flags(record: dict) -> List[int]:
+    return record.get("flags") or [0] * (len(record["words"]) // 3)
+
+
+def _merge(into: dict, record: dict) -> None:
+    if "words" in into:
+        if "flags" in into or "flags" in record:
+            into["flags"] = _flags(into) + _flags(record)
+        into["words"] = into["words"] + record["words"]
+
+    if "targets" in into:
+        seen = set(into["targets"])
+        for i, target in enumerate(record["targets"]):
+            if target not in seen:
+                seen.add(target)
+                into["targets"].append(target)
+                for field in TARGET_FIELDS:
+                    if field in into:
+                        into[field].append(record[field][i])
+
+
+def remap_records(records: List[dict], mapping: VersificationMap) -> List[dict]:
+    """Maps every reference in the records in place and returns them with merged duplicates removed."""
+    ids = array('I')
+    # Whether each target is a range of whole chapters, to write back as chapters
+    chapters: List[bool] = []
+    for line, record in enumerate(records, 1):
+        try:
+            for field in REF_FIELDS:
+                if field in record:
+                    ids.append(verse_id.parse_osis(record[field]))
+            for ref in record.get("targets", ()):
+                start, end = verse_id.parse_osis_range(ref)
+                chapters.append(start & verse_id.VERSE_MAX == 0 and end & verse_id.VERSE_MAX == verse_id.VERSE_MAX)
+                ids.extend(mapping.verse_bounds(start, end))
+        except ValueError as e:
+            raise RuntimeError(f"Line {line}: {e}")
+
+    mapped = iter(mapping.map_ids(ids))
+    target_chapters = iter(chapters)
+    merged: Dict[Tuple[str, str], dict] = {}
+    output: List[dict] = []
+    for record in records:
+        for field in REF_FIELDS:
+            if field in record:
+                record[field] = verse_id.format_osis(next(mapped))
+        if "targets" in record:
+            targets: List[str] = []
+            for _ in record["targets"]:
+                start, end = next(mapped), next(mapped)
+                if next(target_chapters):
+                    start, end = mapping.chapter_bounds(start, end)
+                targets.append(verse_id.format_osis_range(start, end))
+            record["targets"] = targets
+
+        key = next(((field, record[field]) for field in REF_FIELDS if field in record), None)
+        if key is None:
+            output.append(record)
+        elif key in merged:
+            _merge(merged[key], record)
+        else:
+            merged[key] = record
+            output.append(record)
+    return output
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Map converter output onto another versification")
+    parser.add_argument("input", help="JSONL output of a converter, optionally .gz or .zst compressed")
+    parser.add_argument("output", help="path of the remapped JSONL file")
+    parser.add_argument("--source", choices=sorted(SCHEMES), required=True, help="versification of the input")
+    parser.add_argument("--target", choices=sorted(SCHEMES), required=True, help="versification to map onto")
+    parser.add_argument("--mapping", help="mapping file to use instead of the built in mapping")
+    add_compress_argument(parser)
+    args = parser.parse_args()
+
+    if args.mapping:
+        mapping = load_mapping(args.mapping, args.source, args.target)
+    else:
+        mapping = get_mapping(args.source, args.target)
+        if mapping is None:
+            raise RuntimeError(f"No built in mapping from {args.source} to {args.target}, pass one with --mapping")
+
+    records = list(read_jsonl(args.input))
+    output = remap_records(records, mapping)
+    with JsonlWriter(args.output, compress=args.compress) as writer:
+        for record in output:
+            writer.write(record)
+
+    print(f"Mapped {len(records)} records from {args.source} to {args.target}, merging {len(records) - len(output)}; wrote {writer.path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""
+Checks that every verse id and range in converter output exists.
+
+Reads JSONL output (plain or compressed) from any of the converters, collects
+the `id`, `source` and `targets` references of every record, then checks all
+of them against a versification table in one sweep:
+
+    python common/validate.py out.jsonl tsk_xrefs.jsonl xrefs.jsonl.zst
+
+Binary sidecars are recognized by their magic and checked the same way: every
+present verse of a verse store (`.vstore`), every interval of an interval
+index (`.intervals`) and the source and target of every xref edge (`.edges`).
+Their violations are numbered by verse, interval or edge instead of by line.
+
+Exits with status 1 if any reference is malformed, reversed or points past the
+end of a book or chapter.
+"""
+
+import argparse
+from array import array
+import os
+import sys
+from types import ModuleType
+from typing import Any, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common import interval_index, verse_id, xref_edges
+from common.jsonl import read_jsonl
+from common.versification import KJV, SCHEMES, Versification
+
+REF_FIELDS = ("id", "source")
+REF_LIST_FIELDS = ("targets",)
+
+
+class Violation(NamedTuple):
+    line: int
+    ref: str
+    message: str
+    # What `line` counts: JSONL lines, or the entries of a binary file
+    unit: str = "Line"
+
+    def __str__(self) -> str:
+        return f"{self.unit} {self.line}: {self.message}: '{self.ref}'"
+
+
+def _format_range(start: int, end: int) -> str:
+    """Formats a packed range for a violation, even when its book doesn't exist."""
+    try:
+        return verse_id.format_osis_range(start, end)
+    except IndexError:
+        return f"{start:#08x}-{end:#08x}"
+
+
+class _Refs:
+    def __init__(self, unit: str = "Line") -> None:
+        self.unit = unit
+        self.lines = array('I')
+        # The OSIS text of each reference, `None` for packed ranges from binary files
+        self.refs: List[Optional[str]] = []
+        self.starts = array('I')
+        self.ends = array('I')
+        self.ids = array('I')
+        self.owners = array('I')
+        self.violations: List[Violation] = []
+
+    def add(self, line: int, ref: Any) -> None:
+        if not isinstance(ref, str):
+            self.violations.append(Violation(line, repr(ref), "Reference is not a string", self.unit))
+            return
+        try:
+            start, end = verse_id.parse_osis_range(ref)
+        except ValueError:
+            self.violations.append(Violation(line, ref, "Malformed reference", self.unit))
+            return
+        self.add_range(line, start, end, ref)
+
+    def add_range(self, line: int, start: int, end: int, ref: Optional[str] = None) -> None:
+        if start > end:
+            self.violations.append(Violation(line, ref or _format_range(start, end), "Range ends before it starts", self.unit))
+
+        owner = len(self.refs)
+        self.lines.append(line)
+        self.refs.append(ref)
+        self.starts.append(start)
+        self.ends.append(end)
+        self.ids.append(start)
+        self.owners.append(owner)
+        if end != start:
+            self.ids.append(end)
+            self.owners.append(owner)
+
+    def check(self, scheme: Versification) -> List[Violation]:
+        """Returns every violation found so far and every id missing from `scheme`, in line order."""
+        reported = set()
+        violations = self.violations
+        for position in scheme.invalid_ids(self.ids):
+            owner = self.owners[position]
+            if owner not in reported:
+                reported.add(owner)
+                ref = self.refs[owner] or _format_range(self.starts[owner], self.ends[owner])
+                violations.append(Violation(self.lines[owner], ref, f"Not in the {scheme.name} versification", self.unit))
+
+        violations.sort(key=lambda violation: violation.line)
+        return violations
+
+
+def validate_records(records: Iterable[dict], scheme: Versification = KJV) -> List[Violation]:
+    """Returns every invalid reference in the records, in line order."""
+    refs = _Refs()
+    for line, record in enumerate(records, 1):
+        for field in REF_FIELDS:
+            if field in record:
+                refs.add(line, record[field])
+        for field in REF_LIST_FIELDS:
+            for ref in record.get(field, ()):
+                refs.add(line, ref)
+    return refs.check(scheme)
+
+
+def validate_ranges(ranges: Iterable[Tuple[int, int, int]], scheme: Versification = KJV, unit: str = "Entry") -> List[Violation]:
+    """Returns every invalid range of `(number, start, end)` packed id ranges, in number order."""
+    refs = _Refs(unit)
+    for number, start, end in ranges:
+        refs.add_range(number, start, end)
+    return refs.check(scheme)
+
+
+def _verse_store() -> ModuleType:
+    # verse_store sits next to bible_converter, which imports it as a top level module
+    directory = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "bible_converter")
+    if directory not in sys.path:
+        sys.path.insert(0, directory)
+    import verse_store
+    return verse_store
+
+
+def _verse_store_ranges(path: str) -> Iterator[Tuple[int, int, int]]:
+    with _verse_store().VerseStore(path) as store:
+        for number, id in enumerate(store.ids(), 1):
+            yield number, id, id
+
+
+def _edge_ranges(path: str) -> Iterator[Tuple[int, int, int]]:
+    edges = xref_edges.load_edges(path)
+    for number, (source, start, end) in enumerate(zip(edges.sources, edges.starts, edges.ends), 1):
+        yield number, source, source
+        yield number, start, end
+
+
+def validate_file(path: str, scheme: Versification = KJV) -> List[Violation]:
+    """Validates JSONL output, or a verse store, interval index or edge file recognized by its magic."""
+    with open(path, 'rb') as f:
+        magic = f.read(4)
+    if magic == _verse_store().MAGIC:
+        return validate_ranges(_verse_store_ranges(path), scheme, "Verse")
+    if magic == interval_index.MAGIC:
+        index = interval_index.IntervalIndex.load(path)
+        return validate_ranges(zip(range(1, len(index) + 1), index.starts, index.ends), scheme, "Interval")
+    if magic == xref_edges.MAGIC:
+        return validate_ranges(_edge_ranges(path), scheme, "Edge")
+    return validate_records(read_jsonl(path), scheme)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Check the verse references in converter output")
+    parser.add_argument("paths", nargs="+",
+                        help="JSONL output files, optionally .gz or .zst compressed, verse stores, interval indexes or edge files")
+    parser.add_argument("--versification", choices=sorted(SCHEMES), default="kjv", help="Versification to check against (default: kjv)")
+    parser.add_argument("--limit", type=int, default=20, help="Maximum number of violations to print per file (default: 20)")
+    args = parser.parse_args()
+
+    scheme = SCHEMES[args.versification]
+    failed = False
+    for path in args.paths:
+        violations = validate_file(path, scheme)
+        print(f"{path}: {len(violations)} invalid reference(s)")
+        for violation in violations[:args.limit]:
+            print(f"  {violation}")
+        if len(violations) > args.limit:
+            print(f"  ... and {len(violations) - args.limit} more")
+        failed = failed or bool(violations)
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Packed integer verse ids.
+
+A verse id packs a 1-based book index, chapter and verse into a single int
+(`book << 16 | chapter << 8 | verse`), so ids sort in canonical Bible order
+and ranges can be compared with plain integer comparisons. A verse of `0`
+refers to the chapter as a whole.
+"""
+
+from typing import Tuple
+
+from common.books import BOOKS
+
+OSIS_BOOKS = [book.osis for book in BOOKS]
+
+OSIS_BOOK_INDEX = {book.osis: book.index for book in BOOKS}
+
+VERSE_MAX = 0xFF
+
+
+def pack(book: int, chapter: int, verse: int = 0) -> int:
+    if not 1 <= chapter <= 0xFF or not 0 <= verse <= VERSE_MAX:
+        raise ValueError(f"Chapter {chapter} verse {verse} can't be packed into a verse id")
+    return (book << 16) | (chapter << 8) | verse
+
+
+def unpack(id: int) -> Tuple[int, int, int]:
+    return id >> 16, (id >> 8) & 0xFF, id & 0xFF
+
+
+def chapter_bounds(book: int, chapter: int) -> Tuple[int, int]:
+    """Returns the inclusive packed id range covering a whole chapter."""
+    return pack(book, chapter, 0), pack(book, chapter, VERSE_MAX)
+
+
+def parse_osis(ref: str) -> int:
+    """
+    Parses an OSIS id such as `Gen.28.25` (or `Gen.28` for a chapter) into a
+    packed id. Raises `ValueError` for unknown books and for chapters or
+    verses that don't fit in a packed id, rather than wrapping them into
+    another verse.
+    """
+    parts = ref.split('.')
+    if len(parts) not in (2, 3) or parts[0] not in OSIS_BOOK_INDEX:
+        raise ValueError(f"Invalid OSIS reference: {ref}")
+
+    book = OSIS_BOOK_INDEX[parts[0]]
+    chapter = int(parts[1])
+    verse = int(parts[2]) if len(parts) == 3 else 0
+    # VERSE_MAX marks the end of a chapter in ranges, so it isn't a verse
+    if not 1 <= chapter <= 0xFF or not 0 <= verse < VERSE_MAX:
+        raise ValueError(f"Chapter or verse out of range in OSIS reference: {ref}")
+    return pack(book, chapter, verse)
+
+
+def parse_osis_range(ref: str) -> Tuple[int, int]:
+    """
+    Parses an OSIS id or range (`Gen.28.21-Gen.28.29`, `Gen.1-Gen.2`) into an
+    inclusive packed id interval. Chapter references cover every verse in the chapter.
+    """
+    start_str, _, end_str = ref.partition('-')
+    start = parse_osis(start_str)
+    end = parse_osis(end_str) if end_str else start
+    return span(start, end)
+
+
+def span(start: int, end: int) -> Tuple[int, int]:
+    """Widens a chapter `end` id so the inclusive range covers every verse of that chapter."""
+    if end & VERSE_MAX == 0:
+        end |= VERSE_MAX
+    return start, end
+
+
+def format_osis(id: int) -> str:
+    book, chapter, verse = unpack(id)
+    if verse == 0 or verse == VERSE_MAX:
+        return f"{OSIS_BOOKS[book - 1]}.{chapter}"
+    return f"{OSIS_BOOKS[book - 1]}.{chapter}.{verse}"
+
+
+def format_osis_range(start: int, end: int) -> str:
+    """Formats an inclusive range produced by `parse_osis_range` or `span` back into OSIS."""
+    if start == end or (start & VERSE_MAX == 0 and end == start | VERSE_MAX):
+        return format_osis(start)
+    return f"{format_osis(start)}-{format_osis(end)}"
@@ -0,0 +1,291 @@
+"""
+Versification tables: the number of verses in every chapter of every book.
+
+A scheme is compiled into a compact `bytes` table indexed by the chapter part
+of a packed verse id (`id >> 8`), holding that chapter's verse count (0 for
+chapters that do not exist). Checking an id is then a single table read, and
+`invalid_ids` checks a whole array of ids in one sweep, vectorized with NumPy
+when it is installed.
+
+`kjv` is the canonical KJV versification. Alternates are derived from it by
+overriding individual chapters:
+
+- `kjv_3john15`: the scrollmapper KJV, with an extra 3 John 1:15
+- `mt`: the Masoretic (Hebrew Bible) chapter divisions, e.g. Joel 2:28-32 as
+  Joel 3:1-5, Joel 3 as Joel 4 and Malachi 4 as Malachi 3:19-24. Psalm
+  titles, which the Hebrew numbers as verse 1 of their psalm, are not
+  included: Psalms keeps the KJV numbering
+"""
+
+from array import array
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+from common import verse_id
+from common.books import BOOKS
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+KJV_CHAPTER_VERSES: List[List[int]] = [
+    # Gen
+    [31, 25, 24, 26, 32, 22, 24, 22, 29, 32, 32, 20, 18, 24, 21, 16, 27, 33, 38, 18, 34, 24, 20, 67, 34,
+     35, 46, 22, 35, 43, 55, 32, 20, 31, 29, 43, 36, 30, 23, 23, 57, 38, 34, 34, 28, 34, 31, 22, 33, 26],
+    # Exod
+    [22, 25, 22, 31, 23, 30, 25, 32, 35, 29, 10, 51, 22, 31, 27, 36, 16, 27, 25, 26, 36, 31, 33, 18, 40,
+     37, 21, 43, 46, 38, 18, 35, 23, 35, 35, 38, 29, 31, 43, 38],
+    # Lev
+    [17, 16, 17, 35, 19, 30, 38, 36, 24, 20, 47, 8, 59, 57, 33, 34, 16, 30, 37, 27, 24, 33, 44, 23, 55, 46, 34],
+    # Num
+    [54, 34, 51, 49, 31, 27, 89, 26, 23, 36, 35, 16, 33, 45, 41, 50, 13, 32, 22, 29, 35, 41, 30, 25, 18,
+     65, 23, 31, 40, 16, 54, 42, 56, 29, 34, 13],
+    # Deut
+    [46, 37, 29, 49, 33, 25, 26, 20, 29, 22, 32, 32, 18, 29, 23, 22, 20, 22, 21, 20, 23, 30, 25, 22, 19,
+     19, 26, 68, 29, 20, 30, 52, 29, 12],
+    # Josh
+    [18, 24, 17, 24, 15, 27, 26, 35, 27, 43, 23, 24, 33, 15, 63, 10, 18, 28, 51, 9, 45, 34, 16, 33],
+    # Judg
+    [36, 23, 31, 24, 31, 40, 25, 35, 57, 18, 40, 15, 25, 20, 20, 31, 13, 31, 30, 48, 25],
+    # Ruth
+    [22, 23, 18, 22],
+    # 1Sam
+    [28, 36, 21, 22, 12, 21, 17, 22, 27, 27, 15, 25, 23, 52, 35, 23, 58, 30, 24, 42, 15, 23, 29, 22, 44,
+     25, 12, 25, 11, 31, 13],
+    # 2Sam
+    [27, 32, 39, 12, 25, 23, 29, 18, 13, 19, 27, 31, 39, 33, 37, 23, 29, 33, 43, 26, 22, 51, 39, 25],
+    # 1Kgs
+    [53, 46, 28, 34, 18, 38, 51, 66, 28, 29, 43, 33, 34, 31, 34, 34, 24, 46, 21, 43, 29, 53],
+    # 2Kgs
+    [18, 25, 27, 44, 27, 33, 20, 29, 37, 36, 21, 21, 25, 29, 38, 20, 41, 37, 37, 21, 26, 20, 37, 20, 30],
+    # 1Chr
+    [54, 55, 24, 43, 26, 81, 40, 40, 44, 14, 47, 40, 14, 17, 29, 43, 27, 17, 19, 8, 30, 19, 32, 31, 31,
+     32, 34, 21, 30],
+    # 2Chr
+    [17, 18, 17, 22, 14, 42, 22, 18, 31, 19, 23, 16, 22, 15, 19, 14, 19, 34, 11, 37, 20, 12, 21, 27, 28,
+     23, 9, 27, 36, 27, 21, 33, 25, 33, 27, 23],
+    # Ezra
+    [11, 70, 13, 24, 17, 22, 28, 36, 15, 44],
+    # Neh
+    [11, 20, 32, 23, 19, 19, 73, 18, 38, 39, 36, 47, 31],
+    # Esth
+    [22, 23, 15, 17, 14, 14, 10, 17, 32, 3],
+    # Job
+    [22, 13, 26, 21, 27, 30, 21, 22, 35, 22, 20, 25, 28, 22, 35, 22, 16, 21, 29, 29, 34, 30, 17, 25, 6,
+     14, 23, 28, 25, 31, 40, 22, 33, 37, 16, 33, 24, 41, 30, 24, 34, 17],
+    # Ps
+    [6, 12, 8, 8, 12, 10, 17, 9, 20, 18, 7, 8, 6, 7, 5, 11, 15, 50, 14, 9, 13, 31, 6, 10, 22,
+     12, 14, 9, 11, 12, 24, 11, 22, 22, 28, 12, 40, 22, 13, 17, 13, 11, 5, 26, 17, 11, 9, 14, 20, 23,
+     19, 9, 6, 7, 23, 13, 11, 11, 17, 12, 8, 12, 11, 10, 13, 20, 7, 35, 36, 5, 24, 20, 28, 23, 10,
+     12, 20, 72, 13, 19, 16, 8, 18, 12, 13, 17, 7, 18, 52, 17, 16, 15, 5, 23, 11, 13, 12, 9, 9, 5,
+     8, 28, 22, 35, 45, 48, 43, 13, 31, 7, 10, 10, 9, 8, 18, 19, 2, 29, 176, 7, 8, 9, 4, 8, 5,
+     6, 5, 6, 8, 8, 3, 18, 3, 3, 21, 26, 9, 8, 24, 13, 10, 7, 12, 15, 21, 10, 20, 14, 9, 6],
+    # Prov
+    [33, 22, 35, 27, 23, 35, 27, 36, 18, 32, 31, 28, 25, 35, 33, 33, 28, 24, 29, 30, 31, 29, 35, 34, 28,
+     28, 27, 28, 27, 33, 31],
+    # Eccl
+    [18, 26, 22, 16, 20, 12, 29, 17, 18, 20, 10, 14],
+    # Song
+    [17, 17, 11, 16, 16, 13, 13, 14],
+    # Isa
+    [31, 22, 26, 6, 30, 13, 25, 22, 21, 34, 16, 6, 22, 32, 9, 14, 14, 7, 25, 6, 17, 25, 18, 23, 12,
+     21, 13, 29, 24, 33, 9, 20, 24, 17, 10, 22, 38, 22, 8, 31, 29, 25, 28, 28, 25, 13, 15, 22, 26, 11,
+     23, 15, 12, 17, 13, 12, 21, 14, 21, 22, 11, 12, 19, 12, 25, 24],
+    # Jer
+    [19, 37, 25, 31, 31, 30, 34, 22, 26, 25, 23, 17, 27, 22, 21, 21, 27, 23, 15, 18, 14, 30, 40, 10, 38,
+     24, 22, 17, 32, 24, 40, 44, 26, 22, 19, 32, 21, 28, 18, 16, 18, 22, 13, 30, 5, 28, 7, 47, 39, 46,
+     64, 34],
+    # Lam
+    [22, 22, 66, 22, 22],
+    # Ezek
+    [28, 10, 27, 17, 17, 14, 27, 18, 11, 22, 25, 28, 23, 23, 8, 63, 24, 32, 14, 49, 32, 31, 49, 27, 17,
+     21, 36, 26, 21, 26, 18, 32, 33, 31, 15, 38, 28, 23, 29, 49, 26, 20, 27, 31, 25, 24, 23, 35],
+    # Dan
+    [21, 49, 30, 37, 31, 28, 28, 27, 27, 21, 45, 13],
+    # Hos
+    [11, 23, 5, 19, 15, 11, 16, 14, 17, 15, 12, 14, 16, 9],
+    # Joel
+    [20, 32, 21],
+    # Amos
+    [15, 16, 15, 13, 27, 14, 17, 14, 15],
+    # Obad
+    [21],
+    # Jonah
+    [17, 10, 10, 11],
+    # Mic
+    [16, 13, 12, 13, 15, 16, 20],
+    # Nah
+    [15, 13, 19],
+    # Hab
+    [17, 20, 19],
+    # Zeph
+    [18, 15, 20],
+    # Hag
+    [15, 23],
+    # Zech
+    [21, 13, 10, 14, 11, 15, 14, 23, 17, 12, 17, 14, 9, 21],
+    # Mal
+    [14, 17, 18, 6],
+    # Matt
+    [25, 23, 17, 25, 48, 34, 29, 34, 38, 42, 30, 50, 58, 36, 39, 28, 27, 35, 30, 34, 46, 46, 39, 51, 46,
+     75, 66, 20],
+    # Mark
+    [45, 28, 35, 41, 43, 56, 37, 38, 50, 52, 33, 44, 37, 72, 47, 20],
+    # Luke
+    [80, 52, 38, 44, 39, 49, 50, 56, 62, 42, 54, 59, 35, 35, 32, 31, 37, 43, 48, 47, 38, 71, 56, 53],
+    # John
+    [51, 25, 36, 54, 47, 71, 53, 59, 41, 42, 57, 50, 38, 31, 27, 33, 26, 40, 42, 31, 25],
+    # Acts
+    [26, 47, 26, 37, 42, 15, 60, 40, 43, 48, 30, 25, 52, 28, 41, 40, 34, 28, 41, 38, 40, 30, 35, 27, 27,
+     32, 44, 31],
+    # Rom
+    [32, 29, 31, 25, 21, 23, 25, 39, 33, 21, 36, 21, 14, 23, 33, 27],
+    # 1Cor
+    [31, 16, 23, 21, 13, 20, 40, 13, 27, 33, 34, 31, 13, 40, 58, 24],
+    # 2Cor
+    [24, 17, 18, 18, 21, 18, 16, 24, 15, 18, 33, 21, 14],
+    # Gal
+    [24, 21, 29, 31, 26, 18],
+    # Eph
+    [23, 22, 21, 32, 33, 24],
+    # Phil
+    [30, 30, 21, 23],
+    # Col
+    [29, 23, 25, 18],
+    # 1Thess
+    [10, 20, 13, 18, 28],
+    # 2Thess
+    [12, 17, 18],
+    # 1Tim
+    [20, 15, 16, 16, 25, 21],
+    # 2Tim
+    [18, 26, 17, 22],
+    # Titus
+    [16, 15, 15],
+    # Phlm
+    [25],
+    # Heb
+    [14, 18, 19, 16, 14, 20, 28, 13, 28, 39, 40, 29, 25],
+    # Jas
+    [27, 26, 18, 17, 20],
+    # 1Pet
+    [25, 25, 22, 19, 14],
+    # 2Pet
+    [21, 22, 18],
+    # 1John
+    [10, 29, 24, 21, 21],
+    # 2John
+    [13],
+    # 3John
+    [14],
+    # Jude
+    [25],
+    # Rev
+    [20, 29, 22, 11, 14, 17, 17, 13, 21, 11, 19, 17, 18, 20, 8, 21, 18, 24, 21, 15, 27, 21],
+]
+
+TABLE_SIZE = (len(BOOKS) + 1) << 8
+
+
+class Versification:
+    def __init__(self, name: str, chapter_verses: Sequence[Sequence[int]]) -> None:
+        self.name = name
+        self.chapter_verses = [list(chapters) for chapters in chapter_verses]
+
+        table = bytearray(TABLE_SIZE)
+        for book, chapters in enumerate(self.chapter_verses, 1):
+            for chapter, count in enumerate(chapters, 1):
+                table[(book << 8) | chapter] = count
+        self.table = bytes(table)
+
+    def derive(self, name: str, overrides: Dict[Tuple[int, int], int]) -> 'Versification':
+        """Returns a copy of this scheme with the `(book, chapter)` verse counts in `overrides` replaced."""
+        chapter_verses = [list(chapters) for chapters in self.chapter_verses]
+        for (book, chapter), count in overrides.items():
+            chapters = chapter_verses[book - 1]
+            chapters.extend([0] * (chapter - len(chapters)))
+            chapters[chapter - 1] = count
+        # A count of 0 for the last chapters drops them, e.g. Malachi 4 in the Hebrew numbering
+        for chapters in chapter_verses:
+            while chapters and chapters[-1] == 0:
+                chapters.pop()
+        return Versification(name, chapter_verses)
+
+    def chapter_count(self, book: int) -> int:
+        return len(self.chapter_verses[book - 1]) if 1 <= book <= len(self.chapter_verses) else 0
+
+    def verse_count(self, book: int, chapter: int) -> int:
+        key = (book << 8) | chapter
+        return self.table[key] if 0 <= key < TABLE_SIZE and chapter <= 0xFF else 0
+
+    def is_valid(self, id: int) -> bool:
+        """Checks a packed id. Chapter ids (verse `0`) and chapter range ends (verse `0xFF`) only need the chapter to exist."""
+        key = id >> 8
+        if key >= TABLE_SIZE:
+            return False
+        count = self.table[key]
+        verse = id & verse_id.VERSE_MAX
+        return count > 0 and (verse <= count or verse == verse_id.VERSE_MAX)
+
+    def invalid_ids(self, ids: Iterable[int]) -> List[int]:
+        """Returns the positions of every invalid id in `ids`, checked in a single sweep."""
+        ids = array('I', ids)
+        if numpy is not None:
+            values = numpy.frombuffer(ids, dtype=numpy.uint32)
+            keys = numpy.minimum(values >> 8, TABLE_SIZE - 1)
+            counts = numpy.frombuffer(self.table, dtype=numpy.uint8)[keys]
+            verses = values & verse_id.VERSE_MAX
+            invalid = (counts == 0) | (values >> 8 >= TABLE_SIZE) | ((verses > counts) & (verses != verse_id.VERSE_MAX))
+            return numpy.flatnonzero(invalid).tolist()
+
+        table = self.table
+        verse_max = verse_id.VERSE_MAX
+        invalid_positions: List[int] = []
+        for i, id in enumerate(ids):
+            key = id >> 8
+            count = table[key] if key < TABLE_SIZE else 0
+            verse = id & verse_max
+            if count == 0 or (verse > count and verse != verse_max):
+                invalid_positions.append(i)
+        return invalid_positions
+
+
+KJV = Versification("kjv", KJV_CHAPTER_VERSES)
+
+# Verse counts of the chapters whose Masoretic division differs from the KJV
+# (the verses are the same, only the chapter breaks move)
+MT_CHAPTER_VERSES: Dict[str, Dict[int, int]] = {
+    "Gen": {31: 54, 32: 33},
+    "Exod": {7: 29, 8: 28, 21: 37, 22: 30},
+    "Lev": {5: 26, 6: 23},
+    "Num": {16: 35, 17: 28, 29: 39, 30: 17},
+    "Deut": {12: 31, 13: 19, 22: 29, 23: 26, 28: 69, 29: 28},
+    "1Sam": {23: 28, 24: 23},
+    "2Sam": {18: 32, 19: 44},
+    "1Kgs": {4: 20, 5: 32},
+    "2Kgs": {11: 20, 12: 22},
+    "1Chr": {5: 41, 6: 66},
+    "2Chr": {1: 18, 2: 17, 13: 23, 14: 14},
+    "Neh": {3: 38, 4: 17, 9: 37, 10: 40},
+    "Job": {40: 32, 41: 26},
+    "Eccl": {4: 17, 5: 19},
+    "Song": {6: 12, 7: 14},
+    "Isa": {8: 23, 9: 20},
+    "Ezek": {20: 44, 21: 37},
+    "Dan": {3: 33, 4: 34, 5: 30, 6: 29},
+    "Hos": {1: 9, 2: 25, 11: 11, 12: 15, 13: 15, 14: 10},
+    "Joel": {2: 27, 3: 5, 4: 21},
+    "Jonah": {1: 16, 2: 11},
+    "Mic": {4: 14, 5: 14},
+    "Nah": {1: 14, 2: 14},
+    "Zech": {1: 17, 2: 17},
+    "Mal": {3: 24, 4: 0},
+}
+
+SCHEMES: Dict[str, Versification] = {
+    "kjv": KJV,
+    # The scrollmapper KJV adds an empty 3 John 1:15, as some translations split 1:14 in two
+    "kjv_3john15": KJV.derive("kjv_3john15", {(64, 1): 15}),
+    "mt": KJV.derive("mt", {(verse_id.OSIS_BOOK_INDEX[osis], chapter): count
+                            for osis, chapters in MT_CHAPTER_VERSES.items() for chapter, count in chapters.items()}),
+}
@@ -0,0 +1,237 @@
+"""
+Mapping verse ids between versification schemes.
+
+A mapping is written as lines of `source target` references, where the source
+is in the source scheme and the target in the target scheme. Either side can
+be a verse, a verse range or a whole chapter. Both sides must cover the same
+number of verses, unless the target is a single verse that the source verses
+are merged into. `#` starts a comment:
+
+    # 3 John 1:15 is the second half of the KJV's 3 John 1:14
+    3John.1.15 3John.1.14
+
+A compiled mapping is a two-level lookup table over the packed id space: a
+page index with one entry per chapter (`id >> 8`), and a `PAGE_SIZE` entry page of
+target ids for each chapter that has a mapped verse. Ids in unmapped chapters
+map to themselves. Splitting a verse cannot be expressed as an int to int
+mapping; map such a verse to the first of its parts.
+
+Chapter ids (verse `0`, and `0xFF` at the end of a range) have no table
+entries, as a chapter can land across a chapter break of the target: MT
+Malachi 3 is KJV Malachi 3:1-4:6. A chapter range is mapped through its first
+and last verse in the source scheme, and written with chapter ids again if it
+still covers whole chapters of the target, so MT `Joel.4` maps to KJV
+`Joel.3`, `Mal.3` to `Mal.3-Mal.4` and `Joel.3` to `Joel.2.28-Joel.2.32`.
+"""
+
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from common import verse_id
+from common.books import BOOKS
+from common.versification import SCHEMES, TABLE_SIZE, Versification
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+PAGE_SIZE = 1 << 8
+
+BUILTIN_MAPPINGS: Dict[Tuple[str, str], List[str]] = {
+    ("kjv_3john15", "kjv"): ["3John.1.15 3John.1.14"],
+    ("mt", "kjv"): [
+        "Gen.32.1 Gen.31.55", "Gen.32.2-Gen.32.33 Gen.32.1-Gen.32.32",
+        "Exod.7.26-Exod.7.29 Exod.8.1-Exod.8.4", "Exod.8.1-Exod.8.28 Exod.8.5-Exod.8.32",
+        "Exod.21.37 Exod.22.1", "Exod.22.1-Exod.22.30 Exod.22.2-Exod.22.31",
+        "Lev.5.20-Lev.5.26 Lev.6.1-Lev.6.7", "Lev.6.1-Lev.6.23 Lev.6.8-Lev.6.30",
+        "Num.17.1-Num.17.15 Num.16.36-Num.16.50", "Num.17.16-Num.17.28 Num.17.1-Num.17.13",
+        "Num.30.1 Num.29.40", "Num.30.2-Num.30.17 Num.30.1-Num.30.16",
+        "Deut.13.1 Deut.12.32", "Deut.13.2-Deut.13.19 Deut.13.1-Deut.13.18",
+        "Deut.23.1 Deut.22.30", "Deut.23.2-Deut.23.26 Deut.23.1-Deut.23.25",
+        "Deut.28.69 Deut.29.1", "Deut.29.1-Deut.29.28 Deut.29.2-Deut.29.29",
+        "1Sam.24.1 1Sam.23.29", "1Sam.24.2-1Sam.24.23 1Sam.24.1-1Sam.24.22",
+        "2Sam.19.1 2Sam.18.33", "2Sam.19.2-2Sam.19.44 2Sam.19.1-2Sam.19.43",
+        "1Kgs.5.1-1Kgs.5.14 1Kgs.4.21-1Kgs.4.34", "1Kgs.5.15-1Kgs.5.32 1Kgs.5.1-1Kgs.5.18",
+        "2Kgs.12.1 2Kgs.11.21", "2Kgs.12.2-2Kgs.12.22 2Kgs.12.1-2Kgs.12.21",
+        "1Chr.5.27-1Chr.5.41 1Chr.6.1-1Chr.6.15", "1Chr.6.1-1Chr.6.66 1Chr.6.16-1Chr.6.81",
+        "2Chr.1.18 2Chr.2.1", "2Chr.2.1-2Chr.2.17 2Chr.2.2-2Chr.2.18",
+        "2Chr.13.23 2Chr.14.1", "2Chr.14.1-2Chr.14.14 2Chr.14.2-2Chr.14.15",
+        "Neh.3.33-Neh.3.38 Neh.4.1-Neh.4.6", "Neh.4.1-Neh.4.17 Neh.4.7-Neh.4.23",
+        "Neh.10.1 Neh.9.38", "Neh.10.2-Neh.10.40 Neh.10.1-Neh.10.39",
+        "Job.40.25-Job.40.32 Job.41.1-Job.41.8", "Job.41.1-Job.41.26 Job.41.9-Job.41.34",
+        "Eccl.4.17 Eccl.5.1", "Eccl.5.1-Eccl.5.19 Eccl.5.2-Eccl.5.20",
+        "Song.7.1 Song.6.13", "Song.7.2-Song.7.14 Song.7.1-Song.7.13",
+        "Isa.8.23 Isa.9.1", "Isa.9.1-Isa.9.20 Isa.9.2-Isa.9.21",
+        "Ezek.21.1-Ezek.21.5 Ezek.20.45-Ezek.20.49", "Ezek.21.6-Ezek.21.37 Ezek.21.1-Ezek.21.32",
+        "Dan.3.31-Dan.3.33 Dan.4.1-Dan.4.3", "Dan.4.1-Dan.4.34 Dan.4.4-Dan.4.37",
+        "Dan.6.1 Dan.5.31", "Dan.6.2-Dan.6.29 Dan.6.1-Dan.6.28",
+        "Hos.2.1-Hos.2.2 Hos.1.10-Hos.1.11", "Hos.2.3-Hos.2.25 Hos.2.1-Hos.2.23",
+        "Hos.12.1 Hos.11.12", "Hos.12.2-Hos.12.15 Hos.12.1-Hos.12.14",
+        "Hos.14.1 Hos.13.16", "Hos.14.2-Hos.14.10 Hos.14.1-Hos.14.9",
+        "Joel.3.1-Joel.3.5 Joel.2.28-Joel.2.32", "Joel.4 Joel.3",
+        "Jonah.2.1 Jonah.1.17", "Jonah.2.2-Jonah.2.11 Jonah.2.1-Jonah.2.10",
+        "Mic.4.14 Mic.5.1", "Mic.5.1-Mic.5.14 Mic.5.2-Mic.5.15",
+        "Nah.2.1 Nah.1.15", "Nah.2.2-Nah.2.14 Nah.2.1-Nah.2.13",
+        "Zech.2.1-Zech.2.4 Zech.1.18-Zech.1.21", "Zech.2.5-Zech.2.17 Zech.2.1-Zech.2.13",
+        "Mal.3.19-Mal.3.24 Mal.4.1-Mal.4.6",
+    ],
+}
+
+
+def expand(scheme: Versification, start: int, end: int) -> List[int]:
+    """Returns every verse id of the scheme in the inclusive range, in order."""
+    ids: List[int] = []
+    book, chapter, verse = verse_id.unpack(start)
+    verse = max(verse, 1)
+    while book <= len(BOOKS) and verse_id.pack(book, chapter) <= end:
+        count = scheme.verse_count(book, chapter)
+        if count == 0:
+            book, chapter, verse = book + 1, 1, 1
+            continue
+        for v in range(verse, count + 1):
+            id = verse_id.pack(book, chapter, v)
+            if id > end:
+                return ids
+            ids.append(id)
+        chapter, verse = chapter + 1, 1
+    return ids
+
+
+def _is_chapter(id: int) -> bool:
+    return id & verse_id.VERSE_MAX in (0, verse_id.VERSE_MAX)
+
+
+class VersificationMap:
+    def __init__(self, source: str, target: str, pairs: Iterable[Tuple[int, int]] = ()) -> None:
+        self.source = source
+        self.target = target
+        self._source_scheme = _scheme(source)
+        self._target_scheme = _scheme(target)
+        self.pages = array('i', [-1]) * TABLE_SIZE
+        self.table = array('I')
+        for from_id, to_id in pairs:
+            self.set(from_id, to_id)
+
+    def set(self, from_id: int, to_id: int) -> None:
+        key = from_id >> 8
+        if key >= TABLE_SIZE:
+            raise RuntimeError(f"Verse id {from_id:#x} is outside the packed id space")
+        if self.pages[key] < 0:
+            self.pages[key] = len(self.table)
+            self.table.extend(range(key * PAGE_SIZE, (key + 1) * PAGE_SIZE))
+        self.table[self.pages[key] + (from_id & 0xFF)] = to_id
+
+    def _lookup(self, id: int) -> int:
+        key = id >> 8
+        page = self.pages[key] if key < TABLE_SIZE else -1
+        return id if page < 0 else self.table[page + (id & 0xFF)]
+
+    def map_id(self, id: int) -> int:
+        """Maps a packed id. A chapter id maps to the start of the chapter's target range, see `map_range`."""
+        if _is_chapter(id):
+            chapter = id & ~verse_id.VERSE_MAX
+            return self.map_range(chapter, chapter | verse_id.VERSE_MAX)[0]
+        return self._lookup(id)
+
+    def map_ids(self, ids: Iterable[int]) -> array:
+        """Maps an array of packed ids like `map_id` in one sweep, vectorized with NumPy when it is installed."""
+        ids = array('I', ids)
+        if numpy is not None and self.table:
+            values = numpy.frombuffer(ids, dtype=numpy.uint32)
+            keys = values >> 8
+            pages = numpy.frombuffer(self.pages, dtype=numpy.int32)[numpy.minimum(keys, TABLE_SIZE - 1)]
+            mapped = (pages >= 0) & (keys < TABLE_SIZE)
+            result = values.copy()
+            result[mapped] = numpy.frombuffer(self.table, dtype=numpy.uint32)[pages[mapped] + (values[mapped] & 0xFF)]
+            # Chapter ids in mapped chapters are rare, so they are mapped one by one
+            verses = values & verse_id.VERSE_MAX
+            for i in numpy.flatnonzero(mapped & ((verses == 0) | (verses == verse_id.VERSE_MAX))).tolist():
+                result[i] = self.map_id(ids[i])
+            return array('I', result.tobytes())
+
+        pages = self.pages
+        table = self.table
+        result = array('I', ids)
+        for i, id in enumerate(ids):
+            key = id >> 8
+            if key < TABLE_SIZE and pages[key] >= 0:
+                result[i] = self.map_id(id) if _is_chapter(id) else table[pages[key] + (id & 0xFF)]
+        return result
+
+    def verse_bounds(self, start: int, end: int) -> Tuple[int, int]:
+        """Narrows chapter ids at either end of a range to the first and last verse of the chapter in the source scheme."""
+        if start & verse_id.VERSE_MAX == 0 and self._source_scheme.verse_count(*verse_id.unpack(start)[:2]):
+            start |= 1
+        if _is_chapter(end):
+            count = self._source_scheme.verse_count(*verse_id.unpack(end)[:2])
+            if count:
+                end = (end & ~verse_id.VERSE_MAX) | count
+        return start, end
+
+    def chapter_bounds(self, start: int, end: int) -> Tuple[int, int]:
+        """Widens a mapped verse range to chapter ids if it covers whole chapters of the target scheme."""
+        if start & verse_id.VERSE_MAX == 1 and end & verse_id.VERSE_MAX == self._target_scheme.verse_count(*verse_id.unpack(end)[:2]):
+            return start & ~verse_id.VERSE_MAX, end | verse_id.VERSE_MAX
+        return start, end
+
+    def map_range(self, start: int, end: int) -> Tuple[int, int]:
+        """
+        Maps an inclusive range. A range of whole chapters is mapped through
+        its first and last verse, and kept in chapter ids if it still covers
+        whole chapters of the target scheme.
+        """
+        chapters = start & verse_id.VERSE_MAX == 0 and _is_chapter(end)
+        start, end = self.verse_bounds(start, end)
+        start, end = self._lookup(start), self._lookup(end)
+        return self.chapter_bounds(start, end) if chapters else (start, end)
+
+
+def parse_mapping(lines: Iterable[str], source: str, target: str) -> VersificationMap:
+    """Compiles mapping lines from the `source` scheme onto the `target` scheme."""
+    source_scheme = _scheme(source)
+    target_scheme = _scheme(target)
+    mapping = VersificationMap(source, target)
+    for number, line in enumerate(lines, 1):
+        line = line.partition('#')[0].strip()
+        if not line:
+            continue
+
+        parts = line.split()
+        if len(parts) != 2:
+            raise RuntimeError(f"Line {number}: expected a source and a target reference: '{line}'")
+        try:
+            from_ids = expand(source_scheme, *verse_id.parse_osis_range(parts[0]))
+            to_ids = expand(target_scheme, *verse_id.parse_osis_range(parts[1]))
+        except ValueError as e:
+            raise RuntimeError(f"Line {number}: {e}")
+        if not from_ids or not to_ids:
+            raise RuntimeError(f"Line {number}: reference is not in the {source if not from_ids else target} versification: '{line}'")
+
+        if len(to_ids) == 1:
+            to_ids = to_ids * len(from_ids)
+        elif len(to_ids) != len(from_ids):
+            raise RuntimeError(f"Line {number}: {len(from_ids)} source verses cannot be mapped onto {len(to_ids)} target verses: '{line}'")
+        for from_id, to_id in zip(from_ids, to_ids):
+            mapping.set(from_id, to_id)
+    return mapping
+
+
+def load_mapping(path: str, source: str, target: str) -> VersificationMap:
+    with open(path, encoding='utf-8') as f:
+        return parse_mapping(f, source, target)
+
+
+def get_mapping(source: str, target: str) -> Optional[VersificationMap]:
+    """Returns the built in mapping between two schemes, an identity mapping if they are the same, or `None`."""
+    if source == target:
+        return VersificationMap(source, target)
+    lines = BUILTIN_MAPPINGS.get((source, target))
+    return None if lines is None else parse_mapping(lines, source, target)
+
+
+def _scheme(name: str) -> Versification:
+    scheme = SCHEMES.get(name)
+    if scheme is None:
+        raise RuntimeError(f"Unknown versification: {name}")
+    return scheme
@@ -0,0 +1,67 @@
+"""
+Packed cross reference edges, written next to a converter's JSONL.
+
+Each target of each source verse becomes one edge: the packed source id, the
+inclusive packed target range (see `verse_id.span`) and the target's vote
+count, 0 for datasets without votes. `merge_xrefs` merges the edges of the
+open_xref and TSK converters without reading their JSONL back.
+
+File layout (little endian):
+    magic  b"AXXE"
+    u32    version
+    u32    edge count (n)
+    u32[n] sources
+    u32[n] starts
+    u32[n] ends
+    u32[n] votes
+"""
+
+import argparse
+import struct
+from typing import NamedTuple, Sequence
+
+from common.binary_io import ArrayReader, write_array
+
+MAGIC = b"AXXE"
+VERSION = 1
+
+_HEADER = struct.Struct("<4sII")
+
+
+class Edges(NamedTuple):
+    sources: Sequence[int]
+    starts: Sequence[int]
+    ends: Sequence[int]
+    votes: Sequence[int]
+
+
+def add_edges_argument(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--edges", action="store_true",
+                        help="also write the packed edges of the output (<output>.edges) for merge_xrefs")
+
+
+def edges_path(output: str) -> str:
+    return f"{output}.edges"
+
+
+def save_edges(path: str, edges: Edges) -> None:
+    """Writes edges whose columns are `u32` arrays (see `binary_io.u32_array`)."""
+    count = len(edges.sources)
+    if any(len(column) != count for column in edges):
+        raise RuntimeError("Edge columns differ in length")
+    with open(path, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, count))
+        for column in edges:
+            write_array(f, column)
+
+
+def load_edges(path: str) -> Edges:
+    with open(path, 'rb') as f:
+        data = f.read()
+    magic, version, count = _HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise RuntimeError(f"File {path} is not a version {VERSION} edge file")
+    if len(data) != _HEADER.size + 16 * count:
+        raise RuntimeError(f"File {path} is truncated")
+    reader = ArrayReader(data, _HEADER.size)
+    return Edges(*(reader.take('I', count) for _ in range(4)))
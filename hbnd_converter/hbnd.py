@@ -1,34 +1,123 @@
 import sys
 import os
-import csv
+import argparse
+from typing import Dict, List, Optional
 
-if len(sys.argv) < 2:
-    raise RuntimeError("You must pass a file path")
-elif len(sys.argv) > 2:
-    raise RuntimeError("More than 1 argument was supplied")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common import verse_id
+from common.instrument import Instrumentation, add_instrument_arguments
+from common.jsonl import JsonlWriter
+from common.offset_index import add_index_argument, index_path
+from common.mmap_reader import read_rows
+from common.output import add_compress_argument
 
-path = sys.argv[1]
+def convert(path: str, output: str = "out.jsonl", compress: str = "none", index_output: Optional[str] = None,
+            name_index_output: Optional[str] = None, instrumentation: Optional[Instrumentation] = None) -> Dict[str, int]:
+    """
+    Converts the names CSV at `path` into JSONL at `output`. Also writes an
+    offset index of the names to `index_output`, and a prefix and fuzzy
+    lookup index of them (see `name_index`) to `name_index_output`, if
+    given. Returns the converter's counters.
+    """
+    if instrumentation is None:
+        instrumentation = Instrumentation("hbnd")
 
-if not os.path.isfile(path):
-    raise RuntimeError(f"File path {path} is not a valid path")
+    if not os.path.isfile(path):
+        raise RuntimeError(f"File path {path} is not a valid path")
 
-_, ext = os.path.splitext(path)
-if not ext == ".csv":
-    raise RuntimeError(f"File path {path} is not a json csv")
+    _, ext = os.path.splitext(path)
+    if not ext == ".csv":
+        raise RuntimeError(f"File path {path} is not a json csv")
 
-print(f"Reading file: {path}...")
-data: list[list[str]] = []
-with open(path, 'r', newline='') as f:
-    reader = csv.reader(f)
-    next(reader)
-    for row in reader:
-        data.append(row)
+    print(f"Reading file: {path}...")
+    rows = read_rows(path, ",")
+    next(rows)
+    names: List[str] = []
 
-print("Writing to file: out.jsonl...")
+    # Rows are written as they are read, so reading and writing are timed
+    # together as one stage
+    with instrumentation.stage("convert"), JsonlWriter(output, compress=compress, index=index_output) as writer:
+        print(f"Writing to file: {writer.path}...")
+        for row in rows:
+            definitions = [d.strip() for d in row[1].split(";")]
+            instrumentation.count("definitions", len(definitions))
+            writer.write({
+                "word": row[0],
+                "definitions": definitions,
+            }, key=row[0])
+            names.append(row[0])
+    instrumentation.count("rows", writer.count)
 
-with open('out.jsonl', 'w') as file:
-    for row in data:
-        defs = ", ".join(map(lambda d : f"\"{d.strip()}\"", row[1].split(";")))
-        file.write(f"{{ \"word\": \"{row[0]}\", \"definitions\": [{defs}] }}\n")
+    if name_index_output:
+        print(f"Writing to file: {name_index_output}...")
+        with instrumentation.stage("name_index"):
+            from name_index import NameIndexBuilder
+            builder = NameIndexBuilder()
+            for name in names:
+                builder.add(name)
+            builder.write(name_index_output)
 
-print("Done!")
\ No newline at end of file
+    return instrumentation.counters
+
+def join_occurrences(path: str, bible_path: str, output: str = "out.occurrences.jsonl", compress: str = "none",
+                     index_output: Optional[str] = None, instrumentation: Optional[Instrumentation] = None) -> Dict[str, int]:
+    """
+    Joins the names in the names CSV at `path` to the verses they occur in,
+    in the converted Bible at `bible_path` (see `name_occurrences`). Writes
+    JSONL at `output` with one line per name, in dictionary order, holding
+    its verses in canonical order, and an offset index of the names at
+    `index_output` if given. Returns the join's counters.
+    """
+    if instrumentation is None:
+        instrumentation = Instrumentation("hbnd")
+
+    for input_path in (path, bible_path):
+        if not os.path.isfile(input_path):
+            raise RuntimeError(f"File path {input_path} is not a valid path")
+
+    from name_occurrences import find_occurrences, read_verse_words
+
+    rows = read_rows(path, ",")
+    next(rows)
+    names = [row[0] for row in rows]
+
+    print(f"Reading file: {bible_path}...")
+    with instrumentation.stage("join"):
+        occurrences = find_occurrences(names, read_verse_words(bible_path))
+
+    with instrumentation.stage("write_occurrences"), JsonlWriter(output, compress=compress, index=index_output) as writer:
+        print(f"Writing to file: {writer.path}...")
+        for name, verses in occurrences.items():
+            if verses:
+                instrumentation.count("matched_names")
+                instrumentation.count("occurrences", len(verses))
+            writer.write({
+                "word": name,
+                "verses": [verse_id.format_osis(id) for id in verses],
+            }, key=name)
+
+    return instrumentation.counters
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Converts the Hitchcock's Bible Names Dictionary CSV into JSONL")
+    parser.add_argument("path", help="path to hbnd.csv")
+    add_compress_argument(parser)
+    add_index_argument(parser)
+    parser.add_argument("--name-index", action="store_true", help="also write a prefix and fuzzy name lookup index (out.nameidx)")
+    parser.add_argument("--bible", help="converted Bible (jsonl or compact output of bible_converter) to find the names in, "
+                                         "writing the verses of each name to out.occurrences.jsonl")
+    add_instrument_arguments(parser)
+    args = parser.parse_args()
+
+    with Instrumentation.from_args("hbnd", args) as instrumentation:
+        convert(args.path, compress=args.compress, index_output=index_path("out.jsonl") if args.index else None,
+                name_index_output="out.nameidx" if args.name_index else None, instrumentation=instrumentation)
+        if args.bible:
+            join_occurrences(args.path, args.bible, compress=args.compress,
+                             index_output=index_path("out.occurrences.jsonl") if args.index else None,
+                             instrumentation=instrumentation)
+
+    print("Done!")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+Prefix and fuzzy lookup index of the names in the names dictionary.
+
+Names are matched case-insensitively (`normalize`). `NameIndex.prefix`
+finds every name starting with the typed text by binary search over the
+sorted keys. UTF-8 byte order matches code point order, and 0xFF never
+occurs in UTF-8, so the names with a prefix are exactly the keys in
+`[prefix, prefix + b"\\xff")`. `NameIndex.fuzzy` ranks names by the trigrams
+they share with the query, like PostgreSQL's `pg_trgm`: each name is padded
+with two spaces in front and one behind, and scored by the Jaccard
+similarity of its trigram set with the query's.
+
+The file is mapped and its arrays are read in place, so loading takes a
+few milliseconds however many names there are.
+
+File layout (little endian, each section padded to 8 bytes):
+    magic       b"AXNI"
+    u32         version
+    u32         name count (n)
+    u32         size of the key blob in bytes (k)
+    u32         size of the display name blob in bytes (d)
+    u32         trigram count (t)
+    u32         size of the trigram blob in bytes (g)
+    u32         trigram posting count (p)
+    u32[n + 1]  offset of each key in the key blob, plus an end sentinel
+    u8[k]       keys, normalized names in UTF-8 byte order
+    u32[n + 1]  offset of each name in the display name blob, plus an end sentinel
+    u8[d]       names as written in the dictionary, in key order
+    u32[n]      distinct trigram count of each name
+    u32[t + 1]  offset of each trigram in the trigram blob, plus an end sentinel
+    u8[g]       trigrams, in UTF-8 byte order
+    u32[t + 1]  offset of each trigram's postings, plus an end sentinel
+    u32[p]      postings: ascending indices of the names containing each trigram
+"""
+
+from bisect import bisect_left
+import mmap
+import os
+import struct
+import sys
+from typing import Dict, List, Set, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.binary_io import ArrayReader, padding, write_strings, write_u32
+
+MAGIC = b"AXNI"
+VERSION = 1
+
+# Default minimum similarity of a fuzzy match, as in pg_trgm
+DEFAULT_THRESHOLD = 0.3
+
+_HEADER = struct.Struct("<4sIIIIIII")
+
+
+def normalize(text: str) -> str:
+    return text.casefold()
+
+
+def trigrams(text: str) -> Set[str]:
+    """Returns the distinct trigrams of `text`, normalized and padded."""
+    padded = f"  {normalize(text)} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class NameIndexBuilder:
+    def __init__(self) -> None:
+        self.names: Set[str] = set()
+
+    def add(self, name: str) -> None:
+        self.names.add(name)
+
+    def write(self, path: str) -> None:
+        entries = sorted((normalize(name).encode('utf-8'), name.encode('utf-8')) for name in self.names)
+
+        name_trigrams = [trigrams(name.decode('utf-8')) for _, name in entries]
+        postings: Dict[bytes, List[int]] = {}
+        for i, grams in enumerate(name_trigrams):
+            for gram in grams:
+                postings.setdefault(gram.encode('utf-8'), []).append(i)
+        grams = sorted(postings)
+
+        starts = [0]
+        for gram in grams:
+            starts.append(starts[-1] + len(postings[gram]))
+
+        key_blob = [key for key, _ in entries]
+        name_blob = [name for _, name in entries]
+        with open(path, 'wb') as f:
+            f.write(_HEADER.pack(MAGIC, VERSION, len(entries), sum(map(len, key_blob)), sum(map(len, name_blob)),
+                                 len(grams), sum(map(len, grams)), starts[-1]))
+            for strings in (key_blob, name_blob):
+                write_strings(f, strings)
+                f.write(padding(f.tell()))
+            write_u32(f, map(len, name_trigrams))
+            f.write(padding(f.tell()))
+            write_strings(f, grams)
+            f.write(padding(f.tell()))
+            write_u32(f, starts)
+            for gram in grams:
+                write_u32(f, postings[gram])
+
+
+class NameIndex:
+    def __init__(self, path: str) -> None:
+        with open(path, 'rb') as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(data) < _HEADER.size:
+            raise RuntimeError(f"File {path} is not a version {VERSION} name index")
+        magic, version, count, key_size, name_size, gram_count, gram_size, posting_count = _HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise RuntimeError(f"File {path} is not a version {VERSION} name index")
+
+        reader = ArrayReader(data, _HEADER.size)
+        # The views keep the mapping open for as long as the index is used
+        self._keys = reader.take_strings(count, key_size)
+        reader.align()
+        self._names = reader.take_strings(count, name_size)
+        reader.align()
+        self._trigram_counts = reader.take('I', count)
+        reader.align()
+        self._grams = reader.take_strings(gram_count, gram_size)
+        reader.align()
+        self._posting_starts = reader.take('I', gram_count + 1)
+        self._postings = reader.take('I', posting_count)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, name: str) -> bool:
+        key = normalize(name).encode('utf-8')
+        i = bisect_left(self._keys, key)
+        return i < len(self._keys) and self._keys[i] == key
+
+    def name(self, i: int) -> str:
+        return self._names[i].decode('utf-8')
+
+    def names(self) -> List[str]:
+        return [self.name(i) for i in range(len(self))]
+
+    def prefix(self, text: str, limit: int = 0) -> List[str]:
+        """Returns the names starting with `text`, in normalized order, at most `limit` of them if set."""
+        key = normalize(text).encode('utf-8')
+        lo = bisect_left(self._keys, key)
+        hi = bisect_left(self._keys, key + b"\xff", lo)
+        if limit:
+            hi = min(hi, lo + limit)
+        return [self.name(i) for i in range(lo, hi)]
+
+    def fuzzy(self, text: str, limit: int = 10, threshold: float = DEFAULT_THRESHOLD) -> List[Tuple[str, float]]:
+        """Returns up to `limit` names with a trigram similarity to `text` of at least `threshold`, best first."""
+        query = trigrams(text)
+        shared: Dict[int, int] = {}
+        for gram in query:
+            value = gram.encode('utf-8')
+            g = bisect_left(self._grams, value)
+            if g == len(self._grams) or self._grams[g] != value:
+                continue
+            for i in self._postings[self._posting_starts[g]:self._posting_starts[g + 1]]:
+                shared[i] = shared.get(i, 0) + 1
+
+        matches: List[Tuple[float, int]] = []
+        for i, common in shared.items():
+            similarity = common / (len(query) + self._trigram_counts[i] - common)
+            if similarity >= threshold:
+                matches.append((-similarity, i))
+        matches.sort()
+        return [(self.name(i), -score) for score, i in matches[:limit]]
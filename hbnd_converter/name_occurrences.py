@@ -0,0 +1,86 @@
+"""
+Joins the names dictionary to the verses each name occurs in.
+
+One pass over a converted Bible (the `jsonl` or `compact` output of
+`bible_converter`) looks every word up in a hash table of the names, so the
+join costs one dict lookup per word however many names there are. Each
+distinct token is matched once and the result cached, as tokens repeat
+heavily.
+
+Names and words are compared by `match_key`: casefolded, without hyphens,
+as the dictionary hyphenates compound names ("Abel-meholah") that the KJV
+mostly writes as one word ("Abelmeholah"). Only capitalized words match, so
+names that are also common words ("Job", "Eve") only match as proper nouns.
+Surrounding punctuation and a possessive "'s" are ignored, as in the
+concordance, since words split from a Bible keep the punctuation that is
+attached to them: "(Abraham's," matches Abraham.
+"""
+
+from itertools import chain
+import os
+import re
+import sys
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common import verse_id
+from common.jsonl import read_jsonl
+
+_SURROUNDING_PUNCTUATION = re.compile(r"^\W+|\W+$")
+
+
+def match_key(text: str) -> str:
+    return text.replace("-", "").casefold()
+
+
+def _word_key(text: str) -> str:
+    text = _SURROUNDING_PUNCTUATION.sub("", text)
+    if not text[:1].isupper():
+        return ""
+    if text.endswith("'s"):
+        text = text[:-2]
+    return match_key(text)
+
+
+def read_verse_words(path: str) -> Iterator[Tuple[int, List[str]]]:
+    """Yields the packed id and word texts of every verse in a converted Bible, in file order."""
+    records = read_jsonl(path)
+    first = next(records, None)
+    if first is None:
+        return
+    if first.get("type") == "tables":
+        words = first["words"]
+        for record in records:
+            # Flat [text, begin_punc, end_punc, ...] triples of table ids
+            yield verse_id.parse_osis(record["id"]), [words[id] for id in record["words"][::3]]
+        return
+
+    for verse in chain([first], records):
+        yield verse_id.parse_osis(verse["id"]), [word["text"] for word in verse["words"]]
+
+
+def find_occurrences(names: Iterable[str], verses: Iterable[Tuple[int, Iterable[str]]]) -> Dict[str, List[int]]:
+    """Returns the ascending ids of the verses each name occurs in, for every name in `names`."""
+    by_key: Dict[str, List[str]] = {}
+    occurrences: Dict[str, List[int]] = {}
+    for name in names:
+        if name not in occurrences:
+            occurrences[name] = []
+            by_key.setdefault(match_key(name), []).append(name)
+
+    # Names matched by each distinct token, with no names for most
+    matches: Dict[str, List[List[int]]] = {}
+    for id, words in verses:
+        for word in words:
+            postings = matches.get(word)
+            if postings is None:
+                postings = matches[word] = [occurrences[name] for name in by_key.get(_word_key(word), ())]
+            for posting in postings:
+                if not posting or posting[-1] != id:
+                    posting.append(id)
+
+    for name, posting in occurrences.items():
+        # Already ascending for Bibles in canonical order, where this is cheap
+        if any(a >= b for a, b in zip(posting, posting[1:])):
+            occurrences[name] = sorted(set(posting))
+    return occurrences
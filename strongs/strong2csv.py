@@ -5,18 +5,25 @@ be named after the (first) Strong's Number entered, i.e. "H25.csv."
 """
 
 import os
-import codecs
+import io
 import re
 import sys
-import sqlite3 as sqlite
-import strongsData
 import getopt
-from typing import List, Optional
+from contextlib import closing
+from typing import Dict, List, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.instrument import Instrumentation
+from common.output import COMPRESSIONS, compressed_path, open_output
 
 helpTxt = """
     Enter one or more comma separated Strong's numbers, 
     i.e. H25 or H356,G217,G875. 
     Saved file will be named after the (first) Strong's Number entered, i.e. "H25.csv."
+    Use -c gzip or -c zstd to compress the CSV while it is written.
+    Use -r report.json to write per-stage timings and counters, and
+    -p profile.out to write a cProfile dump of the run. Add -m to record
+    the tracemalloc peak of every stage in the report (slow).
 """
 
 
@@ -24,11 +31,15 @@ def parseArgs(argv: List[str]) -> None:
     """Parse command line arguments and process Strong's numbers."""
     
     # Options
-    options = "ho:"
+    options = "ho:c:r:p:m"
     # Long options
-    long_options = ["Help", "Output="]
+    long_options = ["Help", "Output=", "Compress=", "Report=", "Profile=", "TraceMemory"]
     
     output_path: Optional[str] = None
+    compress = "none"
+    report_path: Optional[str] = None
+    profile_path: Optional[str] = None
+    trace_memory = False
     
     try:
         opts, args = getopt.getopt(argv, options, long_options)
@@ -40,11 +51,22 @@ def parseArgs(argv: List[str]) -> None:
                 sys.exit(0)
             elif opt in ('-o', '--Output'):
                 output_path = arg
+            elif opt in ('-c', '--Compress'):
+                if arg not in COMPRESSIONS:
+                    print(f"Error: Unknown compression '{arg}', expected one of {', '.join(COMPRESSIONS)}")
+                    sys.exit(2)
+                compress = arg
+            elif opt in ('-r', '--Report'):
+                report_path = arg
+            elif opt in ('-p', '--Profile'):
+                profile_path = arg
+            elif opt in ('-m', '--TraceMemory'):
+                trace_memory = True
         
         # Process arguments
         if not args:
             print("Error: No Strong's numbers provided")
-            print('Usage: makeCSV.py <strongs number(s)> [-h] [-o outputpath]')
+            print('Usage: makeCSV.py <strongs number(s)> [-h] [-o outputpath] [-c none|gzip|zstd] [-r report.json] [-p profile.out] [-m]')
             sys.exit(2)
         
         # Handle comma-separated numbers in a single argument or multiple arguments
@@ -69,22 +91,32 @@ def parseArgs(argv: List[str]) -> None:
             print("Error: No valid Strong's numbers found")
             sys.exit(2)
         
-        generate(formatted_numbers, output_path)
+        with Instrumentation("strong2csv", report_path, profile_path, trace_memory) as instrumentation:
+            generate(formatted_numbers, output_path, compress, instrumentation)
         
     except getopt.GetoptError as e:
         print(f'Error: {e}')
-        print('Usage: makeCSV.py <strongs number(s)> [-h] [-o outputpath]')
+        print('Usage: makeCSV.py <strongs number(s)> [-h] [-o outputpath] [-c none|gzip|zstd] [-r report.json] [-p profile.out] [-m]')
         sys.exit(2)
 
 
-def generate(sNumList: List[str], output_path: Optional[str] = None) -> None:
-    """Generate CSV file with Strong's numbers data."""
+def convert(sNumList: List[str], db_path: str = 'av1769s.bib', output_path: Optional[str] = None,
+            compress: str = "none", instrumentation: Optional[Instrumentation] = None) -> Dict[str, int]:
+    """
+    Writes every verse of the database at `db_path` that contains one of the
+    Strong's numbers (e.g. H25 or [H25]) to `<first number>.csv` in
+    `output_path`. Returns the converter's counters.
+    """
+    if instrumentation is None:
+        instrumentation = Instrumentation("strong2csv")
+    sNumList = [f'[{num.strip("[]")}]' for num in sNumList]
     
-    fn = 'av1769s.bib'
+    if not os.path.exists(db_path):
+        raise RuntimeError(f"Database file '{db_path}' not found")
     
-    if not os.path.exists(fn):
-        print(f"Error: Database file '{fn}' not found")
-        sys.exit(1)
+    # The lexicon is large, so it is only loaded once there is work to do
+    import sqlite3 as sqlite
+    import strongsData
     
     # Prepare CSV output
     csv_lines = ['Idx,Book,Ref.,KJB Verse,KJB Word,Original,Transliteration,Definition']
@@ -95,35 +127,39 @@ def generate(sNumList: List[str], output_path: Optional[str] = None) -> None:
         csv_filename = os.path.join(output_path, f'{first_number}.csv')
     else:
         csv_filename = f'{first_number}.csv'
+    csv_filename = compressed_path(csv_filename, compress)
     
-    try:
-        con = sqlite.connect(fn)
-        cur = con.cursor()
+    con = sqlite.connect(db_path)
+    cur = con.cursor()
+    
+    idx = 1
+    rows = 0
+    
+    # The connection is closed however the scan ends, as convert may run in a long lived process
+    with closing(con), instrumentation.stage("scan"):
         cur.execute('SELECT * FROM bible')
-        
-        idx = 1
-        
         for row in cur:
+            rows += 1
             if len(row) < 3:
                 continue
-                
-            vs_txt = str(row[2]) if row[2] else ""
             
+            vs_txt = str(row[2]) if row[2] else ""
+        
             # Check if any of our target Strong's numbers are in this verse
             if any(sn in vs_txt for sn in sNumList):
                 # Clean up the verse text
                 vs_txt_clean = re.sub(r'\[\([HG]\d+\)\]', '', vs_txt)
                 vs_txt_clean = re.sub(r'\[\([GH]\d+\)\]|<fn>\d+</fn>|<.+?>|[\r\n]', '', vs_txt_clean)
-                
+            
                 # Find word groups with Strong's numbers
                 wd_grp_list = re.findall(r'[^\]]+\]', vs_txt_clean)
-                
+            
                 wd_list: list[str] = []
                 ow_list: list[str] = []
                 trans_list: list[str] = []
                 def_list: list[str] = []
                 wd_grp_list_fix: list[str] = []
-                
+            
                 for wd_grp in wd_grp_list:
                     if any(sn in wd_grp for sn in sNumList):
                         # This word group contains one of our target Strong's numbers
@@ -131,20 +167,20 @@ def generate(sNumList: List[str], output_path: Optional[str] = None) -> None:
                         if len(parts) >= 2:
                             wds = parts[0]
                             sns = parts[1].rstrip(']')
-                            
+                        
                             # Mark this word group
                             wd_grp = re.sub(r'(\W?\s?)(.+)', r'\1**\2**', wd_grp)
-                            
+                        
                             # Extract word
                             clean_word = re.sub(r'[^\w\s]', '', wds).strip()
                             if clean_word:
                                 wd_list.append(clean_word)
-                            
+                        
                             # Get Strong's data
                             try:
                                 if sns in strongsData.strongsData:
                                     data = strongsData.strongsData[sns]
-                                    
+                                
                                     ow = f'{sns} {data[0]}'
                                     if ow not in ow_list:
                                         ow_list.append(ow)
@@ -157,15 +193,15 @@ def generate(sNumList: List[str], output_path: Optional[str] = None) -> None:
                     else:
                         # Remove Strong's numbers from non-matching words
                         wd_grp = re.sub(r'\[[GH]\d+\]', '', wd_grp)
-                    
-                    wd_grp_list_fix.append(wd_grp)
                 
+                    wd_grp_list_fix.append(wd_grp)
+            
                 vs_txt_fix = ''.join(wd_grp_list_fix)
-                
+            
                 # Extract book and reference
                 ref_parts = str(row[1]).split() if row[1] else ["", ""]
                 bk = ref_parts[0] if ref_parts else ""
-                
+            
                 # Create CSV line with proper escaping
                 line_data = [
                     str(idx),
@@ -177,35 +213,47 @@ def generate(sNumList: List[str], output_path: Optional[str] = None) -> None:
                     ', '.join(trans_list),
                     ', '.join(def_list)
                 ]
-                
+            
                 # Properly escape CSV fields
                 escaped_fields: list[str] = []
                 for field in line_data:
                     if '"' in field:
                         field = field.replace('"', '""')
                     escaped_fields.append(f'"{field}"')
-                
+            
                 csv_lines.append(','.join(escaped_fields))
                 idx += 1
-        
-        con.close()
-        
-        # Write CSV file
-        with codecs.open(csv_filename, 'w', 'utf-8') as csvout:
-            csvout.write('\n'.join(csv_lines))
-        
-        print(f'CSV Generated: {csv_filename}')
-        print(f'Total entries: {idx - 1}')
-        
+    instrumentation.count("rows", rows)
+    
+    
+    instrumentation.count("matches", idx - 1)
+    
+    # Write CSV file
+    with instrumentation.stage("write"), io.TextIOWrapper(open_output(csv_filename, compress), encoding='utf-8', newline='') as csvout:
+        csvout.write('\n'.join(csv_lines))
+    
+    print(f'CSV Generated: {csv_filename}')
+    print(f'Total entries: {idx - 1}')
+    
+    return instrumentation.counters
+
+
+def generate(sNumList: List[str], output_path: Optional[str] = None, compress: str = "none",
+             instrumentation: Optional[Instrumentation] = None) -> None:
+    """Generate CSV file with Strong's numbers data."""
+    import sqlite3 as sqlite
+    
+    try:
+        convert(sNumList, 'av1769s.bib', output_path, compress, instrumentation)
+    except RuntimeError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
     except sqlite.Error as e:
         print(f"Database error: {e}")
         sys.exit(1)
     except IOError as e:
         print(f"File I/O error: {e}")
         sys.exit(1)
-    except Exception as e:
-        print(f"Unexpected error: {e}")
-        sys.exit(1)
 
 
 def main() -> None:
@@ -0,0 +1,72 @@
+"""
+Round trips varint postings and looks words up in a small concordance.
+"""
+
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "bible_converter"))
+from common import verse_id
+from concordance import POSITION_MASK, Concordance, ConcordanceBuilder, decode_postings, encode_postings, normalize
+from verse_store import StoredWord
+
+ids = verse_id.parse_osis
+
+
+def words(*texts):
+    return [StoredWord(text, None, None, None, None) for text in texts]
+
+
+def test_varint_round_trip():
+    rng = random.Random("postings")
+    postings = sorted({rng.randrange(1 << 33) for _ in range(1000)})
+    assert decode_postings(encode_postings(postings)) == postings
+
+
+@pytest.mark.parametrize("postings, size", [([0], 1), ([127], 1), ([128], 2), ([1, 2, 3], 3), ([16384], 3), ([1 << 32], 5)])
+def test_varint_sizes(postings, size):
+    data = encode_postings(postings)
+    assert len(data) == size
+    assert decode_postings(data) == postings
+
+
+@pytest.mark.parametrize("text, key", [("LORD", "lord"), ("Lord's,", "lord"), ("(God", "god"), ("--", ""), ("Jesus'", "jesus")])
+def test_normalize(text, key):
+    assert normalize(text) == key
+
+
+@pytest.fixture
+def concordance(tmp_path):
+    builder = ConcordanceBuilder()
+    builder.add_verse(ids("Gen.1.1"), words("In", "the", "beginning", "God", "created"))
+    builder.add_verse(ids("Gen.1.2"), words("And", "the", "Spirit", "of", "God", "God's"))
+    builder.add_verse(ids("John.1.1"), words("In", "the", "beginning", "was", "--"))
+    path = str(tmp_path / "out.concordance")
+    builder.write(path)
+    return Concordance(path)
+
+
+def test_lookup(concordance):
+    assert concordance.lookup("god") == [(ids("Gen.1.1"), 3), (ids("Gen.1.2"), 4), (ids("Gen.1.2"), 5)]
+    assert concordance.lookup("Beginning") == [(ids("Gen.1.1"), 2), (ids("John.1.1"), 2)]
+    assert concordance.lookup("missing") == []
+
+
+def test_frequency_and_verses(concordance):
+    assert concordance.frequency("THE") == 3
+    assert concordance.frequency("missing") == 0
+    assert concordance.verses("God") == [ids("Gen.1.1"), ids("Gen.1.2")]
+    assert "spirit" in concordance
+    # Punctuation has no key
+    assert "" not in concordance.words()
+    assert len(concordance) == 9
+
+
+def test_too_many_words():
+    builder = ConcordanceBuilder()
+    with pytest.raises(RuntimeError, match="more than"):
+        builder.add_verse(ids("Gen.1.1"), words(*["word"] * (POSITION_MASK + 2)))
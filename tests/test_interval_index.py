@@ -0,0 +1,62 @@
+"""
+Stabs and overlaps the interval index, checked against a linear scan of
+random intervals, and round trips it through a file.
+"""
+
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common import verse_id
+from common.interval_index import IntervalIndex
+
+
+def random_intervals(rng: random.Random, count: int):
+    intervals = []
+    for payload in range(count):
+        start = rng.randrange(1 << 16, 4 << 16)
+        # Mostly single verses and short ranges, with the odd wide one
+        width = rng.choice([0, 0, 0, rng.randrange(20), rng.randrange(1 << 16)])
+        intervals.append((start, start + width, payload))
+    return intervals
+
+
+def scan(intervals, start: int, end: int):
+    return sorted(payload for s, e, payload in intervals if s <= end and e >= start)
+
+
+def test_matches_linear_scan():
+    rng = random.Random("intervals")
+    intervals = random_intervals(rng, 2000)
+    index = IntervalIndex.build(intervals)
+    for _ in range(500):
+        point = rng.randrange(1 << 16, 5 << 16)
+        assert sorted(index.stab(point)) == scan(intervals, point, point)
+        end = point + rng.randrange(300)
+        assert sorted(index.overlapping(point, end)) == scan(intervals, point, end)
+
+
+def test_wide_interval_found_after_narrow_ones():
+    # The chapter range starts first, so only the running maximum of the ends finds it
+    ps90 = verse_id.span(verse_id.parse_osis("Ps.90"), verse_id.parse_osis("Ps.92"))
+    index = IntervalIndex.build([
+        (*ps90, 0),
+        (verse_id.parse_osis("Ps.90.1"), verse_id.parse_osis("Ps.90.1"), 1),
+        (verse_id.parse_osis("Ps.91.2"), verse_id.parse_osis("Ps.91.4"), 2),
+    ])
+    assert index.stab(verse_id.parse_osis("Ps.91.3")) == [0, 2]
+    assert index.stab(verse_id.parse_osis("Ps.92.20")) == [0]
+    assert index.stab(verse_id.parse_osis("Ps.93.1")) == []
+    assert index.overlapping(*verse_id.parse_osis_range("Ps.89")) == []
+
+
+def test_save_load(tmp_path):
+    intervals = random_intervals(random.Random("save"), 100)
+    index = IntervalIndex.build(intervals)
+    path = str(tmp_path / "tsk_xrefs.intervals")
+    index.save(path)
+    loaded = IntervalIndex.load(path)
+    assert len(loaded) == len(index)
+    assert (list(loaded.starts), list(loaded.ends), list(loaded.payloads)) == (list(index.starts), list(index.ends), list(index.payloads))
+    assert list(loaded.max_ends) == list(index.max_ends)
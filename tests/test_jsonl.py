@@ -0,0 +1,136 @@
+"""
+Round trips random records through `JsonlWriter` and `read_jsonl`, with the
+orjson encoder when it is installed and with the stdlib json fallback.
+"""
+
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common import jsonl
+from common.jsonl import IndexedJsonl, JsonlWriter, read_jsonl
+from common.offset_index import index_path
+
+# Characters that need escaping or are easy to mangle: quotes, backslashes,
+# control characters, line separators, DEL, non-ASCII letters, the code
+# points either side of the surrogates, an astral character and a BOM
+EDGE_CASES = ['"', '\\', '/', '\n', '\r', '\t', '\b', '\f', '\0', '\x1f', '\x7f',
+              '\u2028', '\u2029', '\u00e9', '\u00df', '\ufb01', '\u05d0', '\u4e2d', '\ud7ff', '\ue000', '\U0001f600', '\ufeff']
+
+
+def random_text(rng: random.Random) -> str:
+    chars = []
+    for _ in range(rng.randrange(12)):
+        kind = rng.random()
+        if kind < 0.3:
+            chars.append(rng.choice(EDGE_CASES))
+        elif kind < 0.6:
+            chars.append(chr(rng.randrange(0x20, 0x7f)))
+        else:
+            # Any code point but the surrogates, which aren't valid UTF-8
+            code = rng.randrange(0x110000 - 0x800)
+            chars.append(chr(code if code < 0xd800 else code + 0x800))
+    return "".join(chars)
+
+
+def random_value(rng: random.Random, depth: int = 0):
+    kind = rng.randrange(8 if depth < 3 else 5)
+    if kind == 0:
+        return random_text(rng)
+    if kind == 1:
+        return rng.randrange(-2 ** 63, 2 ** 63)
+    if kind == 2:
+        return rng.choice([True, False, None])
+    if kind == 3:
+        return rng.choice([0.0, -1.5, 1e-300, 2.5e300, rng.random()])
+    if kind == 4:
+        return rng.randrange(-1000, 1000)
+    if kind == 5:
+        return [random_value(rng, depth + 1) for _ in range(rng.randrange(5))]
+    return {random_text(rng): random_value(rng, depth + 1) for _ in range(rng.randrange(5))}
+
+
+def random_record(rng: random.Random) -> dict:
+    # Shaped like the converters' records, with random contents
+    return {
+        "type": "directed",
+        "source": random_text(rng),
+        "targets": [random_text(rng) for _ in range(rng.randrange(4))],
+        "votes": [rng.randrange(-5, 500) for _ in range(rng.randrange(4))],
+        "extra": random_value(rng),
+    }
+
+
+@pytest.fixture(params=["orjson", "json"])
+def encoding(request, monkeypatch):
+    """Runs a test with each encoder, resetting the cached encoder and decoder around it."""
+    if request.param == "orjson":
+        pytest.importorskip("orjson")
+    else:
+        # A None entry makes `import orjson` raise ImportError
+        monkeypatch.setitem(sys.modules, "orjson", None)
+    monkeypatch.setattr(jsonl, "_encode", None)
+    monkeypatch.setattr(jsonl, "_decode", None)
+    return request.param
+
+
+def test_round_trip(encoding, tmp_path):
+    rng = random.Random(f"jsonl:{encoding}")
+    records = [random_record(rng) for _ in range(2000)]
+    path = str(tmp_path / "out.jsonl")
+
+    with JsonlWriter(path) as writer:
+        for record in records:
+            writer.write(record)
+
+    assert writer.count == len(records)
+    assert list(read_jsonl(path)) == records
+    with open(path, 'rb') as f:
+        data = f.read()
+    # One record per line, so raw newlines in strings must all be escaped
+    assert data.count(b"\n") == len(records)
+    data.decode('utf-8')
+
+
+@pytest.mark.parametrize("text", EDGE_CASES + ["".join(EDGE_CASES), ""])
+def test_edge_cases(encoding, tmp_path, text):
+    path = str(tmp_path / "out.jsonl")
+    record = {"word": text, "definitions": [text, text * 3]}
+    with JsonlWriter(path) as writer:
+        writer.write(record)
+    assert list(read_jsonl(path)) == [record]
+
+
+def test_write_encoded(encoding, tmp_path):
+    rng = random.Random(f"jsonl_encoded:{encoding}")
+    records = [random_record(rng) for _ in range(200)]
+    path = str(tmp_path / "out.jsonl")
+
+    # Like tsk_xref: lines encoded ahead of time, written in chunks
+    encode = jsonl.encoder()
+    with JsonlWriter(path) as writer:
+        for start in range(0, len(records), 50):
+            chunk = records[start:start + 50]
+            writer.write_encoded(b"".join(encode(record) + b"\n" for record in chunk), len(chunk))
+
+    assert list(read_jsonl(path)) == records
+
+
+def test_index_skipped_on_error(tmp_path):
+    path = str(tmp_path / "out.jsonl")
+    index = index_path(path)
+
+    with JsonlWriter(path, index=index) as writer:
+        writer.write({"id": 1}, key=1)
+    with IndexedJsonl(path) as indexed:
+        assert indexed.get(1) == {"id": 1}
+
+    # A failed rewrite leaves no index behind, neither a partial one nor the earlier one
+    with pytest.raises(RuntimeError):
+        with JsonlWriter(path, index=index) as writer:
+            writer.write({"id": 2}, key=2)
+            raise RuntimeError("conversion failed")
+    assert not os.path.exists(index)
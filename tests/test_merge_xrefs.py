@@ -0,0 +1,100 @@
+"""
+Merges open_xref and TSK edges, with NumPy and with the int key loop.
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "xrefs"))
+from common import verse_id
+from common.binary_io import u32_array
+from common.jsonl import read_jsonl
+from common.xref_edges import Edges, load_edges, save_edges
+from merge_xrefs import merge
+
+
+@pytest.fixture(params=[True, False], ids=["numpy", "python"])
+def columnar(request):
+    if request.param:
+        pytest.importorskip("numpy")
+    return request.param
+
+
+def write_edges(path, edges):
+    """Saves `(source, target, votes)` edges, with OSIS refs for the source and target."""
+    columns = Edges(u32_array(), u32_array(), u32_array(), u32_array())
+    for source, target, votes in edges:
+        start, end = verse_id.parse_osis_range(target)
+        columns.sources.append(verse_id.parse_osis(source))
+        columns.starts.append(start)
+        columns.ends.append(end)
+        columns.votes.append(votes)
+    save_edges(path, columns)
+    return path
+
+
+def run_merge(tmp_path, open_xref, tsk, columnar):
+    output = str(tmp_path / "xrefs.jsonl")
+    merge(write_edges(str(tmp_path / "open_xref.edges"), open_xref), write_edges(str(tmp_path / "tsk.edges"), tsk),
+          output, columnar=columnar)
+    return list(read_jsonl(output))
+
+
+def test_save_load(tmp_path):
+    path = write_edges(str(tmp_path / "out.jsonl.edges"), [("Gen.1.1", "John.1.1-John.1.3", 12), ("Gen.1.2", "Ps.90", 0)])
+    edges = load_edges(path)
+    assert list(edges.sources) == [verse_id.parse_osis("Gen.1.1"), verse_id.parse_osis("Gen.1.2")]
+    assert list(edges.starts) == [verse_id.parse_osis("John.1.1"), verse_id.parse_osis("Ps.90")]
+    assert list(edges.ends) == [verse_id.parse_osis("John.1.3"), verse_id.pack(19, 90, verse_id.VERSE_MAX)]
+    assert list(edges.votes) == [12, 0]
+
+
+def test_merge(tmp_path, columnar):
+    open_xref = [
+        ("Gen.1.1", "John.1.1", 30),
+        ("Gen.1.1", "John.1.2", 8),
+        ("Gen.1.1", "Heb.11.3", 5),
+        # A repeated edge adds up its votes
+        ("Gen.1.1", "Heb.11.3", 2),
+        ("Gen.1.1", "Ps.33.6", 4),
+        ("Exod.3.14", "John.8.58", 50),
+    ]
+    tsk = [
+        # Covers both John verses
+        ("Gen.1.1", "John.1.1-John.1.3", 0),
+        ("Gen.1.1", "Heb.11.3", 0),
+        ("Gen.1.1", "Ps.90", 0),
+        ("Gen.1.2", "Ps.104.30", 0),
+    ]
+    assert run_merge(tmp_path, open_xref, tsk, columnar) == [
+        {
+            "type": "directed",
+            "source": "Gen.1.1",
+            "targets": ["Ps.33.6", "Ps.90", "John.1.1-John.1.3", "Heb.11.3"],
+            "votes": [4, None, 30, 7],
+            "provenance": [["open_xref"], ["tsk"], ["open_xref", "tsk"], ["open_xref", "tsk"]],
+        },
+        {"type": "directed", "source": "Gen.1.2", "targets": ["Ps.104.30"], "votes": [None], "provenance": [["tsk"]]},
+        {"type": "directed", "source": "Exod.3.14", "targets": ["John.8.58"], "votes": [50], "provenance": [["open_xref"]]},
+    ]
+
+
+def test_overlapping_ranges(tmp_path, columnar):
+    # Ranges that overlap without containing each other are both kept, and
+    # ranges across books take the slower sort
+    tsk = [
+        ("Gen.1.1", "Gen.1.1-Exod.40.38", 0),
+        ("Gen.1.1", "Exod.1.1-Lev.1.1", 0),
+        ("Gen.1.1", "Exod.2.1", 0),
+    ]
+    records = run_merge(tmp_path, [("Gen.1.1", "Lev.1.1", 3)], tsk, columnar)
+    assert records[0]["targets"] == ["Gen.1.1-Exod.40.38", "Exod.1.1-Lev.1.1"]
+    assert records[0]["votes"] == [None, 3]
+    assert records[0]["provenance"] == [["tsk"], ["open_xref", "tsk"]]
+
+
+def test_empty(tmp_path, columnar):
+    assert run_merge(tmp_path, [], [], columnar) == []
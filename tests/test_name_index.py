@@ -0,0 +1,60 @@
+"""
+Prefix and trigram lookups in a small name index.
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "hbnd_converter"))
+from name_index import NameIndex, NameIndexBuilder, trigrams
+
+NAMES = ["Aaron", "Abel", "Abel-meholah", "Abraham", "Abram", "Absalom", "Zerubbabel", "Éber", "Eber"]
+
+
+@pytest.fixture
+def index(tmp_path):
+    builder = NameIndexBuilder()
+    for name in NAMES + ["Abram"]:
+        builder.add(name)
+    path = str(tmp_path / "names.nameidx")
+    builder.write(path)
+    return NameIndex(path)
+
+
+def test_names(index):
+    assert len(index) == len(NAMES)
+    assert sorted(index.names()) == sorted(NAMES)
+    assert "abraham" in index
+    assert "Abrahams" not in index
+
+
+def test_prefix(index):
+    assert index.prefix("abr") == ["Abraham", "Abram"]
+    assert index.prefix("ABEL") == ["Abel", "Abel-meholah"]
+    assert index.prefix("a", limit=2) == ["Aaron", "Abel"]
+    assert index.prefix("éb") == ["Éber"]
+    assert index.prefix("q") == []
+
+
+def test_trigrams():
+    assert trigrams("Abel") == {"  a", " ab", "abe", "bel", "el "}
+
+
+def test_fuzzy(index):
+    # Jaccard similarity of the padded trigram sets: 5 shared of 10, and 4 of 9
+    assert index.fuzzy("Abrahm") == [("Abraham", 0.5), ("Abram", pytest.approx(4 / 9))]
+    assert index.fuzzy("Abrahm", threshold=0.45) == [("Abraham", 0.5)]
+    assert index.fuzzy("Abrahm", limit=1) == [("Abraham", 0.5)]
+    assert index.fuzzy("Absalom")[0] == ("Absalom", 1.0)
+    assert index.fuzzy("xyz") == []
+
+
+def test_empty(tmp_path):
+    path = str(tmp_path / "empty.nameidx")
+    NameIndexBuilder().write(path)
+    index = NameIndex(path)
+    assert len(index) == 0
+    assert index.prefix("a") == []
+    assert index.fuzzy("a") == []
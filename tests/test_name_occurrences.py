@@ -0,0 +1,33 @@
+"""
+Joins names to the verses of a small Bible, with the punctuation that
+`bible_converter` leaves attached to words it can't split.
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "hbnd_converter"))
+from name_occurrences import find_occurrences
+
+
+@pytest.mark.parametrize("word", ["Abraham", "Abraham's", "Abraham's,", "(Abraham's", "Abraham;", "\"Abraham", "ABRAHAM"])
+def test_matches_punctuated_words(word):
+    assert find_occurrences(["Abraham"], [(1, ["And", word, "said"])]) == {"Abraham": [1]}
+
+
+def test_hyphens_and_proper_nouns():
+    verses = [
+        (1, ["fled", "to", "Abelmeholah."]),
+        (2, ["job", "and", "eve"]),
+        (3, ["Job", "answered"]),
+        (4, ["Moses'", "rod"]),
+    ]
+    occurrences = find_occurrences(["Abel-meholah", "Job", "Eve", "Moses"], verses)
+    assert occurrences == {"Abel-meholah": [1], "Job": [3], "Eve": [], "Moses": [4]}
+
+
+def test_out_of_order_verses():
+    verses = [(5, ["Isaac"]), (2, ["Isaac", "Isaac"]), (5, ["Isaac"])]
+    assert find_occurrences(["Isaac"], verses) == {"Isaac": [2, 5]}
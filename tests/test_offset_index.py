@@ -0,0 +1,50 @@
+"""
+Builds, saves and loads offset indexes keyed by verse id and by string.
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.offset_index import OffsetIndex
+
+
+def round_trip(index, tmp_path):
+    path = str(tmp_path / "out.jsonl.idx")
+    index.save(path)
+    return OffsetIndex.load(path)
+
+
+def test_verse_ids(tmp_path):
+    # Out of order, with a repeated key whose lines keep their file order
+    entries = [(0x010102, 0, 10), (0x010101, 11, 20), (0x420101, 32, 5), (0x010102, 38, 7)]
+    for index in (OffsetIndex.build(entries), round_trip(OffsetIndex.build(entries), tmp_path)):
+        assert len(index) == 4
+        assert index.find(0x010101) == [(11, 20)]
+        assert index.find(0x010102) == [(0, 10), (38, 7)]
+        assert index.find(0x420101) == [(32, 5)]
+        assert index.find(0x010103) == []
+
+
+def test_strings(tmp_path):
+    entries = [("H430", 0, 100), ("G2316", 101, 50), ("Éber", 152, 9), ("Eber", 162, 3), ("H430", 166, 4), ("", 171, 2)]
+    for index in (OffsetIndex.build(entries), round_trip(OffsetIndex.build(entries), tmp_path)):
+        assert index.find("H430") == [(0, 100), (166, 4)]
+        assert index.find("Éber") == [(152, 9)]
+        assert index.find("Eber") == [(162, 3)]
+        assert index.find("") == [(171, 2)]
+        assert index.find("H43") == []
+
+
+def test_large_offsets(tmp_path):
+    index = round_trip(OffsetIndex.build([(1, 1 << 40, 3)]), tmp_path)
+    assert index.find(1) == [(1 << 40, 3)]
+
+
+def test_key_type_errors():
+    with pytest.raises(RuntimeError, match="all verse ids or all strings"):
+        OffsetIndex.build([(1, 0, 1), ("a", 2, 1)])
+    with pytest.raises(RuntimeError, match="key type"):
+        OffsetIndex.build([(1, 0, 1)]).find("a")
@@ -0,0 +1,69 @@
+"""
+Validates JSONL records and the binary sidecars (verse store, interval index
+and xref edges) against the KJV versification.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "bible_converter"))
+from common import verse_id
+from common.binary_io import u32_array
+from common.interval_index import IntervalIndex
+from common.jsonl import JsonlWriter
+from common.validate import validate_file
+from common.xref_edges import Edges, save_edges
+from verse_store import StoredWord, write_verse_store
+
+ids = verse_id.parse_osis
+
+
+def messages(violations):
+    return [str(violation) for violation in violations]
+
+
+def test_jsonl(tmp_path):
+    path = str(tmp_path / "out.jsonl")
+    with JsonlWriter(path) as writer:
+        writer.write({"source": "Gen.1.1", "targets": ["Gen.1.2-Gen.1.4", "Ps.151.1"]})
+        writer.write({"source": "Gen.1.32", "targets": ["Gen.2.3-Gen.2.1", 7, "Nope"]})
+    assert messages(validate_file(path)) == [
+        "Line 1: Not in the kjv versification: 'Ps.151.1'",
+        "Line 2: Range ends before it starts: 'Gen.2.3-Gen.2.1'",
+        "Line 2: Reference is not a string: '7'",
+        "Line 2: Malformed reference: 'Nope'",
+        "Line 2: Not in the kjv versification: 'Gen.1.32'",
+    ]
+
+
+def test_verse_store(tmp_path):
+    path = str(tmp_path / "out.vstore")
+    word = [StoredWord("word", None, None, None, None)]
+    write_verse_store(path, [(ids("Gen.1.1"), word), (ids("Gen.1.3"), word), (ids("Mal.5.1"), word)])
+    # Gen.1.2 is stored as a gap, without its presence bit
+    assert messages(validate_file(path)) == ["Verse 3: Not in the kjv versification: 'Mal.5.1'"]
+
+
+def test_intervals(tmp_path):
+    path = str(tmp_path / "tsk_xrefs.intervals")
+    IntervalIndex.build([
+        (*verse_id.span(ids("Ps.90"), ids("Ps.92")), 0),
+        (ids("Gen.1.31"), ids("Gen.1.32"), 1),
+        (ids("Exod.2.3"), ids("Exod.2.1"), 2),
+    ]).save(path)
+    assert messages(validate_file(path)) == [
+        "Interval 1: Not in the kjv versification: 'Gen.1.31-Gen.1.32'",
+        "Interval 2: Range ends before it starts: 'Exod.2.3-Exod.2.1'",
+    ]
+
+
+def test_edges(tmp_path):
+    path = str(tmp_path / "out.jsonl.edges")
+    save_edges(path, Edges(
+        u32_array([ids("Gen.1.1"), ids("Gen.1.40")]),
+        u32_array([ids("John.3.16"), ids("Rom.8.28")]),
+        u32_array([ids("John.3.16"), ids("Rom.8.28")]),
+        u32_array([5, 0]),
+    ))
+    assert messages(validate_file(path)) == ["Edge 2: Not in the kjv versification: 'Gen.1.40'"]
@@ -0,0 +1,50 @@
+"""
+Packs, parses and formats verse ids and ranges.
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common import verse_id
+
+
+def test_pack_round_trip():
+    id = verse_id.pack(1, 28, 15)
+    assert id == 0x011C0F
+    assert verse_id.unpack(id) == (1, 28, 15)
+    assert verse_id.pack(66, 22) == 0x421600
+
+
+def test_ids_sort_canonically():
+    refs = ["Gen.1.1", "Gen.1.2", "Gen.1.10", "Gen.2.1", "Gen.50.26", "Exod.1.1", "Rev.22.21"]
+    ids = [verse_id.parse_osis(ref) for ref in refs]
+    assert ids == sorted(ids)
+    # A chapter id sorts before its verses
+    assert verse_id.parse_osis("Gen.2") < verse_id.parse_osis("Gen.2.1")
+
+
+@pytest.mark.parametrize("ref", ["Gen.28.21-Gen.28.29", "Gen.1-Gen.2", "Ps.90", "Ps.119.176", "Matt.5.3-Matt.7.29", "Gen.50-Exod.1"])
+def test_range_round_trip(ref):
+    assert verse_id.format_osis_range(*verse_id.parse_osis_range(ref)) == ref
+
+
+def test_chapter_ranges_span_the_chapter():
+    start, end = verse_id.parse_osis_range("Ps.90-Ps.92")
+    assert (start, end) == (verse_id.parse_osis("Ps.90"), verse_id.pack(19, 92, verse_id.VERSE_MAX))
+    assert verse_id.chapter_bounds(19, 90) == verse_id.parse_osis_range("Ps.90")
+
+
+@pytest.mark.parametrize("ref", ["Gen", "Gen.1.2.3", "Genesis.1.1", "Gen.0.1", "Gen.256.1", "Gen.1.255", "Gen.x.1"])
+def test_parse_errors(ref):
+    with pytest.raises(ValueError):
+        verse_id.parse_osis(ref)
+
+
+def test_pack_errors():
+    with pytest.raises(ValueError):
+        verse_id.pack(1, 0, 1)
+    with pytest.raises(ValueError):
+        verse_id.pack(1, 1, 256)
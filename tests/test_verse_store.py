@@ -0,0 +1,85 @@
+"""
+Writes and reads back a verse store, telling missing verses (`None`) from
+empty ones (`[]`) through the presence bitmap.
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "bible_converter"))
+from common import verse_id
+from verse_store import StoredWord, VerseStore, write_verse_store
+
+ids = verse_id.parse_osis
+
+IN = StoredWord("In", None, None, None, None)
+BEGINNING = StoredWord("beginning", False, True, "(", ",)")
+JESUS = StoredWord("Jesus", True, None, None, None)
+NAME = StoredWord("אלהים", None, False, None, ".")
+
+VERSES = {
+    "Gen.1.1": [IN, BEGINNING],
+    # Gen.1.2 is missing, Gen.1.3 is present but empty
+    "Gen.1.3": [],
+    "Gen.1.4": [NAME],
+    # Chapters 2 and 3 are missing
+    "Gen.4.2": [IN],
+    "John.11.35": [JESUS],
+}
+
+
+@pytest.fixture
+def store(tmp_path):
+    path = str(tmp_path / "out.vstore")
+    # Verses may arrive in any order
+    write_verse_store(path, [(ids(ref), words) for ref, words in reversed(VERSES.items())])
+    with VerseStore(path) as store:
+        yield store
+
+
+def test_verses(store):
+    for ref, words in VERSES.items():
+        assert store.verse(ids(ref)) == words
+
+
+def test_missing_verses(store):
+    for ref in ("Gen.1.2", "Gen.1.5", "Gen.2.1", "Gen.4.1", "Gen.5.1", "Exod.1.1", "Rev.22.21"):
+        assert store.verse(ids(ref)) is None
+    assert store.verse_bytes(ids("Gen.1.2")) is None
+    assert store.verse_bytes(ids("Gen.1.3")) == b""
+
+
+def test_counts(store):
+    assert store.chapter_count(1) == 4
+    assert store.verse_count(1, 1) == 4
+    assert store.verse_count(1, 2) == 0
+    assert store.chapter_count(2) == 0
+
+
+def test_ids(store):
+    assert list(store.ids()) == [ids(ref) for ref in VERSES]
+
+
+def test_ranges(store):
+    assert [id for id, _ in store.verses(*verse_id.parse_osis_range("Gen.1.2-Gen.4.5"))] == \
+        [ids("Gen.1.3"), ids("Gen.1.4"), ids("Gen.4.2")]
+    assert store.chapter(1, 1) == [(ids(ref), VERSES[ref]) for ref in ("Gen.1.1", "Gen.1.3", "Gen.1.4")]
+    assert store.chapter(1, 2) == []
+
+
+def test_presence_bits_past_a_byte(tmp_path):
+    # Every third verse of a long chapter, so the bitmap spans several bytes
+    path = str(tmp_path / "out.vstore")
+    present = range(1, 40, 3)
+    write_verse_store(path, [(verse_id.pack(19, 119, verse), [IN]) for verse in present])
+    with VerseStore(path) as store:
+        for verse in range(1, 41):
+            assert (store.verse(verse_id.pack(19, 119, verse)) is not None) == (verse in present)
+
+
+def test_duplicate_verse(tmp_path):
+    with pytest.raises(RuntimeError, match="Duplicate verse"):
+        write_verse_store(str(tmp_path / "out.vstore"), [(ids("Gen.1.1"), [IN]), (ids("Gen.1.1"), [])])
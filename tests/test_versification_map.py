@@ -0,0 +1,89 @@
+"""
+Maps verses, chapters and ranges through the built in mappings, with and
+without NumPy.
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common import verse_id, versification_map
+from common.books import BOOKS
+from common.remap import remap_records
+from common.validate import validate_records
+from common.versification import KJV, SCHEMES
+from common.versification_map import expand, get_mapping, parse_mapping
+
+
+@pytest.fixture(params=["numpy", "python"])
+def vectorized(request, monkeypatch):
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(versification_map, "numpy", None)
+    return request.param
+
+
+def map_ref(mapping, ref: str) -> str:
+    return verse_id.format_osis_range(*mapping.map_range(*verse_id.parse_osis_range(ref)))
+
+
+@pytest.mark.parametrize("ref, expected", [
+    ("Joel.3.1", "Joel.2.28"),
+    ("Joel.4.21", "Joel.3.21"),
+    ("Mal.3.19-Mal.3.24", "Mal.4.1-Mal.4.6"),
+    ("Gen.32.1", "Gen.31.55"),
+    ("Gen.1.1", "Gen.1.1"),
+    # Whole chapters stay chapters when they land on whole chapters
+    ("Joel.4", "Joel.3"),
+    ("Joel.3-Joel.4", "Joel.2.28-Joel.3.21"),
+    ("Mal.3", "Mal.3-Mal.4"),
+    ("Joel.3", "Joel.2.28-Joel.2.32"),
+    ("Gen.1-Gen.2", "Gen.1-Gen.2"),
+])
+def test_mt_to_kjv(ref, expected):
+    assert map_ref(get_mapping("mt", "kjv"), ref) == expected
+
+
+def test_mt_maps_every_verse_once(vectorized):
+    mt = SCHEMES["mt"]
+    mapping = get_mapping("mt", "kjv")
+    ids = [id for book in BOOKS for id in expand(mt, verse_id.pack(book.index, 1, 1), verse_id.pack(book.index, 0xFF, 0xFF))]
+    kjv_ids = [id for book in BOOKS for id in expand(KJV, verse_id.pack(book.index, 1, 1), verse_id.pack(book.index, 0xFF, 0xFF))]
+    assert sorted(mapping.map_ids(ids)) == kjv_ids
+
+
+def test_map_ids_chapters(vectorized):
+    mapping = get_mapping("mt", "kjv")
+    ids = [verse_id.parse_osis(ref) for ref in ("Joel.4", "Joel.3", "Mal.3.24", "Gen.1")]
+    assert [verse_id.format_osis(id) for id in mapping.map_ids(ids)] == ["Joel.3", "Joel.2.28", "Mal.4.6", "Gen.1"]
+
+
+def test_remap_records(vectorized):
+    records = [
+        {"source": "Joel.4.1", "targets": ["Joel.4", "Mal.3", "Joel.3.1-Joel.3.5"]},
+        {"source": "Joel.3.1", "targets": ["Joel.3-Joel.4"]},
+        # Merged into the first record, as MT Joel 4:1 is KJV Joel 3:1
+        {"source": "Joel.4.1", "targets": ["Joel.4", "Gen.1.1"]},
+    ]
+    output = remap_records(records, get_mapping("mt", "kjv"))
+    assert output == [
+        {"source": "Joel.3.1", "targets": ["Joel.3", "Mal.3-Mal.4", "Joel.2.28-Joel.2.32", "Gen.1.1"]},
+        {"source": "Joel.2.28", "targets": ["Joel.2.28-Joel.3.21"]},
+    ]
+    assert validate_records(output) == []
+
+
+def test_3john15():
+    mapping = get_mapping("kjv_3john15", "kjv")
+    assert map_ref(mapping, "3John.1.15") == "3John.1.14"
+    assert map_ref(mapping, "3John.1") == "3John.1"
+
+
+def test_parse_mapping_errors():
+    with pytest.raises(RuntimeError, match="cannot be mapped"):
+        parse_mapping(["Gen.1.1-Gen.1.3 Gen.1.1-Gen.1.2"], "kjv", "kjv")
+    with pytest.raises(RuntimeError, match="not in the kjv versification"):
+        parse_mapping(["Mal.5.1 Mal.4.1"], "kjv", "kjv")
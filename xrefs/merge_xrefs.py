@@ -0,0 +1,294 @@
+"""
+Merges the open_xref and TSK cross references into a single dataset.
+
+Reads the packed edges that both converters write with `--edges` (see
+`common.xref_edges`), so neither JSONL output is read back and no OSIS ref
+is parsed. For each source verse, identical targets collapse into one, and
+targets contained in a wider target (e.g. a single verse covered by a TSK
+range) are folded into it. The merged target keeps the provenance of
+everything folded into it and the highest open_xref vote count.
+
+With NumPy, the edges of both inputs are sorted together by source, target
+start and widest target first, and a running maximum of the target ends marks
+the targets that are folded into the one before them. Without it, each edge
+becomes one int key that sorts the same way, and the keys are merged in a
+Python loop.
+
+Writes `xrefs.jsonl`, one line per source verse in canonical order, with each
+target formatted from its packed range, and with `--index` an offset index
+of it (`xrefs.jsonl.idx`).
+"""
+
+import sys
+import os
+import argparse
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common import verse_id
+from common.instrument import Instrumentation, add_instrument_arguments
+from common.jsonl import JsonlWriter
+from common.offset_index import add_index_argument, index_path
+from common.output import add_compress_argument
+from common.xref_edges import load_edges
+
+if TYPE_CHECKING:
+    import numpy
+
+OPEN_XREF = 1
+TSK = 2
+
+PROVENANCE_NAMES = {
+    OPEN_XREF: ["open_xref"],
+    TSK: ["tsk"],
+    OPEN_XREF | TSK: ["open_xref", "tsk"],
+}
+
+_ID_BITS = 23
+_ID_MASK = (1 << _ID_BITS) - 1
+_PROVENANCE_BITS = 2
+_WIDTH_BITS = 64 - 2 * _ID_BITS
+_WIDTH_MASK = (1 << _WIDTH_BITS) - 1
+
+
+def edge_key(source: int, start: int, end: int) -> int:
+    """Packs an edge so ints sort by source, then target start, then widest target first."""
+    return (((source << _ID_BITS) | start) << _ID_BITS) | (_ID_MASK - end)
+
+
+# A source's packed id, with the OSIS refs, votes (`None` without any
+# open_xref votes) and provenance of its merged targets
+MergedSource = Tuple[int, List[str], List[Optional[int]], List[List[str]]]
+
+
+def read_edges(path: str, provenance: int, votes: Dict[int, int]) -> List[int]:
+    """
+    Reads a converter's edges into sorted, provenance tagged edge keys,
+    adding the votes of each edge to `votes` by edge key.
+    """
+    keys: List[int] = []
+    for source, start, end, edge_votes in zip(*load_edges(path)):
+        key = edge_key(source, start, end)
+        keys.append((key << _PROVENANCE_BITS) | provenance)
+        if edge_votes:
+            votes[key] = votes.get(key, 0) + edge_votes
+    keys.sort()
+    return keys
+
+
+class MergedTarget:
+    __slots__ = ('key', 'end', 'provenance', 'votes')
+
+    def __init__(self, key: int, end: int, provenance: int, votes: Optional[int]) -> None:
+        self.key = key
+        self.end = end
+        self.provenance = provenance
+        self.votes = votes
+
+    def absorb(self, provenance: int, votes: Optional[int]) -> None:
+        self.provenance |= provenance
+        if votes is not None and (self.votes is None or votes > self.votes):
+            self.votes = votes
+
+
+def merge_edges(edges: List[int], votes: Dict[int, int]) -> Iterator[Tuple[int, List[MergedTarget]]]:
+    """
+    Walks sorted, tagged edge keys, yielding each source id with its
+    deduplicated targets. `MergedTarget.key` holds the target bits of the edge key.
+    """
+    provenance_mask = (1 << _PROVENANCE_BITS) - 1
+    target_mask = (1 << (2 * _ID_BITS)) - 1
+
+    source = -1
+    targets: List[MergedTarget] = []
+
+    for tagged in edges:
+        key = tagged >> _PROVENANCE_BITS
+        provenance = tagged & provenance_mask
+        edge_source = key >> (2 * _ID_BITS)
+        end = _ID_MASK - (key & _ID_MASK)
+        edge_votes = votes.get(key) if provenance == OPEN_XREF else None
+
+        if edge_source != source:
+            if targets:
+                yield source, targets
+            source = edge_source
+            targets = []
+        # Targets arrive by ascending start and descending end, so the last
+        # target always has the furthest end seen so far for this source.
+        elif end <= targets[-1].end:
+            targets[-1].absorb(provenance, edge_votes)
+            continue
+
+        targets.append(MergedTarget(key & target_mask, end, provenance, edge_votes))
+
+    if targets:
+        yield source, targets
+
+
+def merge_python(open_xref_path: str, tsk_path: str, instrumentation: Instrumentation) -> Iterator[MergedSource]:
+    """Reads and sorts the edges as int keys, returning the lazy merge of them."""
+    votes: Dict[int, int] = {}
+    with instrumentation.stage("read"):
+        edges = read_edges(open_xref_path, OPEN_XREF, votes)
+        instrumentation.count("open_xref_edges", len(edges))
+        tsk_edges = read_edges(tsk_path, TSK, votes)
+        instrumentation.count("tsk_edges", len(tsk_edges))
+    with instrumentation.stage("sort"):
+        edges += tsk_edges
+        edges.sort()
+
+    names: Dict[int, str] = {}
+
+    def name(key: int) -> str:
+        text = names.get(key)
+        if text is None:
+            text = names[key] = verse_id.format_osis_range(key >> _ID_BITS, _ID_MASK - (key & _ID_MASK))
+        return text
+
+    return ((source, [name(t.key) for t in targets], [t.votes for t in targets],
+             [PROVENANCE_NAMES[t.provenance] for t in targets]) for source, targets in merge_edges(edges, votes))
+
+
+def _edge_order(sources: 'numpy.ndarray', starts: 'numpy.ndarray', ends: 'numpy.ndarray') -> 'numpy.ndarray':
+    """Orders edges by source, then target start, then widest target first."""
+    import numpy
+
+    # Source and start take 46 bits of a u64 sort key, which leaves 18 bits
+    # for the width of the target. Wider targets (ranges across books) are
+    # rare, so they fall back to a much slower lexsort, as do reversed ranges.
+    widths = ends.astype(numpy.int64) - starts
+    if len(widths) and ((widths < 0) | (widths > _WIDTH_MASK)).any():
+        return numpy.lexsort([starts.astype(numpy.int64) - ends, starts, sources])
+    keys = (((sources.astype(numpy.uint64) << _ID_BITS) | starts) << _WIDTH_BITS) | (_WIDTH_MASK - widths).astype(numpy.uint64)
+    return numpy.argsort(keys)
+
+
+def _format_targets(targets: 'numpy.ndarray') -> List[str]:
+    """
+    Formats the packed targets (the low bits of `edge_key`) like
+    `verse_id.format_osis_range`, formatting each distinct verse id once.
+    """
+    import numpy
+
+    distinct, inverse = numpy.unique(targets, return_inverse=True)
+    starts = distinct >> _ID_BITS
+    ends = _ID_MASK - (distinct & _ID_MASK)
+    ids, id_inverse = numpy.unique(numpy.concatenate([starts, ends]), return_inverse=True)
+    names = numpy.array([verse_id.format_osis(id) for id in ids.tolist()], dtype=object)[id_inverse]
+    start_names = names[:len(starts)]
+    end_names = names[len(starts):]
+    single = (starts == ends) | ((starts & verse_id.VERSE_MAX == 0) & (ends == starts | verse_id.VERSE_MAX))
+    return numpy.where(single, start_names, start_names + "-" + end_names)[inverse].tolist()
+
+
+def merge_columnar(open_xref_path: str, tsk_path: str, instrumentation: Instrumentation) -> Iterator[MergedSource]:
+    """Merges the edges like `merge_python`, with NumPy sorts and scans over the edge columns."""
+    import numpy
+
+    with instrumentation.stage("read"):
+        inputs = [[numpy.asarray(column) for column in load_edges(path)] for path in (open_xref_path, tsk_path)]
+        instrumentation.count("open_xref_edges", len(inputs[0][0]))
+        instrumentation.count("tsk_edges", len(inputs[1][0]))
+
+    with instrumentation.stage("merge"):
+        provenance = numpy.concatenate([numpy.full(len(inputs[0][0]), OPEN_XREF, dtype=numpy.uint8),
+                                        numpy.full(len(inputs[1][0]), TSK, dtype=numpy.uint8)])
+        sources, starts, ends, votes = (numpy.concatenate(columns) for columns in zip(*inputs))
+        if not len(sources):
+            return iter([])
+        order = _edge_order(sources, starts, ends)
+        # Packed like the low bits of `edge_key`
+        targets = (starts.astype(numpy.uint64) << _ID_BITS) | (_ID_MASK - ends)
+        sources = sources[order]
+        targets = targets[order]
+
+        # Identical edges collapse first, adding up their votes (TSK edges have none)
+        first = numpy.ones(len(order), dtype=bool)
+        first[1:] = (sources[1:] != sources[:-1]) | (targets[1:] != targets[:-1])
+        firsts = numpy.flatnonzero(first)
+        sources = sources[firsts]
+        targets = targets[firsts]
+        votes = numpy.add.reduceat(votes[order].astype(numpy.int64), firsts)
+        provenance = numpy.bitwise_or.reduceat(provenance[order], firsts)
+
+        # A target is folded into the target before it unless it reaches
+        # further than every earlier target of its source. Sources are sorted,
+        # so a new source always reaches further than the previous one.
+        reach = (sources.astype(numpy.uint64) << _ID_BITS) | (_ID_MASK - (targets & _ID_MASK))
+        kept = numpy.ones(len(reach), dtype=bool)
+        kept[1:] = reach[1:] > numpy.maximum.accumulate(reach)[:-1]
+        heads = numpy.flatnonzero(kept)
+        sources = sources[heads]
+        targets = targets[heads]
+        target_votes = [v or None for v in numpy.maximum.reduceat(votes, heads).tolist()]
+        target_provenance = [PROVENANCE_NAMES[p] for p in numpy.bitwise_or.reduceat(provenance, heads).tolist()]
+        target_names = _format_targets(targets)
+
+        bounds = [0] + (numpy.flatnonzero(sources[1:] != sources[:-1]) + 1).tolist() + [len(heads)]
+        group_sources = sources[bounds[:-1]].tolist()
+
+    return ((source, target_names[start:end], target_votes[start:end], target_provenance[start:end])
+            for source, start, end in zip(group_sources, bounds, bounds[1:]))
+
+
+def merge(open_xref_path: str, tsk_path: str, output: str = "xrefs.jsonl", compress: str = "none", columnar: bool = True,
+          index_output: Optional[str] = None, instrumentation: Optional[Instrumentation] = None) -> Dict[str, int]:
+    """
+    Merges the edges written by the open_xref and TSK converters into JSONL
+    at `output`, and an offset index of the source verses at `index_output`
+    if given. Merges with NumPy when it is installed and `columnar` is set.
+    Returns the merge's counters.
+    """
+    if instrumentation is None:
+        instrumentation = Instrumentation("merge_xrefs")
+
+    for path in (open_xref_path, tsk_path):
+        if not os.path.isfile(path):
+            raise RuntimeError(f"File path {path} is not a valid path")
+
+    print("Reading files...")
+    merged = None
+    if columnar:
+        try:
+            merged = merge_columnar(open_xref_path, tsk_path, instrumentation)
+        except ImportError:
+            pass
+    if merged is None:
+        merged = merge_python(open_xref_path, tsk_path, instrumentation)
+
+    # The Python merge is lazy, so it is timed together with serializing and writing
+    with instrumentation.stage("merge_write"), JsonlWriter(output, compress=compress, index=index_output) as writer:
+        print(f"Writing to file: {writer.path}...")
+        for source, targets, votes, provenance in merged:
+            instrumentation.count("targets", len(targets))
+            writer.write({
+                "type": "directed",
+                "source": verse_id.format_osis(source),
+                "targets": targets,
+                "votes": votes,
+                "provenance": provenance,
+            }, key=source)
+    instrumentation.count("sources", writer.count)
+
+    return instrumentation.counters
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Merges open_xref and TSK cross references into xrefs.jsonl")
+    parser.add_argument("open_xref", help="path to the edges of the open_xref converter (open_xref.py --edges)")
+    parser.add_argument("tsk", help="path to the edges of the TSK converter (tsk_xref.py --edges)")
+    parser.add_argument("--pure-python", action="store_true", help="merge in Python even if NumPy is installed")
+    add_compress_argument(parser)
+    add_index_argument(parser)
+    add_instrument_arguments(parser)
+    args = parser.parse_args()
+
+    with Instrumentation.from_args("merge_xrefs", args) as instrumentation:
+        merge(args.open_xref, args.tsk, compress=args.compress, columnar=not args.pure_python, index_output=index_path("xrefs.jsonl") if args.index else None,
+              instrumentation=instrumentation)
+
+    print("Done!")
+
+if __name__ == "__main__":
+    main()
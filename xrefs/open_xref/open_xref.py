@@ -1,56 +1,294 @@
 import sys
 import os
-import csv
-from typing import List, Tuple, Dict
+import argparse
+from itertools import repeat
+from typing import TYPE_CHECKING, List, Optional, Tuple, Dict
 
-if len(sys.argv) < 2:
-    raise RuntimeError("You must pass a file path")
-elif len(sys.argv) > 2:
-    raise RuntimeError("More than 1 argument was supplied")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from common import verse_id
+from common.binary_io import u32_array
+from common.instrument import Instrumentation, add_instrument_arguments
+from common.jsonl import JsonlWriter
+from common.mmap_reader import read_rows
+from common.offset_index import add_index_argument, index_path
+from common.output import add_compress_argument
+from common.xref_edges import Edges, add_edges_argument, edges_path, save_edges
 
-path = sys.argv[1]
+if TYPE_CHECKING:
+    import numpy
+    import pyarrow
 
-if not os.path.isfile(path):
-    raise RuntimeError(f"File path {path} is not a valid path")
+# A source verse's packed id and OSIS id, with its targets, their votes and
+# the starts and ends of their packed id ranges
+XrefGroup = Tuple[int, str, List[str], List[int], List[int], List[int]]
 
-_, ext = os.path.splitext(path)
-if not ext == ".csv":
-    raise RuntimeError(f"File path {path} is not a json csv")
+COLUMNS = ["from", "to", "votes"]
 
-print(f"Reading file: {path}...")
+# Targets are ordered by (start, end), or by votes (highest first) and then (start, end)
+TARGET_ORDERS = ["canonical", "votes"]
 
-line_count = 0
-with open(path, 'r') as file:
-    for line_count, _ in enumerate(file, 1):
-        pass
+def read_python(path: str, target_order: str, instrumentation: Instrumentation) -> List[XrefGroup]:
+    """
+    Groups the rows with positive votes by source verse, ordered by packed
+    source id. Sources with the same id keep their order of first appearance,
+    and targets with the same sort key keep their CSV order.
+    """
+    data: Dict[str, Tuple[List[str], List[int]]] = {}
 
-data: Dict[str, Tuple[str, int, List[str]]] = {}
+    with instrumentation.stage("read"):
+        rows = read_rows(path, ",")
+        next(rows)
+        count = 0
+        for row in rows:
+            count += 1
+            from_verse = row[0]
+            to_verse = row[1]
+            votes = int(row[2])
+            if votes > 0:
+                entry = data.setdefault(from_verse, ([], []))
+                entry[0].append(to_verse)
+                entry[1].append(votes)
+            else:
+                instrumentation.count("skipped_rows")
+        instrumentation.count("rows", count)
 
-with open(path, 'r', newline='') as f:
-    reader = csv.reader(f, delimiter=",")
-    next(reader)
-    for row in reader:
-        print(f"{reader.line_num / line_count}%")
-        from_verse = row[0]
-        to_verse = row[1]
-        votes = int(row[2])
-        if votes > 0:
-            data.setdefault(from_verse, (from_verse, len(data), []))[2].append(to_verse)
+    with instrumentation.stage("transform"):
+        ranges: Dict[str, Tuple[int, int]] = {}
+        groups: List[XrefGroup] = []
+        for source, (targets, votes) in data.items():
+            keys: List[Tuple[int, int]] = []
+            for target in targets:
+                key = ranges.get(target)
+                if key is None:
+                    key = ranges[target] = verse_id.parse_osis_range(target)
+                keys.append(key)
 
-print("Writing to file: out.jsonl...")
+            if target_order == "votes":
+                order = sorted(range(len(targets)), key=lambda i: (-votes[i], keys[i]))
+            else:
+                order = sorted(range(len(targets)), key=keys.__getitem__)
+            groups.append((verse_id.parse_osis(source), source, [targets[i] for i in order], [votes[i] for i in order],
+                           [keys[i][0] for i in order], [keys[i][1] for i in order]))
+        groups.sort(key=lambda group: group[0])
+    return groups
 
-with open('out.jsonl', 'w') as file:
-    lines_data = sorted(list(data.values()), key=lambda i : i[1])
-    for line in lines_data:
-        source = line[0]
-        targets = line[2]
+# An OSIS id or range that `verse_id.parse_osis_range` parses, split into book, chapter and verse of both ends
+OSIS_RANGE_PATTERN = (r"^(?P<start_book>[^.-]+)\.(?P<start_chapter>\d+)(?:\.(?P<start_verse>\d+))?"
+                      r"(?:-(?P<end_book>[^.-]+)\.(?P<end_chapter>\d+)(?:\.(?P<end_verse>\d+))?)?$")
 
-        ref_str = "[ " + ", ".join(map(lambda x : f"\"{x}\"", targets)) + " ]"
-        json_str = f"{{ \"type\": \"directed\", \"source\": \"{source}\", \"targets\": {ref_str} }}\n"
+def _parse_ranges(refs: 'pyarrow.Array', ranges: bool = True) -> Optional['numpy.ndarray']:
+    """
+    Parses OSIS refs into an `(n, 2)` array of inclusive packed id ranges
+    like `verse_id.parse_osis_range` (or, with `ranges` unset, only single
+    ids like `verse_id.parse_osis`), with pyarrow string kernels instead of
+    a Python call per ref. Returns `None` if any ref is not in the plain
+    form, so the caller can parse them one by one and report errors the
+    same way as the csv module path.
+    """
+    import numpy
+    import pyarrow
+    import pyarrow.compute as pc
 
-        file.write(json_str)
+    parts = pc.extract_regex(refs, OSIS_RANGE_PATTERN)
+    if parts.null_count:
+        return None
+    start_book, start_chapter, start_verse, end_book, end_chapter, end_verse = parts.flatten()
+    has_end = pc.not_equal(end_book, "").to_numpy(zero_copy_only=False)
+    if not ranges and has_end.any():
+        return None
 
+    book_indices = numpy.array([0] + [verse_id.OSIS_BOOK_INDEX[osis] for osis in verse_id.OSIS_BOOKS], dtype=numpy.uint32)
+    osis_books = pyarrow.array(verse_id.OSIS_BOOKS)
 
+    def pack(book: 'pyarrow.Array', chapter: 'pyarrow.Array', verse: 'pyarrow.Array') -> Optional['numpy.ndarray']:
+        # Unknown books, and empty end books, are 0
+        books = book_indices[pc.add(pc.index_in(book, value_set=osis_books), 1).fill_null(0).to_numpy()]
+        chapters = pc.cast(pc.if_else(pc.equal(chapter, ""), "0", chapter), pyarrow.uint32()).to_numpy()
+        verses = pc.cast(pc.if_else(pc.equal(verse, ""), "0", verse), pyarrow.uint32()).to_numpy()
+        # Out of range numbers are left to `verse_id.parse_osis` to report
+        if (chapters > 0xFF).any() or (verses >= verse_id.VERSE_MAX).any():
+            return None
+        return (books << 16) | (chapters << 8) | verses
 
+    starts = pack(start_book, start_chapter, start_verse)
+    ends = pack(end_book, end_chapter, end_verse)
+    if starts is None or ends is None or not (starts >> 16).all() or not (ends >> 16)[has_end].all():
+        return None
+    # Chapter 0 doesn't exist
+    if not (starts & 0xFF00).all() or not (ends & 0xFF00)[has_end].all():
+        return None
 
-print("Done!")
\ No newline at end of file
+    ends = numpy.where(has_end, ends, starts)
+    # `verse_id.span`: a chapter end covers the whole chapter
+    if ranges:
+        ends = numpy.where(ends & verse_id.VERSE_MAX == 0, ends | verse_id.VERSE_MAX, ends)
+    return numpy.stack([starts, ends], axis=1)
+
+def read_columnar(path: str, target_order: str, instrumentation: Instrumentation) -> Optional[List[XrefGroup]]:
+    """
+    Groups the rows like `read_python`, reading the columns with pyarrow and
+    sorting with NumPy. The source and target columns are dictionary
+    encoded, so each distinct verse or range is parsed once and its packed
+    ids are gathered for every row with a lookup by code. One stable
+    lexsort then orders the rows by source id, source and target key.
+    Returns `None` if the CSV cannot be read as three columns, leaving it to
+    `read_python`.
+    """
+    import numpy
+    import pyarrow
+    import pyarrow.csv
+
+    with instrumentation.stage("read"):
+        try:
+            table = pyarrow.csv.read_csv(
+                path,
+                # The header names a fourth (comment) column that the rows don't have
+                read_options=pyarrow.csv.ReadOptions(skip_rows=1, column_names=COLUMNS),
+                convert_options=pyarrow.csv.ConvertOptions(
+                    column_types={"from": pyarrow.string(), "to": pyarrow.string(), "votes": pyarrow.int64()},
+                    strings_can_be_null=False,
+                ),
+            )
+        except pyarrow.ArrowInvalid as e:
+            print(f"Warning: falling back to the csv module: {e}")
+            return None
+    instrumentation.count("rows", table.num_rows)
+
+    with instrumentation.stage("transform"):
+        votes = table.column("votes").to_numpy()
+        keep = votes > 0
+        skipped = table.num_rows - int(numpy.count_nonzero(keep))
+        if skipped:
+            instrumentation.count("skipped_rows", skipped)
+        table = table.filter(pyarrow.array(keep))
+        votes = votes[keep]
+
+        # Codes number the distinct values in order of first appearance
+        sources = table.column("from").combine_chunks().dictionary_encode()
+        names = sources.dictionary.to_pylist()
+        source_codes = sources.indices.to_numpy()
+        source_ids = _parse_ranges(sources.dictionary, ranges=False)
+        if source_ids is None:
+            source_ids = numpy.array([verse_id.parse_osis(name) for name in names], dtype=numpy.uint32)
+        else:
+            source_ids = source_ids[:, 0]
+
+        targets = table.column("to").combine_chunks().dictionary_encode()
+        target_ranges = _parse_ranges(targets.dictionary)
+        if target_ranges is None:
+            target_ranges = numpy.array([verse_id.parse_osis_range(target) for target in targets.dictionary.to_pylist()],
+                                        dtype=numpy.uint32).reshape(-1, 2)
+        target_keys = target_ranges[targets.indices.to_numpy()]
+
+        # Rank the distinct sources by packed id, then first appearance
+        source_ranks = numpy.empty(len(names), dtype=numpy.uint64)
+        source_ranks[numpy.lexsort([numpy.arange(len(names)), source_ids])] = numpy.arange(len(names), dtype=numpy.uint64)
+        row_ranks = source_ranks[source_codes]
+        if target_order == "votes":
+            # lexsort sorts by the last key first
+            order = numpy.lexsort([target_keys[:, 1], target_keys[:, 0], -votes, row_ranks])
+        else:
+            # Packed ids fit in 23 bits, so rank, start and end fit in one sort key
+            target_keys = target_keys.astype(numpy.uint64)
+            order = numpy.argsort((row_ranks << 46) | (target_keys[:, 0] << 23) | target_keys[:, 1], kind="stable")
+
+        sorted_codes = source_codes[order]
+        starts = numpy.flatnonzero(numpy.diff(sorted_codes, prepend=-1)).tolist()
+        group_codes = sorted_codes[starts].tolist()
+        target_names = table.column("to").take(pyarrow.array(order)).to_pylist()
+        target_votes = votes[order].tolist()
+        target_keys = target_keys[order]
+        target_starts = target_keys[:, 0].tolist()
+        target_ends = target_keys[:, 1].tolist()
+
+    groups: List[XrefGroup] = []
+    for start, end, code in zip(starts, starts[1:] + [len(order)], group_codes):
+        groups.append((int(source_ids[code]), names[code], target_names[start:end], target_votes[start:end],
+                       target_starts[start:end], target_ends[start:end]))
+    return groups
+
+def convert(path: str, output: str = "out.jsonl", compress: str = "none", columnar: bool = True,
+            target_order: str = "canonical", index_output: Optional[str] = None, edges_output: Optional[str] = None,
+            instrumentation: Optional[Instrumentation] = None) -> Dict[str, int]:
+    """
+    Converts the OpenBible cross references CSV at `path` into JSONL at
+    `output`, one line per source verse in canonical order, with targets in
+    `target_order` (see `TARGET_ORDERS`). Reads the CSV with pyarrow and
+    NumPy when both are installed and `columnar` is set, and with the csv
+    module otherwise. Also writes an offset index of the source verses to
+    `index_output` if given (see `common.offset_index`), and the targets
+    with their votes as packed edges to `edges_output` if given (see
+    `common.xref_edges`); compressed output can't be indexed. Returns the
+    converter's counters.
+    """
+    if instrumentation is None:
+        instrumentation = Instrumentation("open_xref")
+
+    if not os.path.isfile(path):
+        raise RuntimeError(f"File path {path} is not a valid path")
+
+    _, ext = os.path.splitext(path)
+    if not ext == ".csv":
+        raise RuntimeError(f"File path {path} is not a json csv")
+
+    if target_order not in TARGET_ORDERS:
+        raise RuntimeError(f"Unknown target order: {target_order}")
+
+    print(f"Reading file: {path}...")
+
+    lines_data = None
+    if columnar:
+        try:
+            lines_data = read_columnar(path, target_order, instrumentation)
+        except ImportError:
+            pass
+    if lines_data is None:
+        lines_data = read_python(path, target_order, instrumentation)
+    instrumentation.count("sources", len(lines_data))
+
+    edges = Edges(u32_array(), u32_array(), u32_array(), u32_array())
+    with instrumentation.stage("write"), JsonlWriter(output, compress=compress, index=index_output) as writer:
+        print(f"Writing to file: {writer.path}...")
+        if index_output:
+            print(f"Writing to file: {index_output}...")
+        for source_id, source, targets, votes, starts, ends in lines_data:
+            instrumentation.count("targets", len(targets))
+            writer.write({
+                "type": "directed",
+                "source": source,
+                "targets": targets,
+            }, key=source_id)
+            if edges_output:
+                edges.sources.extend(repeat(source_id, len(targets)))
+                edges.starts.extend(starts)
+                edges.ends.extend(ends)
+                edges.votes.extend(votes)
+
+    if edges_output:
+        print(f"Writing to file: {edges_output}...")
+        with instrumentation.stage("edges"):
+            save_edges(edges_output, edges)
+
+    return instrumentation.counters
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Converts the OpenBible cross references CSV into JSONL")
+    parser.add_argument("path", help="path to cross_references.csv")
+    parser.add_argument("--target-order", choices=TARGET_ORDERS, default="canonical",
+                        help="order targets by verse (default) or by votes, highest first")
+    parser.add_argument("--pure-python", action="store_true", help="read the CSV with the csv module even if pyarrow and NumPy are installed")
+    add_compress_argument(parser)
+    add_index_argument(parser)
+    add_edges_argument(parser)
+    add_instrument_arguments(parser)
+    args = parser.parse_args()
+
+    with Instrumentation.from_args("open_xref", args) as instrumentation:
+        convert(args.path, compress=args.compress, columnar=not args.pure_python, target_order=args.target_order,
+                index_output=index_path("out.jsonl") if args.index else None,
+                edges_output=edges_path("out.jsonl") if args.edges else None, instrumentation=instrumentation)
+
+    print("Done!")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Single pass scanner for TSK `reference_list` fields.
+
+A field is a semicolon separated list of references such as
+`ge 28:15,20,21-29;ge 32:9;ps 90-92`. Each reference is parsed into a tuple of
+`TskRef`s holding inclusive `(start, end)` packed verse ids (see
+`common.verse_id`); a single verse has `start == end` and chapter references
+use verse `0`.
+
+`parse_ref` memoizes each reference string's refs, OSIS text included, or
+its error message, until `clear_cache`.
+"""
+
+import os
+import sys
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from common import books, verse_id
+
+class TskRef(NamedTuple):
+    start: int
+    end: int
+    osis: str
+
+    def write(self, out: List[str]) -> None:
+        out.append(self.osis)
+
+
+class TskRefError(NamedTuple):
+    row: int
+    ref: str
+    message: str
+
+    def __str__(self) -> str:
+        return f"Row {self.row}: {self.message}: '{self.ref}'"
+
+
+class TskParseError(RuntimeError):
+    def __init__(self, error: TskRefError) -> None:
+        super().__init__(str(error))
+        self.error = error
+
+
+class _ScanError(Exception):
+    pass
+
+
+_memo: Dict[str, Tuple[TskRef, ...] | str] = {}
+
+
+def clear_cache() -> None:
+    _memo.clear()
+
+
+def _scan_number(ref: str, i: int, n: int) -> Tuple[int, int]:
+    while i < n and ref[i] == ' ':
+        i += 1
+
+    start = i
+    value = 0
+    while i < n:
+        c = ref[i]
+        if c < '0' or c > '9':
+            break
+        value = value * 10 + (ord(c) - 48)
+        i += 1
+
+    if i == start:
+        raise _ScanError("Expected a number" if i < n else "Unexpected end of reference")
+    if value == 0 or value > verse_id.VERSE_MAX:
+        raise _ScanError(f"Number {value} is out of range")
+
+    while i < n and ref[i] == ' ':
+        i += 1
+    return value, i
+
+
+def _scan_ref(ref: str) -> Tuple[TskRef, ...]:
+    pack = verse_id.pack
+    n = len(ref)
+    i = 0
+    while i < n and ref[i] == ' ':
+        i += 1
+    while n > i and ref[n - 1] == ' ':
+        n -= 1
+
+    book_start = i
+    while i < n and ref[i] != ' ':
+        i += 1
+    book_entry = books.TSK_ALIASES.get(ref[book_start:i])
+    if book_entry is None:
+        raise _ScanError(f"Unknown book '{ref[book_start:i]}'")
+    book, osis = book_entry.index, book_entry.osis
+
+    chapter, i = _scan_number(ref, i, n)
+    if i == n:
+        id = pack(book, chapter)
+        return (TskRef(id, id, f"{osis}.{chapter}"),)
+
+    c = ref[i]
+    if c == '-':
+        end_chapter, i = _scan_number(ref, i + 1, n)
+        if i != n:
+            raise _ScanError(f"Unexpected '{ref[i]}'")
+        text = f"{osis}.{chapter}-{osis}.{end_chapter}"
+        return (TskRef(pack(book, chapter), pack(book, end_chapter), text),)
+    if c != ':':
+        raise _ScanError(f"Unexpected '{c}'")
+
+    prefix = f"{osis}.{chapter}."
+    refs: List[TskRef] = []
+    while True:
+        verse, i = _scan_number(ref, i + 1, n)
+        start = pack(book, chapter, verse)
+        if i < n and ref[i] == '-':
+            end_verse, i = _scan_number(ref, i + 1, n)
+            text = f"{prefix}{verse}-{prefix}{end_verse}"
+            refs.append(TskRef(start, pack(book, chapter, end_verse), text))
+        else:
+            refs.append(TskRef(start, start, f"{prefix}{verse}"))
+
+        if i == n:
+            return tuple(refs)
+        if ref[i] != ',':
+            raise _ScanError(f"Unexpected '{ref[i]}'")
+
+
+def parse_ref(ref: str, row: int = 0, errors: Optional[List[TskRefError]] = None) -> Tuple[TskRef, ...]:
+    """
+    Parses a single reference (`ge 28:15,20,21-29`). Malformed references are
+    appended to `errors` and yield no refs; without an `errors` list a
+    `TskParseError` is raised instead.
+    """
+    parsed = _memo.get(ref)
+    if parsed is None:
+        try:
+            parsed = _scan_ref(ref)
+        except _ScanError as e:
+            parsed = str(e)
+        _memo[ref] = parsed
+
+    if isinstance(parsed, str):
+        error = TskRefError(row, ref, parsed)
+        if errors is None:
+            raise TskParseError(error)
+        errors.append(error)
+        return ()
+
+    return parsed
+
+
+def parse_reference_list(field: str, row: int = 0, errors: Optional[List[TskRefError]] = None) -> List[TskRef]:
+    """Parses a whole `reference_list` field into refs, in field order."""
+    refs: List[TskRef] = []
+    for ref in field.split(';'):
+        refs.extend(parse_ref(ref, row, errors))
+    return refs
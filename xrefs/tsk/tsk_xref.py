@@ -1,244 +1,176 @@
-from abc import ABC, abstractmethod
 import sys
 import os
-import csv
-from typing import List
-import re
-
-osis_books = [
-    "Gen", "Exod", "Lev", "Num", "Deut",
-    "Josh", "Judg", "Ruth", "1Sam", "2Sam",
-    "1Kgs", "2Kgs", "1Chr", "2Chr", "Ezra",
-    "Neh", "Esth", "Job", "Ps", "Prov",
-    "Eccl", "Song", "Isa", "Jer", "Lam",
-    "Ezek", "Dan", "Hos", "Joel", "Amos",
-    "Obad", "Jonah", "Mic", "Nah", "Hab",
-    "Zeph", "Hag", "Zech", "Mal",
-    "Matt", "Mark", "Luke", "John", "Acts",
-    "Rom", "1Cor", "2Cor", "Gal", "Eph",
-    "Phil", "Col", "1Thess", "2Thess", "1Tim",
-    "2Tim", "Titus", "Phlm", "Heb", "Jas",
-    "1Pet", "2Pet", "1John", "2John", "3John",
-    "Jude", "Rev"
-]
-
-tsk_to_osis = {
-    "ge": "Gen",
-    "ex": "Exod",
-    "le": "Lev",
-    "nu": "Num",
-    "de": "Deut",
-    "jos": "Josh",
-    "jud": "Judg",
-    "ru": "Ruth",
-    "1sa": "1Sam",
-    "2sa": "2Sam",
-    "1ki": "1Kgs",
-    "2ki": "2Kgs",
-    "1ch": "1Chr",
-    "2ch": "2Chr",
-    "ezr": "Ezra",
-    "ne": "Neh",
-    "es": "Esth",
-    "job": "Job",
-    "ps": "Ps",
-    "pr": "Prov",
-    "ec": "Eccl",
-    "so": "Song",
-    "isa": "Isa",
-    "jer": "Jer",
-    "la": "Lam",
-    "eze": "Ezek",
-    "da": "Dan",
-    "ho": "Hos",
-    "joe": "Joel",
-    "am": "Amos",
-    "ob": "Obad",
-    "jon": "Jonah",
-    "mic": "Mic",
-    "na": "Nah",
-    "hab": "Hab",
-    "zep": "Zeph",
-    "hag": "Hag",
-    "zec": "Zech",
-    "mal": "Mal",
-    "mt": "Matt",
-    "mr": "Mark",
-    "lu": "Luke",
-    "joh": "John",
-    "ac": "Acts",
-    "ro": "Rom",
-    "1co": "1Cor",
-    "2co": "2Cor",
-    "ga": "Gal",
-    "eph": "Eph",
-    "php": "Phil",
-    "col": "Col",
-    "1th": "1Thess",
-    "2th": "2Thess",
-    "1ti": "1Tim",
-    "2ti": "2Tim",
-    "tit": "Titus",
-    "phm": "Phlm",
-    "heb": "Heb",
-    "jas": "Jas",
-    "1pe": "1Pet",
-    "2pe": "2Pet",
-    "1jo": "1John",
-    "2jo": "2John",
-    "3jo": "3John",
-    "jude": "Jude",
-    "re": "Rev"
-}
-
-class Atom(ABC):
-    @abstractmethod
-    def __str__(self) -> str:
-        pass
-
-class ChapterAtom(Atom):
-    
-    def __init__(self, book: str, chapter: int):
-        self.book = book
-        self.chapter = chapter
-
-    def __str__(self) -> str:
-        return f"{self.book}.{self.chapter}"
-    
-class VerseAtom(Atom):
-    def __init__(self, book: str, chapter: int, verse: int):
-        self.book = book
-        self.chapter = chapter
-        self.verse = verse
-
-    def __str__(self) -> str:
-        return f"{self.book}.{self.chapter}.{self.verse}"
-    
-class RefId(ABC):
-    @abstractmethod
-    def __str__(self) -> str:
-        pass
-
-class SingleRef(RefId):
-    def __init__(self, atom: Atom):
-        self.atom = atom
-
-    def __str__(self) -> str:
-        return str(self.atom)
-    
-class RangeRef(RefId):
-    def __init__(self, start: Atom, end: Atom):
-        self.start = start
-        self.end = end
-
-    def __str__(self) -> str:
-        return f"{str(self.start)}-{str(self.end)}"
-
-
-def parse_tsk_ref_id(ref: str) -> List[RefId]:
-    book_pair = ref.split()
-
-    if len(book_pair) != 2:
-        print(ref)
-
-    book = book_pair[0]
-    chapter_pair = book_pair[1].split(':')
-
-    if re.fullmatch(r"\d+-\d+", book_pair[1]):
-        [ch_start, ch_end] = book_pair[1].split("-")
-        ch_start = int(ch_start)
-        ch_end = int(ch_end)
-
-        return [RangeRef(ChapterAtom(book, ch_start), ChapterAtom(book, ch_end))]
-
-    if not chapter_pair[0].isdecimal():
-        print(ref)
-
-    chapter = int(chapter_pair[0])
-    if chapter_pair[1].isdecimal():
-        return [SingleRef(VerseAtom(book, chapter, int(chapter_pair[1])))]
-    
-    chapter_verses = chapter_pair[1].split(",")
-    if len(chapter_verses) > 1:
-        ret_verses: List[RefId] = []
-        for chapter_verse in chapter_verses:
-            verses = chapter_verse.split('-')
-            if len(verses) == 2:
-                ret_verses.append(RangeRef(VerseAtom(book, chapter, int(verses[0])), VerseAtom(book, chapter, int(verses[1]))))
-            elif len(verses) == 1:
-                ret_verses.append(SingleRef(VerseAtom(book, chapter, int(verses[0]))))
-            else:
-                raise RuntimeError("Unknown reference format: " + ref)
-        
-        return ret_verses
-    
-    verse_range = chapter_pair[1].split("-")
-    if len(verse_range) == 2:
-        return [RangeRef(VerseAtom(book, chapter, int(verse_range[0])), VerseAtom(book, chapter, int(verse_range[1])))]
-    
-    raise RuntimeError("Unknown reference format: " + ref)
+import argparse
+from collections import deque
+from typing import TYPE_CHECKING, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
 
-def format_ref_id(book: int, chapter: int, verse: int) -> str:
-    return f"{osis_books[book - 1]}.{chapter}.{verse}"
-
-     
-
-if len(sys.argv) < 2:
-    raise RuntimeError("You must pass a file path")
-elif len(sys.argv) > 2:
-    raise RuntimeError("More than 1 argument was supplied")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from common import verse_id
+from common.binary_io import u32_array
+from common.instrument import Instrumentation, add_instrument_arguments
+from common.interval_index import IntervalIndex
+from common.jsonl import JsonlWriter, encoder
+from common.mmap_reader import LineChunk, chunk_rows, line_chunks, map_file
+from common.offset_index import add_index_argument, index_path
+from common.output import add_compress_argument
+from common.xref_edges import Edges, add_edges_argument, edges_path, save_edges
+from tsk_parser import TskRefError, parse_reference_list
 
-path = sys.argv[1]
+if TYPE_CHECKING:
+    from concurrent.futures import Future
 
-if not os.path.isfile(path):
-    raise RuntimeError(f"File path {path} is not a valid path")
+osis_books = verse_id.OSIS_BOOKS
 
-_, ext = os.path.splitext(path)
-if not ext == ".csv":
-    raise RuntimeError(f"File path {path} is not a json csv")
+# Around 2000 rows of the TSK file
+CHUNK_BYTES = 1 << 17
 
-print(f"Reading file: {path}...")
-data: list[list[str]] = []
-with open(path, 'r', newline='') as f:
-    reader = csv.reader(f, delimiter="\t")
-    for row in reader:
-        data.append(row)
+# Encoded lines, line count, target intervals, (source id, offset, length) of each line and reference errors
+ChunkResult = Tuple[bytes, int, List[Tuple[int, int, int]], List[Tuple[int, int, int]], List[TskRefError]]
 
-print("Writing to file: tsk_xrefs.jsonl...")
+def format_ref_id(book: int, chapter: int, verse: int) -> str:
+    return f"{osis_books[book - 1]}.{chapter}.{verse}"
 
-with open('tsk_xrefs.jsonl', 'w') as file:
-    for row in data:
+def convert_rows(first_line: int, rows: Iterable[List[str]]) -> ChunkResult:
+    """
+    Converts TSK rows, starting at line `first_line`, into encoded JSONL
+    lines, target intervals, index entries and reference errors.
+    """
+    lines: List[bytes] = []
+    intervals: List[Tuple[int, int, int]] = []
+    entries: List[Tuple[int, int, int]] = []
+    errors: List[TskRefError] = []
+    encode = encoder()
+    count = 0
+    offset = 0
+
+    for line_index, row in enumerate(rows, first_line):
+        count += 1
         book_index = int(row[0])
         chapter_index = int(row[1])
         verse_index = int(row[2])
         source = format_ref_id(book_index, chapter_index, verse_index)
 
-        source_text = row[4].replace("\"", "\\\"")
-        refs = row[5].split(";")
-        
+        refs = parse_reference_list(row[5], line_index + 1, errors)
+
         targets: List[str] = []
         for ref in refs:
-            for ref_id in parse_tsk_ref_id(ref):
-                if isinstance(ref_id, RangeRef):
-                    if isinstance(ref_id.start, ChapterAtom) and isinstance(ref_id.end, ChapterAtom):
-                        targets.append(f"{tsk_to_osis[ref_id.start.book]}.{ref_id.start.chapter}-{tsk_to_osis[ref_id.end.book]}.{ref_id.end.chapter}")
-                    elif isinstance(ref_id.start, VerseAtom) and isinstance(ref_id.end, VerseAtom):
-                        targets.append(f"{tsk_to_osis[ref_id.start.book]}.{ref_id.start.chapter}.{ref_id.start.verse}-{tsk_to_osis[ref_id.end.book]}.{ref_id.end.chapter}.{ref_id.end.verse}")
-                    else:
-                        raise RuntimeError(f"Error: Unknown reference format {str(ref_id)}")
-                elif isinstance(ref_id, SingleRef):
-                    if isinstance(ref_id.atom, ChapterAtom):
-                        targets.append(f"{tsk_to_osis[ref_id.atom.book]}.{ref_id.atom.chapter}")
-                    elif isinstance(ref_id.atom, VerseAtom):
-                        targets.append(f"{tsk_to_osis[ref_id.atom.book]}.{ref_id.atom.chapter}.{ref_id.atom.verse}")
-                    else:
-                        raise RuntimeError(f"Error: Unknown reference format {str(ref_id)}")
-                else:
-                    raise RuntimeError(f"Error: Unknown reference format {str(ref_id)}")
-    
-        ref_str = "[ " + ", ".join(map(lambda x : f"\"{x}\"", targets)) + " ]"
-        json_str = f"{{ \"type\": \"directed\", \"source\": \"{source}\", \"source_text\": \"{source_text}\", \"targets\": {ref_str} }}\n"
-
-        file.write(json_str)
-
-print("Done!")
\ No newline at end of file
+            intervals.append((*verse_id.span(ref.start, ref.end), line_index))
+            ref.write(targets)
+
+        line = encode({
+            "type": "directed",
+            "source": source,
+            "source_text": row[4],
+            "targets": targets,
+        })
+        entries.append((verse_id.pack(book_index, chapter_index, verse_index), offset, len(line)))
+        offset += len(line) + 1
+        lines.append(line)
+        lines.append(b"\n")
+
+    return b"".join(lines), count, intervals, entries, errors
+
+def convert_chunk(path: str, chunk: LineChunk) -> ChunkResult:
+    """Maps the file at `path` and converts one chunk of it, so worker processes only receive the chunk's offsets."""
+    with map_file(path) as data:
+        return convert_rows(chunk.first_line, chunk_rows(data, chunk, "\t"))
+
+def convert_chunks(path: str, jobs: int) -> Iterator[ChunkResult]:
+    """Yields converted chunks in input order, keeping at most `2 * jobs` chunks in flight."""
+    if jobs <= 1:
+        with map_file(path) as data:
+            for chunk in line_chunks(data, CHUNK_BYTES):
+                yield convert_rows(chunk.first_line, chunk_rows(data, chunk, "\t"))
+        return
+
+    # multiprocessing is slow to import, so only load it when it is used
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=jobs) as pool, map_file(path) as data:
+        pending: Deque['Future[ChunkResult]'] = deque()
+        for chunk in line_chunks(data, CHUNK_BYTES):
+            if len(pending) >= 2 * jobs:
+                yield pending.popleft().result()
+            pending.append(pool.submit(convert_chunk, path, chunk))
+
+        while pending:
+            yield pending.popleft().result()
+
+def convert(path: str, output: str = "tsk_xrefs.jsonl", intervals_output: str = "tsk_xrefs.intervals", jobs: int = 1,
+            compress: str = "none", index_output: Optional[str] = None, edges_output: Optional[str] = None,
+            instrumentation: Optional[Instrumentation] = None) -> Dict[str, int]:
+    """
+    Converts the TSK tab separated file at `path` into JSONL at `output`, an
+    interval index of every target at `intervals_output`, an offset index
+    of the source verses at `index_output` if given, and the targets as
+    packed edges at `edges_output` if given. Reference errors are printed as
+    warnings. Returns the converter's counters.
+    """
+    if instrumentation is None:
+        instrumentation = Instrumentation("tsk_xref")
+
+    if not os.path.isfile(path):
+        raise RuntimeError(f"File path {path} is not a valid path")
+
+    _, ext = os.path.splitext(path)
+    if not ext == ".csv":
+        raise RuntimeError(f"File path {path} is not a json csv")
+
+    intervals: List[Tuple[int, int, int]] = []
+    # The packed source id of every line, for the edges
+    line_sources = u32_array()
+    errors: List[TskRefError] = []
+
+    # Reading and parsing run interleaved (or in worker processes), so
+    # they are timed together as one stage
+    with instrumentation.stage("parse"), JsonlWriter(output, compress=compress, index=index_output) as writer:
+        print(f"Converting file: {path} to {writer.path}...")
+        for lines, count, chunk_intervals, entries, chunk_errors in convert_chunks(path, jobs):
+            writer.write_encoded(lines, count, entries)
+            intervals.extend(chunk_intervals)
+            if edges_output:
+                line_sources.extend(entry[0] for entry in entries)
+            errors.extend(chunk_errors)
+    instrumentation.count("rows", writer.count)
+    instrumentation.count("refs", len(intervals))
+    instrumentation.count("ref_errors", len(errors))
+
+    for error in errors:
+        print(f"Warning: {error}")
+
+    print(f"Writing to file: {intervals_output}...")
+    with instrumentation.stage("index"):
+        IntervalIndex.build(intervals).save(intervals_output)
+
+    if edges_output:
+        print(f"Writing to file: {edges_output}...")
+        with instrumentation.stage("edges"):
+            # TSK targets have no votes
+            save_edges(edges_output, Edges(
+                u32_array(line_sources[i[2]] for i in intervals),
+                u32_array(i[0] for i in intervals),
+                u32_array(i[1] for i in intervals),
+                u32_array([0]) * len(intervals),
+            ))
+
+    return instrumentation.counters
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Converts the TSK cross references into JSONL")
+    parser.add_argument("path", help="path to the TSK tab separated file")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="number of parser processes (default 1)")
+    add_compress_argument(parser)
+    add_index_argument(parser)
+    add_edges_argument(parser)
+    add_instrument_arguments(parser)
+    args = parser.parse_args()
+
+    with Instrumentation.from_args("tsk_xref", args) as instrumentation:
+        convert(args.path, jobs=args.jobs, compress=args.compress,
+                index_output=index_path("tsk_xrefs.jsonl") if args.index else None,
+                edges_output=edges_path("tsk_xrefs.jsonl") if args.edges else None, instrumentation=instrumentation)
+
+    print("Done!")
+
+if __name__ == "__main__":
+    main()